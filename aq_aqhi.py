@@ -0,0 +1,248 @@
+import os
+import threading
+import warnings
+
+import numpy as np
+
+from aq_archive import DEFAULT_CHUNK_CACHE_MB, open_archive, record_dtype, write_archive, write_chunked_archive
+from aq_bands import AQHI_BANDS, BandHistograms
+from aq_cache import cache_path
+from aq_snapshot import load_or_build_snapshot, snapshot_key
+
+# 空气质素健康指数（AQHI）：根据NO2、O3、SO2和可吸入/微细悬浮粒子的3小时移动平均浓度，
+# 计算短期健康风险的增加百分比（%AR），再按风险分级为1-10及10+（以11表示）
+AQHI_POLLUTANTS = ('NO2', 'O3', 'SO2', 'PM10', 'PM2.5')
+HOURLY_CHANNELS = ('AQHI',) + AQHI_POLLUTANTS
+AQHI_BETAS = {
+    'NO2': 0.0004462559,
+    'O3': 0.0005116328,
+    'SO2': 0.0001393235,
+    'PM10': 0.0002821751,
+    'PM2.5': 0.0002180567,
+}
+AQHI_AR_LIMITS = (1.88, 3.76, 5.64, 7.52, 9.41, 11.29, 12.91, 15.07, 17.22, 19.37)
+AQHI_WINDOW = 3  # 移动平均的小时数
+AQHI_VERSION = 1  # 修改合成或计算方法时必须递增
+BANDS_VERSION = 1  # 修改级别划分或统计方法时必须递增
+DEFAULT_ARCHIVE_FORMAT = 'zlib'  # 逐小时档案默认分块压缩，节省kiosk存储卡的空间
+
+# 合成小时数据：AQI为REFERENCE_AQI的月份中各污染物的典型浓度（µg/m³）
+REFERENCE_AQI = 70.0
+BASE_CONCENTRATIONS = {'NO2': 55.0, 'O3': 45.0, 'SO2': 12.0, 'PM10': 50.0, 'PM2.5': 32.0}
+
+
+def month_offsets(years):
+    """每个月第一个小时在小时时间轴上的下标，最后一个元素为总小时数"""
+    months = np.arange(np.datetime64(f"{years[0]}-01"), np.datetime64(f"{years[-1] + 1}-02"))
+    hours = months.astype('datetime64[h]')
+    return (hours - hours[0]).astype(np.int64)
+
+
+def diurnal_profiles():
+    """各污染物一天24小时的相对浓度（平均为1）"""
+    hour = np.arange(24)
+    rush = np.exp(-((hour - 8) / 2.0) ** 2) + np.exp(-((hour - 18) / 2.5) ** 2)
+    profiles = {
+        'NO2': 1 + 0.5 * rush,
+        'O3': 1 + 0.6 * np.cos(2 * np.pi * (hour - 15) / 24),  # 午后日照最强时最高
+        'SO2': 1 + 0.15 * np.cos(2 * np.pi * (hour - 12) / 24),
+        'PM10': 1 + 0.2 * rush,
+        'PM2.5': 1 + 0.15 * rush,
+    }
+    return np.column_stack([profiles[p] / profiles[p].mean() for p in AQHI_POLLUTANTS])
+
+
+def synthesize_hourly(monthly_aqi, years, seed):
+    """由月度AQI合成逐小时污染物浓度，返回(区域, 小时, 污染物)
+
+    月度水平按AQI比例缩放典型浓度，再乘以日变化曲线、逐日波动和逐小时波动
+    （均为对数正态），所有区域和小时一次性向量化生成。
+    """
+    offsets = month_offsets(years)
+    hour_month = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    hours = len(hour_month)
+    districts = monthly_aqi.shape[0]
+    rng = np.random.default_rng([seed, 46])
+
+    base = np.array([BASE_CONCENTRATIONS[p] for p in AQHI_POLLUTANTS], dtype=np.float32)
+    level = monthly_aqi.reshape(districts, -1).astype(np.float32) / REFERENCE_AQI
+    daily = rng.lognormal(0.0, 0.35, (districts, hours // 24 + 1, len(base))).astype(np.float32)
+    hourly = rng.lognormal(0.0, 0.2, (districts, hours, len(base))).astype(np.float32)
+
+    hourly *= level[:, hour_month, None]
+    hourly *= daily[:, np.arange(hours) // 24]
+    hourly *= (diurnal_profiles()[np.arange(hours) % 24] * base).astype(np.float32)
+    return hourly
+
+
+def moving_average(series, window=AQHI_WINDOW, axis=1):
+    """沿axis的尾随移动平均（用累加和实现）；缺失值（NaN）不计入，窗口内没有数据时为NaN
+
+    序列开头不足window个小时的位置使用已有的小时计算。
+    """
+    series = np.moveaxis(series, axis, 0)
+    valid = ~np.isnan(series)
+    totals = np.zeros((series.shape[0] + 1,) + series.shape[1:])
+    counts = np.zeros(totals.shape, dtype=np.int64)
+    np.cumsum(np.where(valid, series, 0), axis=0, out=totals[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+    ends = np.arange(1, series.shape[0] + 1)
+    starts = np.maximum(ends - window, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (totals[ends] - totals[starts]) / (counts[ends] - counts[starts])
+    return np.moveaxis(mean, 0, axis)
+
+
+def added_risk(concentrations):
+    """3小时平均浓度(..., 污染物) -> 健康风险增加百分比%AR
+
+    总风险为NO2、O3、SO2之和，加上PM10和PM2.5中较高的一项；缺失的污染物不计入。
+    """
+    betas = np.array([AQHI_BETAS[p] for p in AQHI_POLLUTANTS])
+    risk = np.nan_to_num(np.expm1(concentrations * betas) * 100)
+    gases = risk[..., :3].sum(axis=-1)
+    return gases + np.maximum(risk[..., 3], risk[..., 4])
+
+
+def aqhi_from_risk(risk):
+    """%AR -> AQHI（1-10，10+为11）"""
+    return np.searchsorted(AQHI_AR_LIMITS, risk, side='left') + 1
+
+
+def compute_aqhi(hourly):
+    """逐小时浓度(区域, 小时, 污染物) -> 逐小时AQHI(区域, 小时)；所有污染物都缺失的小时为NaN"""
+    averages = moving_average(hourly, AQHI_WINDOW, axis=1)
+    aqhi = aqhi_from_risk(added_risk(averages)).astype(np.float32)
+    aqhi[np.isnan(averages).all(axis=-1)] = np.nan
+    return aqhi
+
+
+def build_hourly_archive(monthly_aqi, years, seed):
+    """合成逐小时浓度并计算AQHI，返回(区域, 小时, HOURLY_CHANNELS)的float32数组
+
+    移动平均的累加和为float64，逐个区域计算，峰值内存只比结果多一个区域的中间数组。
+    """
+    hourly = synthesize_hourly(monthly_aqi, years, seed)
+    archive = np.empty(hourly.shape[:2] + (len(HOURLY_CHANNELS),), dtype=np.float32)
+    for district in range(hourly.shape[0]):
+        archive[district, :, 0] = compute_aqhi(hourly[district:district + 1])[0]
+    archive[..., 1:] = hourly
+    return archive
+
+
+def monthly_means(archive, years):
+    """逐小时数据 -> 月均值(区域, 年份, 月份, 通道)，忽略缺失的小时"""
+    starts = month_offsets(years)[:-1]
+    valid = ~np.isnan(archive)
+    totals = np.add.reduceat(np.where(valid, archive, 0), starts, axis=1, dtype=np.float64)
+    counts = np.add.reduceat(valid, starts, axis=1, dtype=np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (totals / counts).astype(np.float32)
+    return means.reshape(archive.shape[0], len(years), 12, archive.shape[2])
+
+
+def load_hourly_archive(monthly_aqi, districts, years, seed, version,
+                        archive_format=DEFAULT_ARCHIVE_FORMAT, cache_mb=DEFAULT_CHUNK_CACHE_MB):
+    """加载（首次运行时计算并缓存）逐小时档案和月均值
+
+    archive_format为'raw'时写入未压缩的内存映射档案，否则为按该方式压缩的分块档案。
+    返回(HourlyArchive或ChunkedArchive, 月均值的只读内存映射数组)。
+    """
+    years = list(years)
+    key = snapshot_key(version, seed)[:16]
+    name = f"aqhi-hourly-{key}.aqa" if archive_format == 'raw' else f"aqhi-hourly-{key}-{archive_format}.aqz"
+    path = cache_path("archives", name)
+    built = None
+    if not os.path.exists(path):
+        built = build_hourly_archive(monthly_aqi, years, seed)
+        # (监测站, 小时, 通道)的float32数组按字节就是定长记录数组，直接换成记录视图写入
+        records = built.view(record_dtype(HOURLY_CHANNELS))[..., 0]
+        if archive_format == 'raw':
+            write_archive(path, records, districts, years, month_offsets(years))
+        else:
+            write_chunked_archive(path, records, districts, years, month_offsets(years), archive_format)
+    hourly = open_archive(path, cache_mb)
+
+    def build_monthly(seed):
+        values = built if built is not None else hourly.to_array(HOURLY_CHANNELS)
+        meta = {'districts': list(districts), 'years': [years[0], years[-1]], 'channels': list(HOURLY_CHANNELS)}
+        return monthly_means(values, years), meta
+
+    monthly, _ = load_or_build_snapshot('aqhi-monthly', version, seed, build_monthly)
+    return hourly, monthly
+
+
+def load_band_histograms(hourly, seed, version):
+    """加载（首次运行时计算并缓存）各监测站每年处于各AQHI级别的小时数和天数
+
+    计算时需要读取整个AQHI通道（压缩档案要解压每个数据块），因此结果和月均值一样保存为快照。
+    """
+    def build(seed):
+        histograms = BandHistograms.from_hourly(hourly.channel('AQHI'), hourly.year_starts, AQHI_BANDS)
+        meta = {'bands': AQHI_BANDS.names, 'layout': ['hours/days', 'station', 'year', 'band']}
+        return np.stack([histograms.hours, histograms.days]), meta
+
+    counts, _ = load_or_build_snapshot('aqhi-bands', f"{version}.{BANDS_VERSION}", seed, build)
+    return BandHistograms(counts[0], counts[1], AQHI_BANDS)
+
+
+class AQHIArchive:
+    """后台加载的逐小时AQHI和污染物数据
+
+    首次运行时在后台线程中合成全部小时数据并计算AQHI（几秒钟，结果写入磁盘缓存），
+    之后的启动只读取档案头部并内存映射。就绪之前ready为False，不影响首帧时间。
+    这些数据是可选的：加载失败（例如缓存目录不可写、存储卡已满或数据块校验失败）时
+    错误记录在error中，ready保持False，可视化继续只显示AQI。
+    hourly为HourlyArchive或ChunkedArchive；monthly的布局与数据集快照相同：[区域, 年份, 月份, HOURLY_CHANNELS]。
+    月均值就绪后同一线程继续加载各级别的时长统计bands，失败时只记录在bands_error中。
+    """
+
+    def __init__(self, monthly_aqi, districts, years, seed, dataset_version,
+                 archive_format=DEFAULT_ARCHIVE_FORMAT, cache_mb=DEFAULT_CHUNK_CACHE_MB):
+        self.version = f"{dataset_version}.{AQHI_VERSION}"
+        self.hourly = None
+        self.monthly = None
+        self.error = None
+        self.bands = None
+        self.bands_error = None
+        monthly_aqi = np.array(monthly_aqi)
+
+        def load():
+            try:
+                self.hourly, self.monthly = load_hourly_archive(monthly_aqi, districts, years, seed, self.version,
+                                                                archive_format, cache_mb)
+            except Exception as error:
+                self.error = error
+                warnings.warn(f"Hourly AQHI data unavailable: {error!r}")
+                return
+            try:
+                self.bands = load_band_histograms(self.hourly, seed, self.version)
+            except Exception as error:
+                self.bands_error = error
+                warnings.warn(f"AQHI band histograms unavailable: {error!r}")
+
+        self._thread = threading.Thread(target=load, name="aqhi-loader", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        return self.monthly is not None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def join(self):
+        """阻塞等待后台加载结束（无论成功与否，用于离线导出）"""
+        self._thread.join()
+
+    def wait(self):
+        """阻塞等待数据就绪（用于热力图的后台线程），返回月均值；加载失败时抛出该错误"""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.monthly
+
+    def close(self):
+        if self.hourly is not None:
+            self.hourly.close()
@@ -0,0 +1,358 @@
+import json
+import lzma
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from aq_cache import atomic_open
+
+# 逐小时监测站档案的二进制格式：
+#   8字节魔数 | 4字节头部长度 | JSON头部（对齐到64字节）
+#   | 索引：uint64 (监测站, 月份数 + 1)，各监测站每个月第一条记录的字节偏移（最后一列为该站的结束位置）
+#   | 数据：每个监测站一段连续的定长记录数组（每个字段为小端float32）
+ARCHIVE_MAGIC = b"HKAQHR01"
+HEADER_ALIGN = 64
+
+# 分块压缩格式：每个(监测站, 年份)一块，单独压缩并带CRC32校验
+#   8字节魔数 | 4字节头部长度 | JSON头部（含压缩方式和每月起点，对齐到64字节）
+#   | 块表：(监测站, 年份)个CHUNK_ENTRY | 各块压缩后的数据
+CHUNKED_MAGIC = b"HKAQHZ01"
+CHUNK_ENTRY = np.dtype([('offset', '<u8'), ('size', '<u8'), ('crc32', '<u4')])
+CHUNK_CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+DEFAULT_CHUNK_CACHE_MB = 32  # 解压后数据块的缓存上限（一年全部监测站约2MB）
+ARCHIVE_FORMATS = ('raw',) + tuple(CHUNK_CODECS)  # raw为未压缩的内存映射格式
+
+
+def record_dtype(fields):
+    """档案记录的结构化dtype：每个字段一个float32"""
+    return np.dtype([(name, '<f4') for name in fields])
+
+
+def _align(size):
+    return -(-size // HEADER_ALIGN) * HEADER_ALIGN
+
+
+def write_archive(path, records, stations, years, month_starts):
+    """写入档案
+
+    records为(监测站, 小时)的结构化数组，month_starts为每个月第一个小时的下标
+    （最后一个元素为总小时数，所有监测站共用同一时间轴）。
+    """
+    records = np.ascontiguousarray(records)
+    month_starts = np.asarray(month_starts, dtype=np.int64)
+    station_count, hours = records.shape
+    if month_starts[-1] != hours:
+        raise ValueError(f"Month index covers {month_starts[-1]} hours, records have {hours}")
+    header = {
+        'stations': list(stations),
+        'years': [years[0], years[-1]],
+        'fields': list(records.dtype.names),
+        'hours': hours,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    index_offset = _align(len(ARCHIVE_MAGIC) + 4 + len(header_bytes))
+    data_offset = _align(index_offset + station_count * len(month_starts) * 8)
+    station_bytes = hours * records.dtype.itemsize
+    index = (data_offset + np.arange(station_count)[:, None] * station_bytes
+             + month_starts[None, :] * records.dtype.itemsize).astype('<u8')
+
+    preamble = ARCHIVE_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    # 记录直接从数组写入文件，不在内存中再拼接一份整个档案
+    with atomic_open(path) as f:
+        f.write(preamble.ljust(index_offset, b"\0"))
+        f.write(index.tobytes().ljust(data_offset - index_offset, b"\0"))
+        records.tofile(f)
+
+
+class HourlyArchive:
+    """只读打开逐小时档案：数据通过np.memmap映射，只有实际访问的页面才会读入内存
+
+    打开时只读取头部和索引。按年份、月份或字段取数据都是内存映射的视图（零复制）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not an hourly archive")
+            (header_size,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_size))
+        self.stations = header['stations']
+        self.years = list(range(header['years'][0], header['years'][1] + 1))
+        self.fields = header['fields']
+        self.hours = header['hours']
+        self.dtype = record_dtype(self.fields)
+
+        months = len(self.years) * 12
+        index_offset = _align(len(ARCHIVE_MAGIC) + 4 + header_size)
+        self.index = np.fromfile(path, dtype='<u8', count=len(self.stations) * (months + 1),
+                                 offset=index_offset).reshape(len(self.stations), months + 1)
+        # 索引中的字节偏移 -> 每个月第一条记录的下标（所有监测站共用同一时间轴）
+        station_starts = self.index[:, :1]
+        self.month_starts = ((self.index - station_starts) // self.dtype.itemsize)[0].astype(np.int64)
+        self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=int(self.index[0, 0]),
+                                 shape=(len(self.stations), self.hours))
+
+    @property
+    def year_starts(self):
+        """每个年份第一个小时的下标（最后一个元素为总小时数）"""
+        return self.month_starts[::12]
+
+    def _span(self, year, month=None):
+        first = (year - self.years[0]) * 12
+        if not 0 <= first < len(self.years) * 12:
+            raise KeyError(f"{year} is not in the archive")
+        if month is None:
+            return slice(int(self.month_starts[first]), int(self.month_starts[first + 12]))
+        return slice(int(self.month_starts[first + month - 1]), int(self.month_starts[first + month]))
+
+    def station_position(self, station):
+        return self.stations.index(station)
+
+    def year(self, year, station=None):
+        """单个年份的记录(监测站, 小时)；指定station时为(小时,)"""
+        span = self._span(year)
+        if station is None:
+            return self.records[:, span]
+        return self.records[self.station_position(station), span]
+
+    def month(self, year, month, station=None):
+        """单个月份的记录"""
+        span = self._span(year, month)
+        if station is None:
+            return self.records[:, span]
+        return self.records[self.station_position(station), span]
+
+    def channel(self, field):
+        """单个字段在整个档案上的视图(监测站, 小时)"""
+        return self.records[field]
+
+    def to_array(self, fields=None):
+        """把字段读入普通数组(监测站, 小时, 字段)（会读取整个档案）"""
+        fields = fields or self.fields
+        return np.stack([np.asarray(self.records[field]) for field in fields], axis=-1)
+
+    def prefetch(self, year):
+        """内存映射的页面由操作系统按需读入，不需要预读"""
+
+    def close(self):
+        pass
+
+
+def shuffle_bytes(records):
+    """按字节平面重排记录（所有记录的第1个字节、第2个字节……），float32的指数字节集中在一起后更容易压缩"""
+    raw = np.ascontiguousarray(records).view(np.uint8).reshape(len(records), -1)
+    return raw.T.tobytes()
+
+
+def unshuffle_bytes(data, dtype, count):
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, count)
+    return np.ascontiguousarray(planes.T).view(dtype)[:, 0]
+
+
+def write_chunked_archive(path, records, stations, years, month_starts, codec='zlib'):
+    """写入分块压缩档案，参数与write_archive相同；codec为CHUNK_CODECS中的压缩方式"""
+    compress, _ = CHUNK_CODECS[codec]
+    records = np.asarray(records)
+    month_starts = np.asarray(month_starts, dtype=np.int64)
+    station_count, hours = records.shape
+    if month_starts[-1] != hours:
+        raise ValueError(f"Month index covers {month_starts[-1]} hours, records have {hours}")
+    header = {
+        'stations': list(stations),
+        'years': [years[0], years[-1]],
+        'fields': list(records.dtype.names),
+        'hours': hours,
+        'codec': codec,
+        'month_starts': month_starts.tolist(),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    table_offset = _align(len(CHUNKED_MAGIC) + 4 + len(header_bytes))
+    year_starts = month_starts[::12]
+    table = np.zeros((station_count, len(year_starts) - 1), dtype=CHUNK_ENTRY)
+    preamble = CHUNKED_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    with atomic_open(path) as f:
+        # 先为块表预留位置，每块压缩后立即写入，最后回填块表
+        f.write(preamble.ljust(table_offset, b"\0"))
+        f.write(table.tobytes())
+        offset = table_offset + table.nbytes
+        for station in range(station_count):
+            for year_i in range(len(year_starts) - 1):
+                chunk = compress(shuffle_bytes(records[station, year_starts[year_i]:year_starts[year_i + 1]]))
+                table[station, year_i] = (offset, len(chunk), zlib.crc32(chunk))
+                f.write(chunk)
+                offset += len(chunk)
+        f.seek(table_offset)
+        f.write(table.tobytes())
+
+
+class ChunkCache:
+    """解压后数据块的LRU缓存，按字节数限制大小（后台预读线程和主线程共用，需要加锁）"""
+
+    def __init__(self, capacity_mb=DEFAULT_CHUNK_CACHE_MB):
+        self.capacity_bytes = int(capacity_mb * 1024 * 1024)
+        self.used_bytes = 0
+        self._chunks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._chunks
+
+    def get(self, key):
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                self._chunks.move_to_end(key)
+            return chunk
+
+    def put(self, key, chunk):
+        with self._lock:
+            if key in self._chunks:
+                return
+            self._chunks[key] = chunk
+            self.used_bytes += chunk.nbytes
+            # 至少保留刚放入的一块
+            while self.used_bytes > self.capacity_bytes and len(self._chunks) > 1:
+                _, evicted = self._chunks.popitem(last=False)
+                self.used_bytes -= evicted.nbytes
+
+
+class ChunkedArchive:
+    """只读打开分块压缩档案，接口与HourlyArchive相同
+
+    打开时只读取头部和块表。访问某个年份时解压对应的块并放入LRU缓存；
+    播放时用prefetch()在后台线程提前解压下一个年份，避免主线程等待解压。
+    """
+
+    def __init__(self, path, cache_mb=DEFAULT_CHUNK_CACHE_MB):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(CHUNKED_MAGIC)) != CHUNKED_MAGIC:
+                raise ValueError(f"{path} is not a chunked hourly archive")
+            (header_size,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_size))
+        self.stations = header['stations']
+        self.years = list(range(header['years'][0], header['years'][1] + 1))
+        self.fields = header['fields']
+        self.hours = header['hours']
+        self.codec = header['codec']
+        self.dtype = record_dtype(self.fields)
+        self.month_starts = np.asarray(header['month_starts'], dtype=np.int64)
+        table_offset = _align(len(CHUNKED_MAGIC) + 4 + header_size)
+        self.chunks = np.fromfile(path, dtype=CHUNK_ENTRY, count=len(self.stations) * len(self.years),
+                                  offset=table_offset).reshape(len(self.stations), len(self.years))
+        self.cache = ChunkCache(cache_mb)
+        self._pending = set()
+        self._executor = None
+
+    @property
+    def year_starts(self):
+        return self.month_starts[::12]
+
+    @property
+    def compressed_bytes(self):
+        return int(self.chunks['size'].sum())
+
+    def station_position(self, station):
+        return self.stations.index(station)
+
+    def _year_position(self, year):
+        year_i = year - self.years[0]
+        if not 0 <= year_i < len(self.years):
+            raise KeyError(f"{year} is not in the archive")
+        return year_i
+
+    def _decompress(self, station_i, year_i):
+        offset, size, crc = self.chunks[station_i, year_i].tolist()
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+        if zlib.crc32(data) != crc:
+            raise ValueError(f"{self.path}: checksum mismatch in chunk "
+                             f"({self.stations[station_i]}, {self.years[year_i]})")
+        _, decompress = CHUNK_CODECS[self.codec]
+        count = int(self.year_starts[year_i + 1] - self.year_starts[year_i])
+        return unshuffle_bytes(decompress(data), self.dtype, count)
+
+    def chunk(self, station_i, year_i):
+        """单个监测站单个年份的记录（经过缓存）"""
+        key = (station_i, year_i)
+        records = self.cache.get(key)
+        if records is None:
+            records = self._decompress(station_i, year_i)
+            records.flags.writeable = False
+            self.cache.put(key, records)
+        return records
+
+    def year(self, year, station=None):
+        year_i = self._year_position(year)
+        if station is not None:
+            return self.chunk(self.station_position(station), year_i)
+        return np.stack([self.chunk(station_i, year_i) for station_i in range(len(self.stations))])
+
+    def month(self, year, month, station=None):
+        first = self._year_position(year) * 12
+        year_start = self.month_starts[first]
+        span = slice(int(self.month_starts[first + month - 1] - year_start),
+                     int(self.month_starts[first + month] - year_start))
+        return self.year(year, station)[..., span]
+
+    def prefetch(self, year):
+        """在后台线程中解压该年份所有监测站的块（已缓存、正在解压或不在档案中时忽略）"""
+        year_i = year - self.years[0]
+        if not 0 <= year_i < len(self.years) or year_i in self._pending:
+            return
+        if all((station_i, year_i) in self.cache for station_i in range(len(self.stations))):
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-prefetch")
+        self._pending.add(year_i)
+
+        def load():
+            try:
+                for station_i in range(len(self.stations)):
+                    self.chunk(station_i, year_i)
+            finally:
+                self._pending.discard(year_i)
+
+        self._executor.submit(load)
+
+    def channel(self, field):
+        """单个字段在整个档案上的数组(监测站, 小时)"""
+        return self.to_array([field])[..., 0]
+
+    def to_array(self, fields=None):
+        """解压整个档案(监测站, 小时, 字段)；每块只解压一次，且不放入缓存以免挤掉播放用的块"""
+        fields = fields or self.fields
+        values = np.empty((len(self.stations), self.hours, len(fields)), dtype=np.float32)
+        starts = self.year_starts
+        for station_i in range(len(self.stations)):
+            for year_i in range(len(self.years)):
+                records = self.cache.get((station_i, year_i))
+                if records is None:
+                    records = self._decompress(station_i, year_i)
+                span = values[station_i, starts[year_i]:starts[year_i + 1]]
+                for field_i, field in enumerate(fields):
+                    span[:, field_i] = records[field]
+        return values
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def open_archive(path, cache_mb=DEFAULT_CHUNK_CACHE_MB):
+    """按魔数打开未压缩（内存映射）或分块压缩的档案"""
+    with open(path, "rb") as f:
+        magic = f.read(len(ARCHIVE_MAGIC))
+    if magic == CHUNKED_MAGIC:
+        return ChunkedArchive(path, cache_mb)
+    return HourlyArchive(path)
@@ -0,0 +1,87 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+BACKDROP_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKDROP_PATTERN = "HK_AQI_{year}.jpg"
+
+
+def load_backdrop(path, size):
+    """解码、缩放并转换单张背景图片（在后台线程中执行）"""
+    image = pygame.image.load(path)
+    # 纹理后端没有display surface，此时保留解码后的格式
+    converted = pygame.display.get_surface() is not None
+    if image.get_size() != size:
+        image = pygame.transform.smoothscale(image.convert() if converted else image, size)
+    return image.convert() if converted else image
+
+
+class BackdropCache:
+    """年份背景图片缓存
+
+    JPEG解码、缩放和convert()都在后台线程完成；主线程只从LRU缓存中取出
+    已准备好的Surface，缓存总大小受内存预算限制。
+    """
+
+    def __init__(self, size, budget_bytes=48 * 1024 * 1024, directory=BACKDROP_DIR, max_workers=1):
+        self.size = tuple(size)
+        self.budget_bytes = budget_bytes
+        self.directory = directory
+        self.used_bytes = 0
+        self._surfaces = OrderedDict()  # (年份, 尺寸) -> Surface，按最近使用排序
+        self._missing = set()
+        self._futures = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backdrop-loader")
+
+    def path_for(self, year):
+        return os.path.join(self.directory, BACKDROP_PATTERN.format(year=year))
+
+    def request(self, year):
+        """提交后台解码任务（已缓存、正在解码或不存在时忽略）"""
+        key = (year, self.size)
+        if key in self._surfaces or key in self._futures or year in self._missing:
+            return
+        path = self.path_for(year)
+        if not os.path.exists(path):
+            self._missing.add(year)
+            return
+        self._futures[key] = self._executor.submit(load_backdrop, path, self.size)
+
+    def get(self, year):
+        """返回已准备好的背景图片；尚未解码完成时返回None，不会阻塞"""
+        self._collect()
+        key = (year, self.size)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            self.request(year)
+            return None
+        self._surfaces.move_to_end(key)
+        return surface
+
+    def resize(self, size):
+        """窗口尺寸变化后，新的请求按新尺寸解码；旧尺寸的图片会被LRU逐步淘汰"""
+        self.size = tuple(size)
+
+    def _collect(self):
+        for key, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[key]
+            if future.exception() is not None:
+                self._missing.add(key[0])
+                continue
+            surface = future.result()
+            self._surfaces[key] = surface
+            self.used_bytes += surface.get_pitch() * surface.get_height()
+            self._evict()
+
+    def _evict(self):
+        # 超出内存预算时淘汰最久未使用的图片（至少保留一张）
+        while self.used_bytes > self.budget_bytes and len(self._surfaces) > 1:
+            _, surface = self._surfaces.popitem(last=False)
+            self.used_bytes -= surface.get_pitch() * surface.get_height()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+import numpy as np
+
+# 扩展颜色定义和说明
+AQI_LEVELS = [
+    {'range': (0, 50), 'color': (50, 205, 50), 'name': 'Good',
+     'desc': 'Air quality is satisfactory with minimal air pollution'},
+    {'range': (51, 100), 'color': (255, 255, 0), 'name': 'Moderate',
+     'desc': 'Air quality is acceptable but may affect sensitive groups'},
+    {'range': (101, 150), 'color': (255, 165, 0), 'name': 'Unhealthy for Sensitive',
+     'desc': 'Members of sensitive groups may experience health effects'},
+    {'range': (151, 200), 'color': (255, 69, 0), 'name': 'Unhealthy',
+     'desc': 'Everyone may begin to experience health effects'},
+    {'range': (201, 300), 'color': (255, 0, 0), 'name': 'Very Unhealthy',
+     'desc': 'Health warnings of emergency conditions for everyone'},
+    {'range': (301, 500), 'color': (128, 0, 0), 'name': 'Hazardous',
+     'desc': 'Health alert: everyone may experience serious health effects'}
+]
+
+# AQI级别下标（粒子、闪烁、天气等效果都按这些级别判断）
+GOOD, MODERATE, SENSITIVE, UNHEALTHY, VERY_UNHEALTHY, HAZARDOUS = range(len(AQI_LEVELS))
+MISSING_BAND = -1
+MISSING_COLOR = (90, 90, 100)  # 没有读数的区域显示为灰色
+
+
+class BandScale:
+    """按上限（含上限）划分的一组级别，用np.searchsorted一次分类整个数组"""
+
+    def __init__(self, limits, names, colors):
+        self.limits = np.asarray(limits, dtype=np.float64)
+        self.names = list(names)
+        self.colors = list(colors)
+
+    @classmethod
+    def from_levels(cls, levels):
+        return cls([level['range'][1] for level in levels[:-1]],
+                   [level['name'] for level in levels], [level['color'] for level in levels])
+
+    def __len__(self):
+        return len(self.names)
+
+    def limit(self, band):
+        """级别的上限（最高级别没有上限）"""
+        return float(self.limits[band])
+
+    def classify(self, values):
+        """数值数组 -> 级别下标数组（int8）；缺失值（NaN）为MISSING_BAND"""
+        values = np.asarray(values)
+        bands = np.searchsorted(self.limits, values, side='left')
+        return np.where(np.isnan(values), MISSING_BAND, bands).astype(np.int8)
+
+    def band(self, value):
+        """单个数值的级别下标"""
+        return int(self.classify(value))
+
+
+AQI_BANDS = BandScale.from_levels(AQI_LEVELS)
+
+# 香港AQHI的健康风险级别：低(1-3)、中(4-6)、高(7)、甚高(8-10)、严重(10+)
+# 官方以黑色表示“严重”，在深色背景上改用深紫色
+AQHI_LOW, AQHI_MODERATE, AQHI_HIGH, AQHI_VERY_HIGH, AQHI_SERIOUS = range(5)
+AQHI_BANDS = BandScale((3, 6, 7, 10), ('Low', 'Moderate', 'High', 'Very High', 'Serious'),
+                       ((0, 170, 80), (255, 160, 0), (230, 30, 30), (140, 70, 20), (110, 30, 130)))
+
+
+def band_histograms(values, starts, scale):
+    """按时段统计各级别的读数个数
+
+    values为(监测站, 时间)，starts为各时段在时间轴上的起点（最后一个元素为终点）。
+    整个数组只分类一次，再用一次np.bincount累加，返回(监测站, 时段, 级别)的计数。
+    """
+    stations, length = values.shape
+    periods = len(starts) - 1
+    bands = scale.classify(values[:, :starts[-1]])
+    period = np.repeat(np.arange(periods), np.diff(starts))
+    index = (np.arange(stations)[:, None] * periods + period) * len(scale) + bands
+    counts = np.bincount(index[bands != MISSING_BAND], minlength=stations * periods * len(scale))
+    return counts.reshape(stations, periods, len(scale))
+
+
+class BandHistograms:
+    """每个监测站每年处于各级别的小时数和天数（按日最高值分级）
+
+    hours和days为(监测站, 年份, 级别)的计数；通常由from_hourly计算一次后存入磁盘缓存。
+    """
+
+    def __init__(self, hours, days, scale):
+        self.scale = scale
+        self.hours = hours
+        self.days = days
+
+    @classmethod
+    def from_hourly(cls, hourly, year_starts, scale):
+        """hourly为(监测站, 小时)，从年份起点的零时开始；year_starts为各年份第一个小时的下标"""
+        year_starts = np.asarray(year_starts)
+        hours = band_histograms(hourly, year_starts, scale)
+        days = hourly[:, :year_starts[-1]].reshape(hourly.shape[0], -1, 24)
+        days = band_histograms(np.fmax.reduce(days, axis=2), year_starts // 24, scale)
+        return cls(hours, days, scale)
+
+    def fractions(self, unit='hours', station=None):
+        """各年份各级别所占比例(年份, 级别)；station为None时合计所有监测站"""
+        counts = getattr(self, unit)
+        counts = counts.sum(axis=0) if station is None else counts[station]
+        totals = counts.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return counts / totals
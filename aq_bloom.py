@@ -0,0 +1,77 @@
+import numpy as np
+import pygame
+
+from aq_bands import AQI_BANDS, GOOD, UNHEALTHY
+
+BLOOM_THRESHOLD = 170  # 亮度超过该值的像素产生光晕
+BLOOM_GAIN = 1.2
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+HAZE_COLOR = (185, 180, 170)  # 灰褐色烟霾
+HAZE_START_AQI = AQI_BANDS.limit(GOOD)  # Good级别没有烟霾
+HAZE_FULL_AQI = AQI_BANDS.limit(UNHEALTHY)
+HAZE_MAX_ALPHA = 170
+
+
+def box_blur(image, radius):
+    """对(宽, 高, 通道)数组做可分离的盒式模糊（用累加和实现，边缘按零填充）"""
+    size = 2 * radius + 1
+    for axis in (0, 1):
+        pad = [(0, 0)] * image.ndim
+        pad[axis] = (radius + 1, radius)
+        summed = np.moveaxis(np.cumsum(np.pad(image, pad), axis=axis), axis, 0)
+        image = np.moveaxis(summed[size:] - summed[:-size], 0, axis)
+    return image / (size * size)
+
+
+def haze_alpha(aqi):
+    """烟霾层的不透明度随AQI线性增加"""
+    strength = (aqi - HAZE_START_AQI) / (HAZE_FULL_AQI - HAZE_START_AQI)
+    return int(HAZE_MAX_ALPHA * min(1.0, max(0.0, strength)))
+
+
+class BloomPass:
+    """全画面的光晕/烟霾后处理
+
+    把画面缩小到1/downsample后提取高亮像素并模糊，放大后以加法叠加（光晕）；
+    同时把模糊后的画面向烟霾颜色混合，按AQI决定的不透明度覆盖（烟霾）。
+    所有计算都在缩小的缓冲区上进行，每帧开销固定，与粒子数量无关。
+    """
+
+    def __init__(self, size, downsample=4, blur_radius=2):
+        self.downsample = downsample
+        self.blur_radius = blur_radius
+        self.resize(size)
+
+    def resize(self, size):
+        self.size = tuple(size)
+        self.small_size = (max(1, size[0] // self.downsample), max(1, size[1] // self.downsample))
+        self.small = pygame.Surface(self.small_size, depth=32)
+        self.layer = pygame.Surface(self.small_size, depth=32)
+        self.full = pygame.Surface(self.size, depth=32)
+
+    def _composite(self, surface, pixels, alpha=None, additive=False):
+        pygame.surfarray.blit_array(self.layer, pixels)
+        pygame.transform.smoothscale(self.layer, self.size, self.full)
+        if additive:
+            surface.blit(self.full, (0, 0), special_flags=pygame.BLEND_ADD)
+        else:
+            self.full.set_alpha(alpha)
+            surface.blit(self.full, (0, 0))
+
+    def apply(self, surface, aqi):
+        """对surface原地应用光晕和烟霾"""
+        pygame.transform.smoothscale(surface, self.small_size, self.small)
+        scene = pygame.surfarray.array3d(self.small).astype(np.float32)
+
+        # 光晕：按亮度提取高亮部分（保留原色），模糊后加回画面
+        excess = np.clip((scene @ LUMA - BLOOM_THRESHOLD) / (255 - BLOOM_THRESHOLD), 0, 1)
+        bright = scene * excess[..., None]
+        if bright.any():
+            glow = box_blur(bright, self.blur_radius) * BLOOM_GAIN
+            self._composite(surface, np.minimum(glow, 255).astype(np.uint8), additive=True)
+
+        # 烟霾：模糊的画面混合烟霾颜色，空气越差越不透明
+        alpha = haze_alpha(aqi)
+        if alpha > 0:
+            haze = box_blur(scene, self.blur_radius) * 0.4 + np.array(HAZE_COLOR, dtype=np.float32) * 0.6
+            self._composite(surface, haze.astype(np.uint8), alpha=alpha)
@@ -0,0 +1,37 @@
+import contextlib
+import os
+import tempfile
+
+# 缓存目录，可通过环境变量HK_AQ_CACHE_DIR覆盖（例如部署到kiosk的持久化分区）
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hk_air_quality")
+
+
+def cache_dir():
+    return os.environ.get("HK_AQ_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def cache_path(*parts):
+    """返回缓存目录下的路径，并确保其父目录存在"""
+    path = os.path.join(cache_dir(), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def atomic_write(path, data):
+    """原子地写入文件：先写临时文件再替换，避免并发读取到半个文件"""
+    mode = "wb" if isinstance(data, (bytes, bytearray, memoryview)) else "w"
+    with atomic_open(path, mode) as f:
+        f.write(data)
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="wb"):
+    """与atomic_write相同，但返回临时文件供调用者分段写入（大文件不必先在内存中拼接）"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
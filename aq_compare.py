@@ -0,0 +1,109 @@
+import numpy as np
+import pygame
+
+from aq_simulation import ParticleState, step_particles
+
+COMPARISON_LAYOUTS = ('split', 'wipe')  # 左右并排 / 拖动分割线
+COMPARISON_SUBJECTS = ('years', 'districts')
+COMPARISON_PARTICLES = 100  # 每一侧的背景粒子数，两侧合计与单一画面相同
+PANE_GAP = 16  # 并排时两个窗格之间的间距（按布局比例缩放前）
+PANE_HEADER = 30  # 窗格顶部标题栏的高度
+
+
+class ComparisonSide:
+    """对比画面一侧的轻量粒子状态：坐标保存在NumPy数组中，每帧向量化更新一次
+
+    粒子在[left, left + width)的竖条内环绕；颜色、大小和速度由该侧的数值决定。
+    """
+
+    def __init__(self, count, left, width, height, rng):
+        self.rng = rng
+        self.state = ParticleState(count)
+        self.back = ParticleState(count)
+        self.left = left
+        self.width = width
+        self.height = height
+        self.state.x[:] = rng.uniform(0, width, count)
+        self.state.y[:] = rng.uniform(0, height, count)
+        self.state.angle[:] = rng.uniform(0, 2 * np.pi, count)
+        self.color, self.size, self.speed = (255, 255, 255), 0, 0
+
+    def step(self, properties, ticks):
+        self.color, self.size, self.speed = properties
+        step_particles(self.state, self.back, self.speed, ticks, self.width, self.height, self.rng)
+        self.state, self.back = self.back, self.state
+
+    def resize(self, left, width, height):
+        """把粒子按比例移动到新的竖条内"""
+        self.state.x *= width / self.width
+        self.state.y *= height / self.height
+        self.left, self.width, self.height = left, width, height
+
+
+class ComparisonView:
+    """对比模式的状态：比较的对象、两侧的窗格几何和各自的粒子
+
+    subject为'years'时左侧固定为reference_year，右侧跟随播放的年份；为'districts'时
+    两侧显示同一年份的reference_district和district。绘制由AirQualityViz完成，
+    两侧共用过渡表、热力图网格、字体和文字缓存。
+    """
+
+    def __init__(self, size, reference_year, reference_district, district, seed=None):
+        self.subject = 'years'
+        self.reference_year = reference_year
+        self.reference_district = reference_district
+        self.district = district
+        self.wipe = 0.5  # 分割线在地图上的位置（0-1）
+        self.mode = 'split'
+        self.size = tuple(size)
+        rng = np.random.default_rng(seed)
+        self.sides = [ComparisonSide(COMPARISON_PARTICLES, left, width, size[1], rng)
+                      for left, width in self._strips()]
+
+    def _strips(self):
+        width, _ = self.size
+        if self.mode == 'split':
+            return [(0, width // 2), (width // 2, width - width // 2)]
+        return [(0, width), (0, width)]
+
+    def arrange(self, mode, size):
+        """切换布局或画面尺寸变化后重新划分两侧粒子的范围"""
+        self.mode = mode
+        self.size = tuple(size)
+        for side, (left, width) in zip(self.sides, self._strips()):
+            side.resize(left, width, self.size[1])
+
+    def toggle_subject(self):
+        self.subject = COMPARISON_SUBJECTS[1 - COMPARISON_SUBJECTS.index(self.subject)]
+
+    def panes(self, map_rect, gap):
+        """两侧在地图区域中各自占据的矩形；分割线模式下两侧都占满地图区域"""
+        if self.mode == 'wipe':
+            return map_rect.copy(), map_rect.copy()
+        width = (map_rect.width - gap) // 2
+        left = pygame.Rect(map_rect.left, map_rect.top, width, map_rect.height)
+        right = pygame.Rect(map_rect.right - width, map_rect.top, width, map_rect.height)
+        return left, right
+
+    def wipe_x(self, map_rect):
+        return map_rect.left + int(self.wipe * map_rect.width)
+
+    def follow(self, pos, map_rect):
+        """分割线模式下跟随地图区域内的鼠标"""
+        if self.mode == 'wipe' and map_rect.collidepoint(pos):
+            self.wipe = (pos[0] - map_rect.left) / max(1, map_rect.width)
+
+    def clips(self, map_rect, gap):
+        """两侧绘制时的裁剪矩形"""
+        if self.mode == 'split':
+            return self.panes(map_rect, gap)
+        x = self.wipe_x(map_rect)
+        return (pygame.Rect(map_rect.left, map_rect.top, x - map_rect.left, map_rect.height),
+                pygame.Rect(x, map_rect.top, map_rect.right - x, map_rect.height))
+
+    def visible(self, index, x, map_rect):
+        """分割线模式下只显示位于本侧的粒子（x为画布坐标数组）"""
+        if self.mode == 'split':
+            return np.ones(len(x), dtype=bool)
+        wipe_x = self.wipe_x(map_rect)
+        return x < wipe_x if index == 0 else x >= wipe_x
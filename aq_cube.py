@@ -0,0 +1,213 @@
+import warnings
+
+import numpy as np
+
+MONTHS = tuple(range(1, 13))
+
+
+class AQCube:
+    """空气质量数据立方体
+
+    所有数据保存在一个连续的float32数组values[区域, 年份, 月份, 污染物]中。
+    尚未加载的年份为NaN。按标签切片返回原数组的视图（不复制），
+    常用的聚合结果在数据版本变化时重新计算一次并缓存。
+    """
+
+    AXES = ('district', 'year', 'month', 'pollutant')
+
+    def __init__(self, districts, years, pollutants=('AQI',)):
+        self.districts = list(districts)
+        self.years = list(years)
+        self.months = list(MONTHS)
+        self.pollutants = list(pollutants)
+        self.values = np.full((len(self.districts), len(self.years), len(self.months), len(self.pollutants)),
+                              np.nan, dtype=np.float32)
+        self.loaded = np.zeros(len(self.years), dtype=bool)
+        self.version = 0  # 每次写入数据后递增，用于让缓存失效
+
+        self._labels = dict(zip(self.AXES, (self.districts, self.years, self.months, self.pollutants)))
+        self._positions = {axis: {label: i for i, label in enumerate(labels)}
+                           for axis, labels in self._labels.items()}
+        self._reductions_version = -1
+        self._district_year_mean = None
+        self._territory_year_mean = None
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def position(self, axis, label):
+        """把单个标签转换为数组下标"""
+        try:
+            return self._positions[axis][label]
+        except KeyError:
+            raise KeyError(f"{label!r} is not a valid {axis} label") from None
+
+    def _indexer(self, axis, label):
+        # None表示整个轴；(起, 止)元组表示闭区间标签范围；其他值为单个标签
+        if label is None:
+            return slice(None)
+        if isinstance(label, tuple):
+            start, stop = label
+            return slice(self.position(axis, start), self.position(axis, stop) + 1)
+        return self.position(axis, label)
+
+    def sel(self, district=None, year=None, month=None, pollutant=None):
+        """按标签切片，返回values的视图（零复制）"""
+        return self.values[self._indexer('district', district),
+                           self._indexer('year', year),
+                           self._indexer('month', month),
+                           self._indexer('pollutant', pollutant)]
+
+    def is_loaded(self, year):
+        return year in self._positions['year'] and bool(self.loaded[self.position('year', year)])
+
+    @property
+    def loaded_years(self):
+        return [year for year, loaded in zip(self.years, self.loaded) if loaded]
+
+    def append_year(self, year):
+        """把年份轴延长到year（用于实时数据），新增的年份为NaN"""
+        new_years = list(range(self.years[-1] + 1, year + 1))
+        if not new_years:
+            return
+        shape = list(self.values.shape)
+        shape[1] = len(new_years)
+        self.values = np.concatenate([self.values, np.full(shape, np.nan, dtype=np.float32)], axis=1)
+        self.loaded = np.concatenate([self.loaded, np.zeros(len(new_years), dtype=bool)])
+        self.years.extend(new_years)
+        self._positions['year'] = {label: i for i, label in enumerate(self.years)}
+        self.version += 1
+
+    def fill_year(self, year, block):
+        """写入单个年份的数据，block形状为(区域, 月份, 污染物)"""
+        i = self.position('year', year)
+        self.values[:, i] = block
+        self.loaded[i] = True
+        self.version += 1
+
+    def fill_pollutants(self, pollutants, values):
+        """写入部分污染物的数据，values形状为(区域, 年份, 月份, 污染物)，从第一个年份开始
+
+        不改变年份的加载状态：尚未加载的年份在加载时由调用者一并写入这些污染物。
+        """
+        indices = [self.position('pollutant', pollutant) for pollutant in pollutants]
+        self.values[:, :values.shape[1], :, indices] = values
+        self.version += 1
+
+    def _update_reductions(self):
+        if self._reductions_version == self.version:
+            return
+        # 忽略缺失的月份（实时数据的当年可能只有部分月份）；未加载的年份保持NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            self._district_year_mean = np.nanmean(self.values, axis=2)
+            self._territory_year_mean = np.nanmean(self._district_year_mean, axis=0)
+        self._reductions_version = self.version
+
+    def district_year_means(self, pollutant='AQI'):
+        """各区域年均值，形状为(区域, 年份)"""
+        self._update_reductions()
+        return self._district_year_mean[:, :, self.position('pollutant', pollutant)]
+
+    def territory_year_means(self, pollutant='AQI'):
+        """全港（各区域平均）年均值，形状为(年份,)"""
+        self._update_reductions()
+        return self._territory_year_mean[:, self.position('pollutant', pollutant)]
+
+    def year_mean(self, year, district=None, pollutant='AQI'):
+        """单个年份的年均值；district为None时返回全港平均"""
+        year_i = self.position('year', year)
+        if district is None:
+            return float(self.territory_year_means(pollutant)[year_i])
+        return float(self.district_year_means(pollutant)[self.position('district', district), year_i])
+
+
+class TimeWindowIndex:
+    """时间轴前缀和索引
+
+    沿展开后的月份时间轴（年份×月份）为每个区域和全港平均建立累计和与累计平方和，
+    任意时间窗口的均值和标准差都只需两次查表（O(1)）。数据立方体更新后自动重建。
+    """
+
+    def __init__(self, cube):
+        self.cube = cube
+        self.version = -1
+        self._rolling = {}
+
+    @property
+    def length(self):
+        """时间轴长度（月数）"""
+        return len(self.cube.years) * len(self.cube.months)
+
+    def time_position(self, year, month=1):
+        """把(年份, 月份)转换为时间轴下标"""
+        return (year - self.cube.years[0]) * len(self.cube.months) + (month - 1)
+
+    def _refresh(self):
+        if self.version == self.cube.version:
+            return
+        values = self.cube.values
+        districts = values.reshape(values.shape[0], -1, values.shape[3]).astype(np.float64)
+        # 最后一行为全港平均（忽略个别区域缺失的月份）
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            territory = np.nanmean(districts, axis=0, keepdims=True)
+        series = np.concatenate([districts, territory], axis=0)
+        valid = ~np.isnan(series)
+        series[~valid] = 0.0
+
+        shape = (series.shape[0], series.shape[1] + 1, series.shape[2])
+        self._sum = np.zeros(shape)
+        self._sq_sum = np.zeros(shape)
+        self._count = np.zeros(shape, dtype=np.int64)
+        np.cumsum(series, axis=1, out=self._sum[:, 1:])
+        np.cumsum(series * series, axis=1, out=self._sq_sum[:, 1:])
+        np.cumsum(valid, axis=1, out=self._count[:, 1:])
+        self._rolling = {}
+        self.version = self.cube.version
+
+    def _row(self, district):
+        return len(self.cube.districts) if district is None else self.cube.position('district', district)
+
+    def _stats(self, rows, start, stop, pollutant_i):
+        count = self._count[rows, stop, pollutant_i] - self._count[rows, start, pollutant_i]
+        total = self._sum[rows, stop, pollutant_i] - self._sum[rows, start, pollutant_i]
+        sq_total = self._sq_sum[rows, stop, pollutant_i] - self._sq_sum[rows, start, pollutant_i]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            std = np.sqrt(np.maximum(sq_total / count - mean * mean, 0.0))
+        return mean, std
+
+    def window_stats(self, start, stop, district=None, pollutant='AQI'):
+        """时间轴区间[start, stop)的(均值, 标准差)；district为None时为全港平均"""
+        self._refresh()
+        start, stop = max(0, start), min(self.length, stop)
+        if stop <= start:
+            return float('nan'), float('nan')
+        mean, std = self._stats(self._row(district), start, stop, self.cube.position('pollutant', pollutant))
+        return float(mean), float(std)
+
+    def district_window_stats(self, start, stop, pollutant='AQI'):
+        """所有区域在区间[start, stop)的(均值数组, 标准差数组)"""
+        self._refresh()
+        start, stop = max(0, start), min(self.length, stop)
+        rows = np.arange(len(self.cube.districts))
+        return self._stats(rows, start, max(start, stop), self.cube.position('pollutant', pollutant))
+
+    def rolling_mean(self, months, district=None, pollutant='AQI'):
+        """以每个月为结尾的滑动平均，窗口内数据不完整的位置为NaN"""
+        self._refresh()
+        key = (months, district, pollutant)
+        if key not in self._rolling:
+            row = self._row(district)
+            pollutant_i = self.cube.position('pollutant', pollutant)
+            ends = np.arange(1, self.length + 1)
+            starts = np.maximum(ends - months, 0)
+            count = self._count[row, ends, pollutant_i] - self._count[row, starts, pollutant_i]
+            total = self._sum[row, ends, pollutant_i] - self._sum[row, starts, pollutant_i]
+            rolling = np.full(self.length, np.nan)
+            full = count == months
+            rolling[full] = total[full] / months
+            self._rolling[key] = rolling
+        return self._rolling[key]
@@ -0,0 +1,215 @@
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pygame
+
+import hk_air_quality_super_enhanced as app
+from aq_aqhi import AQHIArchive
+
+EXPORT_FORMATS = ('mp4', 'gif', 'png')
+SIMULATION_FPS = 60  # 与交互模式相同：每个模拟步对应1/60秒
+DEFAULT_WARMUP_SECONDS = 3.0
+
+
+def timeline_frames(fps):
+    """完整播放一遍（每年AUTOPLAY_FRAMES个模拟步）需要的输出帧数"""
+    total_steps = len(app.YEARS) * app.AUTOPLAY_FRAMES
+    return int(total_steps * fps / SIMULATION_FPS)
+
+
+def plan_chunks(total_frames, chunk_count):
+    """把[0, total_frames)平均分成chunk_count段，返回[(起, 止)]"""
+    bounds = np.linspace(0, total_frames, chunk_count + 1).round().astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def chunk_seed(seed, index):
+    """每个分段的确定性随机种子（与进程调度顺序无关）"""
+    return int(np.random.SeedSequence([seed, index]).generate_state(1)[0])
+
+
+def find_ffmpeg():
+    path = shutil.which('ffmpeg')
+    if path is None:
+        raise RuntimeError("ffmpeg is required for MP4/GIF export (PNG sequences work without it)")
+    return path
+
+
+class SegmentWriter:
+    """把一个分段的帧写成PNG序列或MP4片段"""
+
+    def __init__(self, fmt, directory, index, size, fps):
+        self.fmt = fmt
+        self.directory = directory
+        self.process = None
+        self.path = directory
+        if fmt == 'mp4':
+            self.path = os.path.join(directory, f"segment_{index:04d}.mp4")
+            self.process = subprocess.Popen(
+                [find_ffmpeg(), '-y', '-loglevel', 'error',
+                 '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{size[0]}x{size[1]}", '-r', str(fps), '-i', '-',
+                 '-c:v', 'libx264', '-preset', 'medium', '-crf', '18', '-pix_fmt', 'yuv420p', self.path],
+                stdin=subprocess.PIPE)
+
+    def write(self, surface, frame):
+        if self.process is not None:
+            self.process.stdin.write(pygame.image.tobytes(surface, 'RGB'))
+        else:
+            # PNG序列（GIF也先输出PNG，拼接时统一生成调色板）使用全局帧号命名，不需要再拼接
+            pygame.image.save(surface, os.path.join(self.directory, f"frame_{frame:06d}.png"))
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed while writing {self.path}")
+
+
+def render_chunk(index, start, stop, settings):
+    """在独立进程中渲染输出帧[start, stop)
+
+    分段从start之前warmup_steps个模拟步开始模拟（不输出），让粒子和特效
+    进入稳定状态；随机数和动画时钟都由分段号和帧号决定，结果可以复现。
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    random.seed(chunk_seed(settings['seed'], index))
+
+    # 直接按输出分辨率渲染（布局随画布尺寸缩放），不需要再缩放画面
+    screen = app.init_display(settings['size'])
+    viz = app.AirQualityViz(seed=settings['dataset_seed'], size=settings['size'])
+    viz.load_all_years()
+
+    steps_per_frame = SIMULATION_FPS / settings['fps']
+    first_step = round(start * steps_per_frame)
+    step = max(0, first_step - settings['warmup_steps'])
+
+    # 跳到预热起点：自动播放每AUTOPLAY_FRAMES步前进一年
+    year_index, viz.autoplay_frames = divmod(step, app.AUTOPLAY_FRAMES)
+    viz.year = viz.target_year = app.YEARS[year_index % len(app.YEARS)]
+    clock = [0]
+    app.set_animation_clock(lambda: clock[0])
+
+    writer = SegmentWriter(settings['format'], settings['directory'], index, settings['size'], settings['fps'])
+    try:
+        for frame in range(start, stop):
+            target_step = round(frame * steps_per_frame)
+            while step <= target_step:
+                clock[0] = step * 1000 // SIMULATION_FPS
+                viz.update_particles()
+                viz.update_data_effects()
+                if step == target_step:
+                    viz.draw(screen)
+                    writer.write(screen, frame)
+                viz.advance_autoplay()
+                step += 1
+    finally:
+        writer.close()
+        app.set_animation_clock(None)
+        viz.close()  # pygame保持初始化：同一进程会继续渲染后续分段，且字体对象有缓存
+    return writer.path
+
+
+def stitch(fmt, segments, directory, output, fps):
+    """按顺序拼接各分段的输出"""
+    if fmt == 'mp4':
+        list_path = os.path.join(directory, 'segments.txt')
+        with open(list_path, 'w') as f:
+            f.writelines(f"file '{os.path.abspath(path)}'\n" for path in segments)
+        subprocess.run([find_ffmpeg(), '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', list_path, '-c', 'copy', output], check=True)
+    elif fmt == 'gif':
+        subprocess.run([find_ffmpeg(), '-y', '-loglevel', 'error', '-framerate', str(fps),
+                        '-i', os.path.join(directory, 'frame_%06d.png'),
+                        '-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse', '-loop', '0', output],
+                       check=True)
+
+
+def export(output, fmt=None, size=(app.WIDTH, app.HEIGHT), fps=30, workers=None, chunks=None,
+           warmup_seconds=DEFAULT_WARMUP_SECONDS, seed=0, dataset_seed=app.DATASET_SEED):
+    """把1993-2023年的完整播放导出为MP4、GIF或PNG序列（PNG时output为目录）"""
+    fmt = fmt or os.path.splitext(output)[1].lstrip('.').lower() or 'png'
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format {fmt!r}")
+    if not 0 < fps <= SIMULATION_FPS:
+        raise ValueError(f"fps must be between 1 and {SIMULATION_FPS}")
+    if fmt == 'mp4' and (size[0] % 2 or size[1] % 2):
+        raise ValueError("MP4 export needs an even width and height")
+    if fmt != 'png':
+        find_ffmpeg()
+
+    # 先在主进程生成数据集快照和逐小时AQHI档案（连同其月均值和级别统计快照），
+    # 各渲染进程直接打开，不会在冷缓存时各自重复合成并同时写入同一批缓存文件
+    dataset = app.load_dataset(dataset_seed)
+    aqhi = AQHIArchive(dataset[..., 0], app.DISTRICTS, app.YEARS, dataset_seed, app.DATASET_VERSION)
+    aqhi.join()
+    aqhi.close()
+    workers = workers or os.cpu_count() or 1
+    total_frames = timeline_frames(fps)
+    plan = plan_chunks(total_frames, chunks or workers * 2)
+
+    if fmt == 'png':
+        os.makedirs(output, exist_ok=True)
+        work_dir = None
+        directory = output
+    else:
+        work_dir = tempfile.TemporaryDirectory(prefix='aq-export-', dir=os.path.dirname(os.path.abspath(output)))
+        directory = work_dir.name
+
+    settings = {
+        'format': fmt,
+        'directory': directory,
+        'size': tuple(size),
+        'fps': fps,
+        'seed': seed,
+        'dataset_seed': dataset_seed,
+        'warmup_steps': round(warmup_seconds * SIMULATION_FPS),
+    }
+    started = time.perf_counter()
+    try:
+        segments = [None] * len(plan)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(plan)), mp_context=context) as pool:
+            futures = {pool.submit(render_chunk, index, start, stop, settings): index
+                       for index, (start, stop) in enumerate(plan)}
+            for done, future in enumerate(as_completed(futures), 1):
+                segments[futures[future]] = future.result()
+                print(f"chunk {done}/{len(plan)} rendered ({time.perf_counter() - started:.1f}s)")
+        stitch(fmt, segments, directory, output, fps)
+    finally:
+        if work_dir is not None:
+            work_dir.cleanup()
+    print(f"Exported {total_frames} frames at {size[0]}x{size[1]} to {output} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return total_frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the 1993-2023 playback to MP4, GIF or a PNG sequence")
+    parser.add_argument("output", help="输出文件（.mp4/.gif）或PNG序列的目录")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="默认根据输出文件扩展名判断")
+    parser.add_argument("--size", type=app.parse_size, default=(app.WIDTH, app.HEIGHT), help="输出分辨率，例如3840x2560")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--workers", type=int, help="渲染进程数（默认为CPU核数）")
+    parser.add_argument("--chunks", type=int, help="分段数（默认为进程数的两倍）")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP_SECONDS, help="每个分段的预热秒数")
+    parser.add_argument("--seed", type=int, default=0, help="渲染随机种子（相同种子输出相同的画面）")
+    parser.add_argument("--dataset-seed", type=int, default=app.DATASET_SEED)
+    args = parser.parse_args(argv)
+    try:
+        export(args.output, args.format, args.size, args.fps, args.workers, args.chunks,
+               args.warmup, args.seed, args.dataset_seed)
+    except (RuntimeError, ValueError) as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
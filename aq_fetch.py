@@ -0,0 +1,155 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from aq_cache import atomic_write, cache_path
+
+# 文件名模板；基础URL由调用方提供（测试时指向本地HTTP替代服务）
+YEAR_FILE_TEMPLATE = "{year}.csv"
+CURRENT_FILE_NAME = "current.csv"
+
+
+class FetchResult:
+    """单个文件的下载结果"""
+    __slots__ = ('url', 'path', 'changed', 'status', 'size')
+
+    def __init__(self, url, path, changed, status, size):
+        self.url = url
+        self.path = path
+        self.changed = changed  # 本次是否下载了新内容
+        self.status = status
+        self.size = size
+
+
+class EPDFetcher:
+    """环保署历史及当前数据文件的下载器
+
+    所有请求共享一个带连接池和重试的requests.Session；已缓存的文件通过
+    ETag/Last-Modified发送条件请求，服务器返回304时直接使用磁盘缓存，
+    因此刷新30年的文件只会传输发生变化的部分。
+    """
+
+    def __init__(self, base_url, max_workers=8, timeout=30.0, session=None):
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or self._create_session(max_workers)
+
+    @staticmethod
+    def _create_session(pool_size):
+        session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def url_for(self, name):
+        return f"{self.base_url}/{name}"
+
+    def cache_paths(self, url):
+        """返回缓存文件和元数据文件的路径"""
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        name = os.path.basename(url.split('?')[0]) or 'index'
+        body_path = cache_path('http', f"{key}-{name}")
+        return body_path, body_path + '.meta.json'
+
+    def fetch(self, name):
+        """下载单个文件（使用条件请求），返回FetchResult"""
+        url = self.url_for(name)
+        body_path, meta_path = self.cache_paths(url)
+        meta = {}
+        if os.path.exists(body_path):
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                response.content  # 读完（空的）响应体，连接才会放回连接池复用
+                return FetchResult(url, body_path, False, 304, os.path.getsize(body_path))
+            response.raise_for_status()
+
+            # 先流式写入临时文件，完成后再替换缓存，避免留下半个文件
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path), prefix='.tmp-')
+            size = 0
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                        size += len(chunk)
+                os.replace(tmp_path, body_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+            meta = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            }
+        atomic_write(meta_path, json.dumps(meta, indent=2))
+        return FetchResult(url, body_path, True, 200, size)
+
+    def fetch_many(self, names):
+        """并行下载多个文件，返回{文件名: FetchResult}"""
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='epd-fetch') as executor:
+            return dict(zip(names, executor.map(self.fetch, names)))
+
+    def fetch_years(self, years):
+        """并行下载各年份的历史数据文件，返回{年份: FetchResult}"""
+        years = list(years)
+        results = self.fetch_many([YEAR_FILE_TEMPLATE.format(year=year) for year in years])
+        return dict(zip(years, results.values()))
+
+    def fetch_current(self):
+        """下载当前数据文件"""
+        return self.fetch(CURRENT_FILE_NAME)
+
+    def close(self):
+        self.session.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download EPD historical and current air-quality files")
+    parser.add_argument("base_url", help="数据文件所在的基础URL")
+    parser.add_argument("--first-year", type=int, default=1993)
+    parser.add_argument("--last-year", type=int, default=2023)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--no-current", action="store_true", help="不下载当前数据文件")
+    args = parser.parse_args(argv)
+
+    fetcher = EPDFetcher(args.base_url, max_workers=args.workers)
+    started = time.perf_counter()
+    results = list(fetcher.fetch_years(range(args.first_year, args.last_year + 1)).values())
+    if not args.no_current:
+        results.append(fetcher.fetch_current())
+    fetcher.close()
+
+    changed = sum(result.changed for result in results)
+    not_modified = sum(result.status == 304 for result in results)
+    downloaded = sum(result.size for result in results if result.changed)
+    print(f"{len(results)} files, {changed} changed, {not_modified} not modified, "
+          f"{downloaded} bytes downloaded in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pygame
+
+from aq_snapshot import load_or_build_snapshot
+
+# 各区域监测站的大致经纬度（东经, 北纬）
+STATION_COORDINATES = {
+    'Central & Western': (114.144, 22.285),
+    'Eastern': (114.219, 22.283),
+    'Southern': (114.168, 22.247),
+    'Wan Chai': (114.173, 22.279),
+    'Kowloon City': (114.190, 22.328),
+    'Kwun Tong': (114.224, 22.310),
+    'Sham Shui Po': (114.159, 22.330),
+    'Wong Tai Sin': (114.196, 22.342),
+    'Yau Tsim Mong': (114.172, 22.312),
+}
+MAP_BOUNDS = (114.12, 22.225, 114.25, 22.36)  # 西、南、东、北
+
+HEATMAP_VERSION = 1  # 修改插值方法或网格时必须递增
+GRID_SIZE = (96, 52)  # 与区域地图的宽高比大致相同
+IDW_POWER = 2.0
+HEATMAP_MAX_AQI = 150  # 与get_color_for_value的默认范围相同
+
+
+def station_positions(districts):
+    """监测站在地图上的归一化坐标(0-1, 0-1)，y轴向下"""
+    west, south, east, north = MAP_BOUNDS
+    positions = np.array([STATION_COORDINATES[district] for district in districts], dtype=float)
+    u = (positions[:, 0] - west) / (east - west)
+    v = (north - positions[:, 1]) / (north - south)
+    return np.column_stack([u, v])
+
+
+def idw_weights(districts, grid_size=GRID_SIZE, power=IDW_POWER):
+    """反距离加权的权重矩阵，形状为(网格单元数, 监测站数)，每行之和为1
+
+    距离以网格单元为单位计算，因此在屏幕上各方向的影响范围相同。
+    """
+    width, height = grid_size
+    stations = station_positions(districts) * (width, height)
+    gx, gy = np.meshgrid(np.arange(width) + 0.5, np.arange(height) + 0.5, indexing='ij')
+    cells = np.column_stack([gx.ravel(), gy.ravel()])
+    distance = np.linalg.norm(cells[:, None, :] - stations[None, :, :], axis=2)
+    weights = 1.0 / np.maximum(distance, 0.5) ** power
+    return (weights / weights.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def interpolate_year(block, weights, grid_size=GRID_SIZE):
+    """插值一个年份的月度读数：block为(区域, 月份)，返回(月份, 网格宽, 网格高)
+
+    缺少读数（NaN）的监测站不参与该月的插值，其余监测站的权重重新归一化。
+    """
+    block = np.asarray(block, dtype=np.float32)
+    valid = ~np.isnan(block)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grids = (weights @ np.where(valid, block, 0)) / (weights @ valid)
+    return grids.T.reshape(-1, *grid_size)
+
+
+def build_heatmap_grids(dataset, districts, grid_size=GRID_SIZE, workers=None, channel=0):
+    """在进程池中为每个年份插值月度网格（dataset的第channel个污染物），返回(年份, 月份, 网格宽, 网格高)"""
+    weights = idw_weights(districts, grid_size)
+    blocks = [np.array(dataset[:, i, :, channel]) for i in range(dataset.shape[1])]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        grids = [interpolate_year(block, weights, grid_size) for block in blocks]
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            grids = list(pool.map(interpolate_year, blocks, [weights] * len(blocks),
+                                  [grid_size] * len(blocks)))
+    return np.stack(grids).astype(np.float32)
+
+
+class HeatmapGrids:
+    """单个污染物按年份缓存的插值网格
+
+    首次使用时在后台线程中加载磁盘缓存（不存在时用进程池计算并保存），
+    就绪之前ready为False；加载失败时错误记录在error中，ready保持False。
+    数据集之外的年份（实时数据）在主线程中插值一次并缓存。
+    dataset也可以是返回数组的函数，只在需要计算网格时（在后台线程中）调用。
+    """
+
+    def __init__(self, dataset, districts, years, seed, dataset_version, pollutant='AQI', channel=0, workers=None):
+        self.pollutant = pollutant
+        self.districts = list(districts)
+        self.years = list(years)
+        self.weights = idw_weights(self.districts)
+        self.monthly = None
+        self.annual = None
+        self._extra = {}  # (年份, 数据版本) -> 年均网格
+        self.error = None
+
+        def build(_seed):
+            values = dataset() if callable(dataset) else dataset
+            grids = build_heatmap_grids(values, self.districts, workers=workers, channel=channel)
+            return grids, {'districts': self.districts, 'years': [self.years[0], self.years[-1]],
+                           'grid_size': list(GRID_SIZE)}
+
+        def load():
+            try:
+                name = f"{pollutant.lower()}-heatmap-{GRID_SIZE[0]}x{GRID_SIZE[1]}"
+                monthly, _ = load_or_build_snapshot(name, f"{dataset_version}.{HEATMAP_VERSION}", seed, build)
+                self.annual = np.asarray(monthly).mean(axis=1)
+                self.monthly = monthly
+            except Exception as error:
+                self.error = error
+                warnings.warn(f"{pollutant} heatmap unavailable: {error!r}")
+
+        self._thread = threading.Thread(target=load, name="heatmap-loader", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        return self.monthly is not None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def year_grid(self, year, cube):
+        """单个年份的年均网格；没有数据时返回None"""
+        if year in self.years:
+            return self.annual[year - self.years[0]] if self.ready else None
+        if not cube.is_loaded(year):
+            return None
+        key = (year, cube.version)
+        if key not in self._extra:
+            block = cube.sel(year=year, pollutant=self.pollutant)
+            months = ~np.isnan(block).all(axis=0)
+            grid = None
+            if months.any():
+                grid = interpolate_year(block[:, months], self.weights).mean(axis=0)
+            self._extra = {key: grid}  # 只保留最近一个实时年份
+        return self._extra[key]
+
+    def blended(self, year, cube, next_year):
+        """年份过渡时在两个缓存网格之间线性混合，不重新插值"""
+        current = int(year)
+        fraction = year - current
+        grid = self.year_grid(current, cube)
+        if grid is None or fraction <= 0 or next_year == current:
+            return grid
+        upcoming = self.year_grid(next_year, cube)
+        if upcoming is None:
+            return grid
+        return grid * (1 - fraction) + upcoming * fraction
+
+
+class HeatmapRenderer:
+    """把网格通过颜色查找表着色，平滑放大后绘制到地图区域
+
+    查找表覆盖color_for_value的整个AQI色阶，max_value为网格数值中对应色阶顶端的值。
+    """
+
+    def __init__(self, color_for_value, max_value=HEATMAP_MAX_AQI):
+        self.buffer = pygame.Surface(GRID_SIZE, depth=32)
+        values = np.linspace(0, HEATMAP_MAX_AQI, 256)
+        self.lut = np.array([self.buffer.map_rgb(color_for_value(value)) for value in values], dtype=np.uint32)
+        self.max_value = max_value
+        self._scaled = None
+
+    def draw(self, screen, grid, rect):
+        index = np.clip(grid * (255 / self.max_value), 0, 255).astype(np.intp)
+        pygame.surfarray.blit_array(self.buffer, self.lut[index])
+        if self._scaled is None or self._scaled.get_size() != rect.size:
+            self._scaled = pygame.Surface(rect.size, depth=32)
+        pygame.transform.smoothscale(self.buffer, rect.size, self._scaled)
+        screen.blit(self._scaled, rect.topleft)
@@ -0,0 +1,214 @@
+import csv
+import json
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+
+class Reading:
+    """单条实时读数"""
+    __slots__ = ('timestamp', 'district', 'aqi')
+
+    def __init__(self, timestamp, district, aqi):
+        self.timestamp = timestamp
+        self.district = district
+        self.aqi = aqi
+
+
+def parse_timestamp(value):
+    """解析ISO 8601字符串或Unix时间戳，返回本地时间的datetime"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def parse_record(record):
+    """把一条CSV/JSON记录转换为Reading；字段不完整时返回None"""
+    try:
+        value = record.get('aqi', record.get('value'))
+        return Reading(parse_timestamp(record['timestamp']), record['district'].strip(), float(value))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+class FileTailer:
+    """增量读取不断追加的CSV或JSONL文件（类似tail -f）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self.offset = 0
+        self.fieldnames = None
+        self._partial = b''
+
+    def read(self):
+        """返回自上次读取以来新增的完整记录"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            # 文件被截断或轮换，从头开始读取
+            self.offset, self.fieldnames, self._partial = 0, None, b''
+        if size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = self._partial + f.read(size - self.offset)
+        self.offset = size
+
+        lines = data.split(b'\n')
+        self._partial = lines.pop()  # 最后一行可能还没有写完
+        records = []
+        for line in lines:
+            line = line.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            if not self.is_csv:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+            elif self.fieldnames is None:
+                self.fieldnames = next(csv.reader([line]))
+            else:
+                records.append(dict(zip(self.fieldnames, next(csv.reader([line])))))
+        return records
+
+
+class HttpPoller:
+    """轮询本地HTTP接口（EPD AQHI接口的替代服务），接口返回JSON记录列表"""
+
+    def __init__(self, url, timeout=5.0):
+        import requests  # 只在实时模式下需要
+
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._seen = set()
+
+    def read(self):
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+        records = payload.get('readings', []) if isinstance(payload, dict) else payload
+        fresh = []
+        for record in records:
+            key = (str(record.get('timestamp')), str(record.get('district')))
+            if key not in self._seen:
+                self._seen.add(key)
+                fresh.append(record)
+        # 只记住最近的键，避免集合无限增长
+        if len(self._seen) > 100000:
+            self._seen = {(str(r.get('timestamp')), str(r.get('district'))) for r in records}
+        return fresh
+
+
+class LiveFeed:
+    """在后台线程中跟踪实时数据源，主线程每帧通过drain()领取新读数"""
+
+    def __init__(self, source, interval=None):
+        if source.startswith(('http://', 'https://')):
+            self.reader = HttpPoller(source)
+            self.interval = 10.0 if interval is None else interval
+        else:
+            self.reader = FileTailer(source)
+            self.interval = 1.0 if interval is None else interval
+        self.source = source
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                readings = [r for r in map(parse_record, self.reader.read()) if r is not None]
+                self.last_error = None
+                if readings:
+                    self._queue.put(readings)
+            except Exception as error:  # 数据源暂时不可用时继续重试
+                self.last_error = error
+            self._stop.wait(self.interval)
+
+    def drain(self):
+        """返回后台线程收到的所有新读数，不会阻塞"""
+        readings = []
+        while True:
+            try:
+                readings.extend(self._queue.get_nowait())
+            except queue.Empty:
+                return readings
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+
+class LiveStore:
+    """实时读数的有界存储
+
+    原始读数只保留最近retention_hours小时（另有条数上限），
+    每个区域的月度累计和与计数按年份保存，用于写入数据立方体。
+    """
+
+    def __init__(self, districts, retention_hours=24, max_readings=200000):
+        self.districts = list(districts)
+        self._district_index = {district: i for i, district in enumerate(self.districts)}
+        self.retention_seconds = retention_hours * 3600
+        self.readings = deque(maxlen=max_readings)
+        self.latest = {}  # 区域 -> 最近一条读数
+        self._sums = {}  # 年份 -> [区域, 月份]累计和
+        self._counts = {}
+        self.ignored = 0
+
+    def add(self, readings, first_year):
+        """追加读数，返回有新数据的年份集合；first_year之前的年份属于历史档案，直接忽略"""
+        changed = set()
+        for reading in readings:
+            district_i = self._district_index.get(reading.district)
+            year = reading.timestamp.year
+            if district_i is None or year < first_year:
+                self.ignored += 1
+                continue
+            if year not in self._sums:
+                self._sums[year] = np.zeros((len(self.districts), 12))
+                self._counts[year] = np.zeros((len(self.districts), 12), dtype=np.int64)
+            month_i = reading.timestamp.month - 1
+            self._sums[year][district_i, month_i] += reading.aqi
+            self._counts[year][district_i, month_i] += 1
+            changed.add(year)
+
+            self.readings.append(reading)
+            previous = self.latest.get(reading.district)
+            if previous is None or reading.timestamp >= previous.timestamp:
+                self.latest[reading.district] = reading
+        self._evict()
+        return changed
+
+    def _evict(self):
+        if not self.readings:
+            return
+        newest = max(reading.timestamp for reading in self.latest.values())
+        while self.readings and (newest - self.readings[0].timestamp).total_seconds() > self.retention_seconds:
+            self.readings.popleft()
+
+    def monthly_means(self, year):
+        """指定年份各区域的月均值，形状为(区域, 月份)，没有读数的月份为NaN"""
+        counts = self._counts[year]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, self._sums[year] / counts, np.nan)
+
+    @property
+    def newest_timestamp(self):
+        if not self.latest:
+            return None
+        return max(reading.timestamp for reading in self.latest.values())
@@ -0,0 +1,60 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+
+class YearDataLoader:
+    """使用线程池按年份异步加载数据
+
+    load_fn(year)在工作线程中执行；主线程每帧调用poll()领取已完成的年份，
+    因此渲染循环永远不会因为I/O而阻塞。
+    """
+
+    def __init__(self, load_fn, years, max_workers=2, prefetch_radius=1):
+        self.load_fn = load_fn
+        self.years = years
+        self.prefetch_radius = prefetch_radius
+        self.loaded = set()
+        self._futures = {}  # 年份 -> Future
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="year-loader")
+
+    def request(self, year):
+        """提交单个年份的加载任务（已加载或正在加载时忽略）"""
+        if year not in self.years or year in self.loaded or year in self._futures:
+            return
+        self._futures[year] = self._executor.submit(self.load_fn, year)
+
+    def prefetch(self, year):
+        """优先加载目标年份，然后加载其相邻年份"""
+        self.request(year)
+        for offset in range(1, self.prefetch_radius + 1):
+            self.request(year + offset)
+            self.request(year - offset)
+
+    def is_pending(self, year):
+        return year in self._futures
+
+    def poll(self):
+        """返回本帧之前完成的(年份, 数据)列表，不会阻塞"""
+        finished = []
+        for year, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[year]
+            error = future.exception()
+            if error is not None:
+                # 丢弃失败的任务，下一次预取时会重试
+                warnings.warn(f"Failed to load data for {year}: {error!r}")
+                continue
+            self.loaded.add(year)
+            finished.append((year, future.result()))
+        return finished
+
+    def wait(self, year):
+        """阻塞等待单个年份（仅用于启动时加载首个年份）"""
+        self.request(year)
+        future = self._futures.get(year)
+        if future is not None:
+            future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
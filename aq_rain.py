@@ -0,0 +1,79 @@
+import numpy as np
+import pygame
+
+from aq_bands import AQI_BANDS, MODERATE
+
+RAIN_COLOR = (100, 150, 255)  # 蓝色雨滴
+RAIN_ALPHA = 140
+RAIN_MAX_DROPS = 15_000  # AQI为0时的雨滴数，空气越好雨越密
+RAIN_MIN_DROPS = 200
+RAIN_CLEAR_AQI = AQI_BANDS.limit(MODERATE)  # AQI超过Moderate时只有最少的雨滴
+LENGTH_BUCKETS = 6
+
+
+def rain_drop_count(aqi):
+    """雨滴数量随空气质量变好而增加"""
+    cleanliness = min(1.0, max(0.0, 1 - aqi / RAIN_CLEAR_AQI))
+    return max(RAIN_MIN_DROPS, int(RAIN_MAX_DROPS * cleanliness))
+
+
+class RainEffect:
+    """高密度雨：雨滴状态保存在NumPy数组中，用预渲染的雨线精灵批量blit
+
+    纹理后端中逐个复制上万个精灵太慢，改为先把雨线批量blit到透明图层，每帧只上传一次。
+    """
+
+    type = "rain"
+
+    def __init__(self, aqi_level, size, scale=1.0, seed=None):
+        self.aqi_level = aqi_level
+        self.width, self.height = size
+        self.scale = scale
+        self.rng = np.random.default_rng(seed)
+        self.line_width = max(1, round(2 * scale))
+        self.spawn_height = int(100 * scale)
+
+        # 每种长度一个雨线精灵：从尾部透明渐变到雨滴头部
+        self.lengths = np.maximum(1, np.linspace(10, 20, LENGTH_BUCKETS) * scale).round().astype(int)
+        self.sprites = np.empty(LENGTH_BUCKETS, dtype=object)
+        for i, length in enumerate(self.lengths):
+            sprite = pygame.Surface((self.line_width, length), pygame.SRCALPHA)
+            for row in range(length):
+                alpha = int(RAIN_ALPHA * (row + 1) / length)
+                sprite.fill((*RAIN_COLOR, alpha), (0, row, self.line_width, 1))
+            self.sprites[i] = sprite
+
+        count = rain_drop_count(aqi_level)
+        self.intensity = count
+        self.x = self.rng.integers(0, self.width + 1, count)
+        # 初始雨滴分布在整个画面上方和画面内，避免第一场雨整齐地从顶部落下
+        self.y = self.rng.uniform(-self.spawn_height, self.height, count)
+        self.speed = self.rng.uniform(3, 8, count) * scale
+        self.bucket = self.rng.integers(0, LENGTH_BUCKETS, count)
+        self.layer = None  # 纹理后端使用的图层，首次绘制时创建
+
+    def update(self):
+        self.y += self.speed
+        fallen = self.y > self.height
+        n = int(fallen.sum())
+        if n:
+            self.y[fallen] = self.rng.integers(-self.spawn_height, 1, n)
+            self.x[fallen] = self.rng.integers(0, self.width + 1, n)
+
+    def _visible(self):
+        visible = self.y + self.lengths[self.bucket] > 0
+        left = (self.x[visible] - self.line_width // 2).tolist()
+        top = self.y[visible].astype(int).tolist()
+        return self.sprites[self.bucket[visible]].tolist(), left, top
+
+    def draw(self, screen):
+        sprites, left, top = self._visible()
+        screen.blits(zip(sprites, zip(left, top)), doreturn=False)
+
+    def draw_textured(self, canvas):
+        if self.layer is None:
+            self.layer = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        # 透明部分也使用雨滴的颜色：雨线叠加时只累积透明度，颜色与直接画在画面上相同
+        self.layer.fill((*RAIN_COLOR, 0))
+        self.draw(self.layer)
+        canvas.layer(self.layer)
@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+
+
+class ParticleState:
+    """粒子状态缓冲区，所有属性保存为连续的NumPy数组"""
+
+    def __init__(self, count):
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.z = np.zeros(count)
+        self.angle = np.zeros(count)
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def from_particles(cls, particles):
+        """从Particle对象列表创建状态"""
+        state = cls(len(particles))
+        for i, particle in enumerate(particles):
+            state.x[i] = particle.x
+            state.y[i] = particle.y
+            state.z[i] = particle.z
+            state.angle[i] = particle.angle
+        return state
+
+
+def step_particles(src, dst, speed, ticks, width, height, rng):
+    """向量化版本的Particle.move：读取src，把下一帧写入dst"""
+    n = len(src)
+    # 模拟布朗运动
+    np.add(src.angle, rng.uniform(-0.1, 0.1, n), out=dst.angle)
+    np.multiply(np.cos(dst.angle), speed, out=dst.x)
+    dst.x += src.x
+    np.multiply(np.sin(dst.angle), speed, out=dst.y)
+    dst.y += src.y
+    # 3D效果：z轴周期性运动
+    np.sin(ticks * 0.001 + dst.angle, out=dst.z)
+    dst.z *= 50
+
+    # 边界检查（与Particle.move相同的环绕规则）
+    dst.x[dst.x < 0] = width
+    dst.x[dst.x > width] = 0
+    dst.y[dst.y < 0] = height
+    dst.y[dst.y > height] = 0
+
+
+class SimulationWorker:
+    """在后台线程中模拟粒子，并使用双缓冲与渲染线程交换状态
+
+    主线程在每帧开始时调用swap()：等待上一帧的模拟完成，交换前后缓冲区，
+    然后让工作线程基于新的前缓冲区计算下一帧。渲染只读取前缓冲区，
+    工作线程只写入后缓冲区，因此两者可以并行执行。
+    """
+
+    def __init__(self, state, width, height, seed=None):
+        self.buffers = [state, ParticleState(len(state))]
+        self.front = 0
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+
+        self._params = None
+        self._pending = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="particle-simulation", daemon=True)
+        self._thread.start()
+
+    @property
+    def snapshot(self):
+        """当前可供渲染的状态（前缓冲区）"""
+        return self.buffers[self.front]
+
+    def swap(self, speed, ticks):
+        """帧边界：交换缓冲区并提交下一帧的模拟，返回可渲染的快照"""
+        self._idle.wait()
+        if self._params is not None:
+            self.front ^= 1
+        self._params = (speed, ticks)
+        self._idle.clear()
+        self._pending.set()
+        return self.snapshot
+
+    def resize(self, width, height):
+        """画面尺寸变化：等待当前帧模拟完成，把粒子按比例移动到新的边界内"""
+        self._idle.wait()
+        for state in self.buffers:
+            state.x *= width / self.width
+            state.y *= height / self.height
+        self.width = width
+        self.height = height
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            if not self._running:
+                self._idle.set()
+                return
+            speed, ticks = self._params
+            src = self.buffers[self.front]
+            dst = self.buffers[self.front ^ 1]
+            step_particles(src, dst, speed, ticks, self.width, self.height, self.rng)
+            self._idle.set()
+
+    def close(self):
+        """停止工作线程"""
+        self._idle.wait()
+        self._running = False
+        self._pending.set()
+        self._thread.join(timeout=1.0)
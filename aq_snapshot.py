@@ -0,0 +1,56 @@
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+
+from aq_cache import atomic_write, cache_path
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """计算源文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_key(version, seed, sources=()):
+    """根据生成器版本、随机种子和源文件内容计算快照键"""
+    manifest = {
+        "version": version,
+        "seed": seed,
+        "sources": sorted((os.path.basename(path), file_digest(path)) for path in sources),
+    }
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_or_build_snapshot(name, version, seed, build_fn, sources=()):
+    """加载数据集快照；不存在时调用build_fn(seed)生成并保存
+
+    build_fn返回(数组, 元数据字典)。快照以.npy格式保存，之后的启动直接用
+    内存映射打开，不再重新计算。返回(只读内存映射数组, 元数据字典)。
+    """
+    key = snapshot_key(version, seed, sources)
+    base = cache_path("snapshots", f"{name}-{key[:16]}")
+    array_path = base + ".npy"
+    meta_path = base + ".json"
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("key") == key:
+            return np.load(array_path, mmap_mode="r"), meta
+    except (OSError, ValueError):
+        pass
+
+    array, meta = build_fn(seed)
+    meta = dict(meta, key=key, version=version, seed=seed)
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array))
+    # 先写数组再写元数据：元数据存在即表示快照完整
+    atomic_write(array_path, buffer.getvalue())
+    atomic_write(meta_path, json.dumps(meta, indent=2))
+    return np.load(array_path, mmap_mode="r"), meta
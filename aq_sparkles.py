@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+import pygame
+
+from aq_bands import AQI_BANDS, GOOD
+
+# 闪烁颜色按AQI级别分三档：Good / Moderate / 更差
+SPARKLE_BAND_COLORS = ((0, 255, 0), (255, 255, 0), (255, 0, 0))
+
+SIZE_BUCKETS = 8
+PHASE_BUCKETS = 16
+ALPHA_BUCKETS = 16
+OPACITY_LEVELS = 32  # 闪烁相位和淡出透明度相乘后量化的级数（相同不透明度共用精灵）
+FLASH_PERIOD = math.pi / 0.2  # |sin(t * 0.2)|的周期（帧）
+MIN_VISIBLE_ALPHA = 20
+
+
+def sparkle_band(values):
+    """AQI读数 -> 颜色档位（0好、1中等、2差）"""
+    return np.clip(AQI_BANDS.classify(values), GOOD, len(SPARKLE_BAND_COLORS) - 1).astype(np.intp)
+
+
+class SparkleSheet:
+    """预渲染的闪烁精灵表，按(尺寸档, 颜色档, 闪烁相位, 透明度档)查找
+
+    闪烁效果只取决于尺寸、颜色档和不透明度（闪烁强度 × 淡出透明度），
+    因此相位和透明度先映射到量化的不透明度级别，同一级别共用一个精灵。
+    """
+
+    def __init__(self, scale=1.0):
+        self.sizes = np.linspace(1, 3, SIZE_BUCKETS) * scale
+        self.min_size = self.sizes[0]
+        self.max_size = self.sizes[-1]
+
+        # 每个相位档取中点的闪烁强度，每个透明度档取中点的透明度
+        phase = (np.arange(PHASE_BUCKETS) + 0.5) * FLASH_PERIOD / PHASE_BUCKETS
+        flash = np.abs(np.sin(phase * 0.2)) * 0.5 + 0.5
+        alpha = (np.arange(ALPHA_BUCKETS) + 0.5) * 256 / ALPHA_BUCKETS
+        opacity = np.outer(flash, alpha)
+        self.level_index = np.minimum(opacity * OPACITY_LEVELS / 256, OPACITY_LEVELS - 1).astype(np.intp)
+        level_alpha = (np.arange(OPACITY_LEVELS) + 0.5) * 256 / OPACITY_LEVELS
+
+        self.sprites = np.empty((SIZE_BUCKETS, len(SPARKLE_BAND_COLORS), OPACITY_LEVELS), dtype=object)
+        self.half_extent = np.empty(SIZE_BUCKETS)
+        for s, size in enumerate(self.sizes):
+            self.half_extent[s] = size * 2
+            for b, color in enumerate(SPARKLE_BAND_COLORS):
+                for level, value in enumerate(level_alpha):
+                    self.sprites[s, b, level] = self.render_sprite(size, (*color, int(value)))
+
+    @staticmethod
+    def render_sprite(size, color):
+        """绘制单个星形闪烁（与原先逐帧绘制的图案相同）"""
+        sprite = pygame.Surface((int(size * 4), int(size * 4)), pygame.SRCALPHA)
+        center = (size * 2, size * 2)
+        for i in range(4):
+            angle = i * math.pi / 2
+            end = (center[0] + math.cos(angle) * size * 2, center[1] + math.sin(angle) * size * 2)
+            pygame.draw.line(sprite, color, center, end, 2)
+        return sprite
+
+    def size_bucket(self, sizes):
+        span = max(self.max_size - self.min_size, 1e-9)
+        return np.clip(((sizes - self.min_size) / span * (SIZE_BUCKETS - 1)).round(), 0, SIZE_BUCKETS - 1).astype(np.intp)
+
+    def lookup(self, size_bucket, band, flash_timer, alpha):
+        """返回每个闪烁对应的精灵（对象数组）"""
+        phase = ((flash_timer % FLASH_PERIOD) * (PHASE_BUCKETS / FLASH_PERIOD)).astype(np.intp)
+        alpha_bucket = np.minimum(alpha * ALPHA_BUCKETS / 256, ALPHA_BUCKETS - 1).astype(np.intp)
+        return self.sprites[size_bucket, band, self.level_index[np.minimum(phase, PHASE_BUCKETS - 1), alpha_bucket]]
+
+
+class SparkleField:
+    """大量数据闪烁：状态保存在NumPy数组中，绘制时按索引查找预渲染的精灵并批量blit"""
+
+    def __init__(self, scale=1.0, seed=None):
+        self.scale = scale
+        self.sheet = SparkleSheet(scale)
+        self.rng = np.random.default_rng(seed)
+        self.clear()
+
+    def clear(self):
+        empty = np.empty(0)
+        self.x = self.y = self.angle = self.speed = empty
+        self.size_bucket = self.band = np.empty(0, dtype=np.intp)
+        self.age = self.lifetime = np.empty(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.x)
+
+    def spawn(self, x, y, values):
+        """在(x, y)处添加闪烁，颜色由对应的读数values决定"""
+        n = len(x)
+        if n == 0:
+            return
+        rng = self.rng
+        sizes = rng.uniform(1, 3, n) * self.scale
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.angle = np.concatenate([self.angle, rng.uniform(0, 2 * math.pi, n)])
+        self.speed = np.concatenate([self.speed, rng.uniform(0.5, 1.5, n) * self.scale])
+        self.size_bucket = np.concatenate([self.size_bucket, self.sheet.size_bucket(sizes)])
+        self.band = np.concatenate([self.band, sparkle_band(values)])
+        self.age = np.concatenate([self.age, np.zeros(n, dtype=np.int32)])
+        self.lifetime = np.concatenate([self.lifetime, rng.integers(180, 301, n, dtype=np.int32)])
+
+    def update(self):
+        self.angle += 0.02
+        self.x += np.cos(self.angle) * self.speed
+        self.y += np.sin(self.angle) * self.speed
+        self.age += 1
+        alive = self.age < self.lifetime
+        if not alive.all():
+            for name in ('x', 'y', 'angle', 'speed', 'size_bucket', 'band', 'age', 'lifetime'):
+                setattr(self, name, getattr(self, name)[alive])
+
+    def _visible_sprites(self):
+        alpha = 255 - (self.age / self.lifetime) * 255
+        visible = alpha > MIN_VISIBLE_ALPHA
+        size_bucket = self.size_bucket[visible]
+        # 闪烁计时与年龄同步递增
+        sprites = self.sheet.lookup(size_bucket, self.band[visible], self.age[visible], alpha[visible])
+        half = self.sheet.half_extent[size_bucket]
+        left = (self.x[visible] - half).astype(int)
+        top = (self.y[visible] - half).astype(int)
+        return sprites, left, top
+
+    def draw(self, screen):
+        sprites, left, top = self._visible_sprites()
+        screen.blits(zip(sprites.tolist(), zip(left.tolist(), top.tolist())), doreturn=False)
+
+    def draw_textured(self, canvas):
+        sprites, left, top = self._visible_sprites()
+        for sprite, x, y in zip(sprites.tolist(), left.tolist(), top.tolist()):
+            canvas.sprite(sprite, (x, y))
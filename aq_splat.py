@@ -0,0 +1,102 @@
+import numpy as np
+import pygame
+
+from aq_bands import AQI_BANDS, UNHEALTHY
+from aq_simulation import ParticleState, step_particles
+
+SMOG_PARTICLES = 120_000
+SMOG_FULL_AQI = AQI_BANDS.limit(UNHEALTHY)  # AQI达到Unhealthy上限时全部烟雾粒子可见
+
+
+class SplatRenderer:
+    """把大量粒子一次性累加到像素缓冲区中绘制（加法混合）
+
+    每个粒子按深度计算亮度权重，和光斑内的每个偏移一起用一次np.bincount散射累加
+    到画面大小的亮度图，经颜色查找表（当前颜色从黑到全亮的256级渐变）转换为
+    像素后写入缓冲Surface，最后用BLEND_ADD一次blit叠加到画面。所有逐粒子的
+    计算都在NumPy中完成，开销只随粒子数线性增长。
+    """
+
+    def __init__(self, size):
+        self.resize(size)
+
+    def resize(self, size):
+        self.width, self.height = size
+        self.buffer = pygame.Surface(size, depth=32)
+        self._lut_color = None
+
+    def _color_lut(self, color):
+        """亮度(0-255) -> 缓冲Surface像素值的查找表，颜色变化时重建"""
+        color = tuple(color[:3])
+        if color != self._lut_color:
+            ramp = (np.linspace(0, 1, 256)[:, None] * color).astype(np.uint8)
+            self._lut = np.array([self.buffer.map_rgb(tuple(c)) for c in ramp], dtype=np.uint32)
+            self._lut_color = color
+        return self._lut
+
+    def draw(self, surface, x, y, z, color, gain=1.0, radius=1):
+        """把粒子(x, y, z)以color颜色累加到surface上；gain为单个粒子的亮度（1为全亮）"""
+        xi = x.astype(np.intp)
+        yi = y.astype(np.intp)
+        visible = (xi >= 0) & (xi < self.width) & (yi >= 0) & (yi < self.height)
+        xi, yi = xi[visible], yi[visible]
+        # 3D效果：z越近越亮（与draw_particle的亮度范围相同）
+        depth_factor = (z[visible] + 50) / 100
+        size = 2 * radius + 1
+        weights = (255 * gain / (size * size)) * (0.7 + depth_factor * 0.3)
+
+        # 在四周各留radius像素的网格上散射，光斑不会跨列环绕；
+        # surfarray按(x, y)索引，因此线性下标为x * 网格高度 + y
+        grid_height = self.height + 2 * radius
+        center = xi * grid_height + yi
+        offsets = [(dx * grid_height + dy) for dx in range(size) for dy in range(size)]
+        index = (center[None, :] + np.array(offsets, dtype=np.intp)[:, None]).ravel()
+        levels = np.bincount(index, weights=np.tile(weights, len(offsets)),
+                             minlength=(self.width + 2 * radius) * grid_height)
+        np.minimum(levels, 255, out=levels)
+        levels = levels.astype(np.uint8).reshape(-1, grid_height)
+        levels = levels[radius:radius + self.width, radius:radius + self.height]
+
+        pygame.surfarray.blit_array(self.buffer, self._color_lut(color)[levels])
+        surface.blit(self.buffer, (0, 0), special_flags=pygame.BLEND_ADD)
+
+
+class SmogField:
+    """烟雾浓度模式：数量随AQI变化的大量背景粒子，用SplatRenderer绘制"""
+
+    def __init__(self, size, count=SMOG_PARTICLES, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.width, self.height = size
+        self.buffers = [ParticleState(count), ParticleState(count)]
+        state = self.buffers[0]
+        state.x[:] = self.rng.uniform(0, self.width, count)
+        state.y[:] = self.rng.uniform(0, self.height, count)
+        state.angle[:] = self.rng.uniform(0, 2 * np.pi, count)
+        self.active = 0
+        self.renderer = SplatRenderer(size)
+
+    @property
+    def state(self):
+        return self.buffers[0]
+
+    def resize(self, size):
+        width, height = size
+        for state in self.buffers:
+            state.x *= width / self.width
+            state.y *= height / self.height
+        self.width, self.height = width, height
+        self.renderer.resize(size)
+
+    def update(self, aqi, speed, ticks):
+        """按当前AQI决定可见粒子数，并推进一步模拟"""
+        self.active = int(len(self.state) * min(1.0, max(0.0, aqi / SMOG_FULL_AQI)))
+        step_particles(self.buffers[0], self.buffers[1], speed, ticks, self.width, self.height, self.rng)
+        self.buffers.reverse()
+
+    def draw(self, surface, color, scale=1.0):
+        n = self.active
+        if n == 0:
+            return
+        state = self.state
+        self.renderer.draw(surface, state.x[:n], state.y[:n], state.z[:n], color,
+                           gain=1.5, radius=max(1, round(scale)))
@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+
+# 95%置信区间的t分布临界值（自由度1-30）
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def t_critical_95(df):
+    """双侧95%的t临界值；自由度大于30时使用Cornish-Fisher近似"""
+    if df < 1:
+        return float('nan')
+    if df <= len(T_CRITICAL_95):
+        return T_CRITICAL_95[df - 1]
+    z = 1.959964
+    return z + (z ** 3 + z) / (4 * df)
+
+
+class StatisticsEngine:
+    """统计面板的计算引擎
+
+    每个数据版本只计算一次：最佳/最差年份、线性趋势及其95%置信区间、
+    百分位数、各区域排名和逐年变化。线性回归的累计量按年份增量维护，
+    追加或修改个别年份时不需要重新遍历全部数据。
+    """
+
+    def __init__(self, cube, pollutant='AQI'):
+        self.cube = cube
+        self.pollutant = pollutant
+        self.version = -1
+        self._year_values = {}  # 年份 -> 已计入累计量的年均值
+        # 线性回归的累计量：n, Σx, Σy, Σx², Σxy, Σy²（x相对于起始年份）
+        self._sums = np.zeros(6)
+        self.years = []
+        self.rankings = {}
+
+    def _add(self, year, value, sign=1):
+        x = year - self.cube.years[0]
+        self._sums += sign * np.array([1.0, x, value, x * x, x * value, value * value])
+
+    def refresh(self):
+        """数据版本变化时增量更新统计结果"""
+        if self.version == self.cube.version:
+            return
+        means = self.cube.territory_year_means(self.pollutant)
+        changed = []
+        for year, loaded, value in zip(self.cube.years, self.cube.loaded, means):
+            if not loaded:
+                continue
+            value = float(value)
+            previous = self._year_values.get(year)
+            if math.isnan(value):
+                # 该污染物还没有数据的年份不计入统计
+                if previous is not None:
+                    self._add(year, previous, sign=-1)
+                    del self._year_values[year]
+                    changed.append(year)
+                continue
+            if previous == value:
+                continue
+            if previous is not None:
+                self._add(year, previous, sign=-1)
+            self._add(year, value)
+            self._year_values[year] = value
+            changed.append(year)
+        self._compute(changed)
+        self.version = self.cube.version
+
+    def _compute(self, changed):
+        years = sorted(self._year_values)
+        values = np.array([self._year_values[year] for year in years])
+        self.years = years
+        self.year_values = values
+        if not years:
+            return
+
+        self.best_year = years[int(np.argmin(values))]
+        self.worst_year = years[int(np.argmax(values))]
+        self.best_value = float(values.min())
+        self.worst_value = float(values.max())
+        self.percentiles = dict(zip((10, 50, 90), np.percentile(values, (10, 50, 90))))
+
+        # 平均每年变化：首尾年份之差除以实际跨越的年数
+        span = years[-1] - years[0]
+        self.average_change = (values[-1] - values[0]) / span if span else 0.0
+
+        # 逐年变化（只比较相邻且都已加载的年份）
+        self.year_over_year = {year: self._year_values[year] - self._year_values[year - 1]
+                               for year in years if year - 1 in self._year_values}
+
+        self._compute_trend()
+
+        # 各区域排名：每个年份从最干净到污染最严重排序（只更新变化的年份）
+        # 没有读数的区域（NaN）不参与排名
+        district_means = self.cube.district_year_means(self.pollutant)
+        for year in changed:
+            column = district_means[:, self.cube.position('year', year)]
+            finite = np.flatnonzero(np.isfinite(column))
+            self.rankings[year] = [self.cube.districts[i] for i in finite[np.argsort(column[finite])]]
+
+    def _compute_trend(self):
+        n, sx, sy, sxx, sxy, syy = self._sums
+        self.trend_slope = self.trend_ci = self.trend_r2 = float('nan')
+        if n < 2:
+            return
+        ss_x = sxx - sx * sx / n
+        ss_y = syy - sy * sy / n
+        ss_xy = sxy - sx * sy / n
+        if ss_x <= 0:
+            return
+        self.trend_slope = ss_xy / ss_x
+        self.trend_r2 = ss_xy * ss_xy / (ss_x * ss_y) if ss_y > 0 else 1.0
+        if n > 2:
+            residual = max(ss_y - self.trend_slope * ss_xy, 0.0)
+            standard_error = math.sqrt(residual / (n - 2) / ss_x)
+            self.trend_ci = t_critical_95(int(n) - 2) * standard_error
+
+    def ranking(self, year):
+        """指定年份的区域排名（最干净在前）；年份未加载时返回空列表"""
+        self.refresh()
+        return self.rankings.get(year, []) if self.years else []
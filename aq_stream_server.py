@@ -0,0 +1,235 @@
+import argparse
+import io
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pygame
+
+import hk_air_quality_super_enhanced as app
+
+BOUNDARY = b'frame'
+SIMULATION_FPS = 60  # 模拟按墙钟时间以60fps推进，与推流帧率无关
+MAX_SIMULATION_STEPS = 4  # 推流帧率很低时，每帧最多补算的模拟步数
+
+INDEX_PAGE = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Hong Kong Air Quality</title>
+<style>body{margin:0;background:#141c28}img{display:block;width:100%;height:auto}</style>
+</head><body><img src="/stream.mjpg" alt="Hong Kong Air Quality"></body></html>
+"""
+
+
+def _init_encoder():
+    # Ctrl+C由主进程处理，编码进程随进程池一起关闭
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def encode_jpeg(raw, size):
+    """把RGB原始像素编码为JPEG（在工作进程中运行）"""
+    surface = pygame.image.frombuffer(raw, size, 'RGB')
+    buffer = io.BytesIO()
+    pygame.image.save(surface, buffer, 'frame.jpg')
+    return buffer.getvalue()
+
+
+class FrameBroadcaster:
+    """把最新编码好的JPEG帧共享给所有客户端
+
+    每帧只编码一次，所有客户端读取同一份字节。发送较慢的客户端直接跳到
+    最新一帧而不会排队；渲染帧率根据客户端的背压自动调整：发布新帧时如果
+    有客户端已经在等待，说明它们跟得上，逐步提高帧率，否则降低帧率。
+    """
+
+    def __init__(self, max_fps=30, min_fps=2):
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.fps = max_fps
+        self.frame = None
+        self.sequence = 0
+        self.clients = 0
+        self.closed = False
+        self._waiting = 0  # 正在等待新帧的客户端数
+        self._condition = threading.Condition()
+
+    def publish(self, frame):
+        with self._condition:
+            if self._waiting:
+                self.fps = min(self.max_fps, self.fps * 1.1)
+            elif self.clients:
+                self.fps = max(self.min_fps, self.fps * 0.85)
+            self.frame = frame
+            self.sequence += 1
+            self._condition.notify_all()
+
+    def next_frame(self, last_sequence, timeout=5.0):
+        """等待比last_sequence更新的帧，返回(序号, JPEG字节)；超时或关闭时帧为None"""
+        with self._condition:
+            self._waiting += 1
+            try:
+                ready = self._condition.wait_for(
+                    lambda: self.sequence > last_sequence or self.closed, timeout)
+            finally:
+                self._waiting -= 1
+            if not ready or self.closed:
+                return last_sequence, None
+            return self.sequence, self.frame
+
+    def connect(self):
+        with self._condition:
+            self.clients += 1
+            self._condition.notify_all()
+
+    def disconnect(self):
+        with self._condition:
+            self.clients -= 1
+
+    def wait_for_clients(self, timeout=None):
+        """没有客户端时阻塞（暂停渲染），返回是否有客户端"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.clients > 0 or self.closed, timeout)
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """MJPEG推流的HTTP处理器：/为查看页面，/stream.mjpg为视频流，/frame.jpg为单帧"""
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path in ('/', '/index.html'):
+            self.send_bytes(INDEX_PAGE, 'text/html; charset=utf-8')
+        elif path == '/stream.mjpg':
+            self.send_stream()
+        elif path == '/frame.jpg':
+            self.send_frame()
+        else:
+            self.send_error(404)
+
+    def send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_frame(self):
+        broadcaster = self.server.broadcaster
+        broadcaster.connect()
+        try:
+            frame = broadcaster.frame
+            if frame is None:
+                _, frame = broadcaster.next_frame(0)
+        finally:
+            broadcaster.disconnect()
+        if frame is None:
+            self.send_error(503)
+        else:
+            self.send_bytes(frame, 'image/jpeg')
+
+    def send_stream(self):
+        broadcaster = self.server.broadcaster
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=' + BOUNDARY.decode())
+        self.send_header('Cache-Control', 'no-cache, private')
+        self.send_header('Pragma', 'no-cache')
+        self.end_headers()
+        broadcaster.connect()
+        sequence = 0
+        try:
+            while not broadcaster.closed:
+                sequence, frame = broadcaster.next_frame(sequence)
+                if frame is None:
+                    continue
+                # 写入会在客户端接收缓冲区满时阻塞，这就是背压的来源
+                self.wfile.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                                 + str(len(frame)).encode() + b'\r\n\r\n' + frame + b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端断开连接
+        finally:
+            broadcaster.disconnect()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8765, max_fps=30, min_fps=2, workers=None, seed=app.DATASET_SEED,
+          live_source=None, size=(app.WIDTH, app.HEIGHT)):
+    """无窗口渲染可视化并以MJPEG推流，直到按Ctrl+C"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    screen = app.init_display(size)
+    viz = app.AirQualityViz(seed=seed, live_source=live_source, size=size)
+    workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+
+    broadcaster = FrameBroadcaster(max_fps, min_fps)
+    server = ThreadingHTTPServer((host, port), StreamHandler)
+    server.daemon_threads = True
+    server.broadcaster = broadcaster
+    server_thread = threading.Thread(target=server.serve_forever, name="mjpeg-server", daemon=True)
+    server_thread.start()
+    print(f"Streaming on http://{host}:{server.server_port}/")
+
+    # 编码进程用spawn启动，避免在已有线程的进程中fork
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_encoder)
+    pending = deque()
+    last_step = time.perf_counter()
+    try:
+        while True:
+            if not broadcaster.wait_for_clients(timeout=1.0):
+                pygame.event.pump()
+                last_step = time.perf_counter()
+                continue
+            frame_started = time.perf_counter()
+
+            # 按墙钟时间推进模拟，推流帧率降低时动画速度保持不变
+            steps = min(MAX_SIMULATION_STEPS, max(1, round((frame_started - last_step) * SIMULATION_FPS)))
+            last_step = frame_started
+            for _ in range(steps):
+                viz.update_particles()
+                viz.update_data_effects()
+                viz.advance_autoplay()
+            viz.draw(screen)
+            pygame.event.pump()
+
+            pending.append(pool.submit(encode_jpeg, pygame.image.tobytes(screen, 'RGB'), screen.get_size()))
+            # 按顺序发布已编码完成的帧；所有进程都忙时等待最早的一帧
+            while pending and (pending[0].done() or len(pending) > workers):
+                broadcaster.publish(pending.popleft().result())
+
+            time.sleep(max(0.0, 1.0 / broadcaster.fps - (time.perf_counter() - frame_started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broadcaster.close()
+        server.shutdown()
+        server.server_close()
+        pool.shutdown(cancel_futures=True)
+        viz.close()
+        pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the visualization to browsers as MJPEG")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（0.0.0.0表示允许局域网访问）")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fps", type=float, default=30, help="最高推流帧率")
+    parser.add_argument("--min-fps", type=float, default=2, help="客户端跟不上时的最低帧率")
+    parser.add_argument("--workers", type=int, help="JPEG编码进程数")
+    parser.add_argument("--size", type=app.parse_size, default=(app.WIDTH, app.HEIGHT), help="推流分辨率，例如1920x1080")
+    parser.add_argument("--seed", type=int, default=app.DATASET_SEED)
+    parser.add_argument("--live", metavar="SOURCE", help="实时模式数据源（同主程序的--live）")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.fps, args.min_fps, args.workers, args.seed, args.live, args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import math
+import os
+import weakref
+
+import pygame
+
+try:
+    from pygame._sdl2 import video
+except ImportError:  # 没有_sdl2模块的pygame版本只能使用Surface渲染
+    video = None
+
+# SDL_BlendMode
+BLEND_NONE = 0
+BLEND_ALPHA = 1
+BLEND_ADD = 2
+
+SPRITE_RADIUS = 64  # 圆形精灵纹理的半径，绘制时按需缩放
+
+
+class TextureCanvas:
+    """纹理绘图接口：特效的draw_textured()通过它绘制
+
+    每种形状只生成一次纹理（圆、圆环、像素），之后每次绘制只是一次
+    带颜色/透明度调制的纹理复制。SDL会把连续的复制命令合并成批次提交。
+    """
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self._sprites = {}
+        self._surface_textures = weakref.WeakKeyDictionary()  # 预渲染精灵Surface -> 纹理
+        self._layer_textures = weakref.WeakKeyDictionary()  # 每帧重绘的图层Surface -> 流式纹理
+
+    def _sprite(self, key, draw):
+        texture = self._sprites.get(key)
+        if texture is None:
+            surface = draw()
+            texture = video.Texture.from_surface(self.renderer, surface)
+            self._sprites[key] = texture
+        return texture
+
+    def _disc(self):
+        def draw():
+            surface = pygame.Surface((SPRITE_RADIUS * 2, SPRITE_RADIUS * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (255, 255, 255), (SPRITE_RADIUS, SPRITE_RADIUS), SPRITE_RADIUS)
+            return surface
+        return self._sprite('disc', draw)
+
+    def _ring(self, radius, width):
+        # 圆环的线宽不能随缩放变化，按(半径, 线宽)分别生成
+        def draw():
+            surface = pygame.Surface((radius * 2 + 2, radius * 2 + 2), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (255, 255, 255), (radius + 1, radius + 1), radius, width)
+            return surface
+        return self._sprite(('ring', radius, width), draw)
+
+    def _pixel(self):
+        def draw():
+            surface = pygame.Surface((1, 1), pygame.SRCALPHA)
+            surface.fill((255, 255, 255))
+            return surface
+        return self._sprite('pixel', draw)
+
+    @staticmethod
+    def _modulate(texture, color, alpha, additive):
+        texture.color = color[:3]
+        texture.alpha = int(max(0, min(255, alpha)))
+        texture.blend_mode = BLEND_ADD if additive else BLEND_ALPHA
+        return texture
+
+    def circle(self, color, center, radius, alpha=255, additive=False):
+        """实心圆"""
+        if radius <= 0:
+            return
+        texture = self._modulate(self._disc(), color, alpha, additive)
+        texture.draw(dstrect=(center[0] - radius, center[1] - radius, radius * 2, radius * 2))
+
+    def ring(self, color, center, radius, width=1, alpha=255):
+        """圆环"""
+        radius = int(radius)
+        if radius <= 0:
+            return
+        texture = self._modulate(self._ring(radius, min(width, radius)), color, alpha, False)
+        texture.draw(dstrect=(center[0] - radius - 1, center[1] - radius - 1, radius * 2 + 2, radius * 2 + 2))
+
+    def sprite(self, surface, pos):
+        """绘制预渲染的精灵Surface（首次使用时上传为纹理）"""
+        texture = self._surface_textures.get(surface)
+        if texture is None:
+            texture = video.Texture.from_surface(self.renderer, surface)
+            texture.blend_mode = BLEND_ALPHA
+            self._surface_textures[surface] = texture
+        texture.draw(dstrect=(pos[0], pos[1], texture.width, texture.height))
+
+    def layer(self, surface):
+        """绘制特效在CPU上批量画好的图层Surface：每帧整体上传一次再复制一次"""
+        texture = self._layer_textures.get(surface)
+        if texture is None:
+            texture = video.Texture(self.renderer, surface.get_size(), streaming=True)
+            texture.blend_mode = BLEND_ALPHA
+            self._layer_textures[surface] = texture
+        texture.update(surface)
+        texture.draw(dstrect=(0, 0, *surface.get_size()))
+
+    def line(self, color, start, end, width=1, alpha=255):
+        """任意宽度的线段：把1x1像素纹理拉伸并旋转"""
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            return
+        texture = self._modulate(self._pixel(), color, alpha, False)
+        texture.draw(dstrect=(start[0], start[1] - width / 2, length, width),
+                     angle=math.degrees(math.atan2(dy, dx)), origin=(0, width / 2))
+
+
+class TextureBackend:
+    """基于pygame._sdl2.video Renderer/Texture的渲染后端
+
+    每帧分三层合成：底层（背景、区域网格、时间轴）在CPU上绘制后整体上传为一张
+    流式纹理；粒子、光晕、涟漪等特效用精灵纹理直接复制到画布；顶层文字
+    （标题、图例、统计面板等）只在内容变化时重新上传。Renderer优先使用硬件
+    加速，没有GPU时自动使用SDL的软件渲染器。接口与Viewport相同。
+    """
+
+    def __init__(self, title, size, render_scale=1.0):
+        if video is None:
+            raise RuntimeError("pygame._sdl2 is not available")
+        self.render_scale = render_scale
+        # 缩放精灵和最终放大到窗口时使用线性过滤（必须在创建纹理之前设置）
+        os.environ.setdefault('SDL_RENDER_SCALE_QUALITY', 'linear')
+        self.window = video.Window(title, size, resizable=True)
+        try:
+            # accelerated=-1：有硬件加速时使用，否则回退到软件渲染器
+            self.renderer = video.Renderer(self.window, accelerated=-1, target_texture=True)
+        except Exception:
+            self.window.destroy()
+            raise
+        self.canvas = TextureCanvas(self.renderer)
+        self._allocate()
+
+    def _allocate(self):
+        width, height = self.window.size
+        size = (max(1, round(width * self.render_scale)), max(1, round(height * self.render_scale)))
+        self.window_size = (width, height)
+        self.canvas_size = size
+        self.base_surface = pygame.Surface(size)
+        self.overlay_surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.base_texture = video.Texture(self.renderer, size, streaming=True)
+        self.overlay_texture = video.Texture(self.renderer, size, streaming=True)
+        self.overlay_texture.blend_mode = BLEND_ALPHA
+        self.overlay_key = None
+        self.target = None
+        if size != (width, height):
+            # 渲染到较小的目标纹理，最后一次性放大到窗口
+            self.target = video.Texture(self.renderer, size, target=True)
+
+    def handle_resize(self):
+        """窗口尺寸变化后重新分配纹理，返回新的画布尺寸"""
+        if tuple(self.window.size) != self.window_size:
+            self._allocate()
+        return self.canvas_size
+
+    def to_canvas(self, pos):
+        """把窗口坐标（鼠标位置）转换为画布坐标"""
+        if self.target is None:
+            return pos
+        (window_width, window_height), (width, height) = self.window_size, self.canvas_size
+        return int(pos[0] * width / window_width), int(pos[1] * height / window_height)
+
+    def render(self, viz):
+        """绘制一帧并显示"""
+        renderer = self.renderer
+        renderer.target = self.target
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+
+        if viz.bloom_enabled:
+            # 后处理需要读取整个画面：在CPU上绘制并处理后整体上传
+            viz.draw_scene(self.base_surface)
+            self.base_texture.update(self.base_surface)
+            self.base_texture.draw()
+        else:
+            viz.draw_base(self.base_surface)
+            self.base_texture.update(self.base_surface)
+            self.base_texture.draw()
+            viz.draw_effects_textured(self.canvas)
+
+        key = viz.overlay_key()
+        if key != self.overlay_key:
+            self.overlay_surface.fill((0, 0, 0, 0))
+            viz.draw_overlay(self.overlay_surface)
+            self.overlay_texture.update(self.overlay_surface)
+            self.overlay_key = key
+        self.overlay_texture.draw()
+
+        if self.target is not None:
+            renderer.target = None
+            renderer.clear()
+            self.target.draw(dstrect=(0, 0, *self.window_size))
+        renderer.present()
+
+    def close(self):
+        self.window.destroy()
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from aq_bands import MISSING_BAND, MISSING_COLOR
+
+TRANSITION_STEPS = 64  # 每个年份过渡的关键帧数（分数部分量化到1/64年）
+TRANSITION_CACHE_SIZE = 32  # 保留最近使用的过渡表数量，来回拖动时间轴时可直接复用
+
+
+class TransitionTable:
+    """从年份A到年份B过渡的关键帧表
+
+    在steps + 1个均匀的分数步上预先计算各区域和全港（最后一行）的数值values、
+    换算到AQI刻度的等级levels和颜色，以及全港等级对应的粒子属性。
+    两端都没有读数的区域等级为MISSING_BAND，颜色为missing_color（不当作0即“良好”）。
+    每帧只需把年份的小数部分换算成步号后查表。
+    """
+
+    def __init__(self, start_values, end_values, color_for_value, particle_properties,
+                 steps=TRANSITION_STEPS, level_scale=1.0, missing_color=MISSING_COLOR):
+        self.steps = steps
+        fractions = np.linspace(0.0, 1.0, steps + 1)
+        start_values = np.asarray(start_values, dtype=np.float64)
+        end_values = np.asarray(end_values, dtype=np.float64)
+        # 只有一端有数据的区域保持该端的数值
+        start_values, end_values = (np.where(np.isnan(start_values), end_values, start_values),
+                                    np.where(np.isnan(end_values), start_values, end_values))
+        self.values = start_values[:, None] + (end_values - start_values)[:, None] * fractions
+        levels = self.values * level_scale
+        self.levels = np.where(np.isnan(levels), MISSING_BAND, levels)
+        # 颜色和粒子属性每个关键帧只计算一次，查表时直接返回同一个元组
+        self.colors = [[missing_color if level == MISSING_BAND else color_for_value(level) for level in row]
+                       for row in self.levels.tolist()]
+        self.particles = [particle_properties(level) for level in self.levels[-1].tolist()]
+
+    def step(self, fraction):
+        """年份小数部分 -> 关键帧下标"""
+        return min(self.steps, max(0, int(fraction * self.steps + 0.5)))
+
+
+class TransitionTables:
+    """按(起始年份, 结束年份, 污染物, 数据版本)缓存过渡表（最近最少使用的先淘汰）
+
+    level_scales把各污染物的数值换算到color_for_value和particle_properties使用的AQI刻度。
+    particle_properties也会收到MISSING_BAND（全港没有读数时）。
+    """
+
+    def __init__(self, color_for_value, particle_properties, level_scales=None,
+                 steps=TRANSITION_STEPS, capacity=TRANSITION_CACHE_SIZE):
+        self.color_for_value = color_for_value
+        self.particle_properties = particle_properties
+        self.level_scales = level_scales or {}
+        self.steps = steps
+        self.capacity = capacity
+        self._tables = OrderedDict()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, cube, start_year, end_year, pollutant='AQI'):
+        """start_year到end_year的过渡表；end_year尚未加载时为停留在start_year的平坦表"""
+        if not cube.is_loaded(end_year):
+            end_year = start_year
+        key = (start_year, end_year, pollutant, cube.version)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._build(cube, start_year, end_year, pollutant)
+            self._tables[key] = table
+            while len(self._tables) > self.capacity:
+                self._tables.popitem(last=False)
+        else:
+            self._tables.move_to_end(key)
+        return table
+
+    def _build(self, cube, start_year, end_year, pollutant):
+        def year_values(year):
+            year_i = cube.position('year', year)
+            return np.append(cube.district_year_means(pollutant)[:, year_i],
+                             cube.territory_year_means(pollutant)[year_i])
+
+        return TransitionTable(year_values(start_year), year_values(end_year),
+                               self.color_for_value, self.particle_properties, self.steps,
+                               self.level_scales.get(pollutant, 1.0))
@@ -1,40 +1,67 @@
 import numpy as np
-import pandas as pd
-import requests
 import pygame
 import random
-from datetime import datetime, timedelta
 import math
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+import warnings
 
-# 初始化Pygame
-pygame.init()
+from aq_aqhi import DEFAULT_ARCHIVE_FORMAT, HOURLY_CHANNELS, AQHIArchive
+from aq_archive import ARCHIVE_FORMATS, DEFAULT_CHUNK_CACHE_MB
+from aq_backdrops import BackdropCache
+from aq_bands import AQHI_BANDS, AQHI_HIGH, AQI_BANDS, AQI_LEVELS, GOOD, MISSING_BAND, MISSING_COLOR, SENSITIVE
+from aq_bloom import BloomPass
+from aq_cache import atomic_write, cache_path
+from aq_compare import COMPARISON_LAYOUTS, PANE_GAP, PANE_HEADER, ComparisonView
+from aq_cube import AQCube, TimeWindowIndex
+from aq_heatmap import HeatmapGrids, HeatmapRenderer, station_positions
+from aq_live import LiveFeed, LiveStore
+from aq_loader import YearDataLoader
+from aq_rain import RainEffect
+from aq_simulation import ParticleState, SimulationWorker
+from aq_snapshot import load_or_build_snapshot
+from aq_sparkles import SparkleField
+from aq_splat import SmogField
+from aq_stats import StatisticsEngine
+from aq_textures import TextureBackend
+from aq_transitions import TransitionTables
 
-# 设置窗口
+_MODULE_LOADED_AT = time.perf_counter()  # 冷启动计时起点（模块导入完成时）
+
+# 渲染后端：surface为CPU绘制的Surface路径，sdl2为纹理后端（Renderer/Texture）
+BACKENDS = ('surface', 'sdl2')
+
+# 默认窗口尺寸，也是界面布局的设计基准（窗口在main()中创建，导入模块时不做任何初始化）
 WIDTH = 1200
 HEIGHT = 800
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Hong Kong Air Quality Visualization (1993-2023)")
+CAPTION = "Hong Kong Air Quality Visualization (1993-2023)"
+
+# 从启动到显示第一帧的时间预算（秒）
+STARTUP_BUDGET_SECONDS = 1.5
+
+# 每帧为每个区域生成的数据闪烁数（每个闪烁存活3-5秒，同时显示约两千个）
+DATA_SPARKLES_PER_DISTRICT = 1
+
+# 自动播放时每年停留的帧数（60fps下约5秒）
+AUTOPLAY_FRAMES = 300
+
+# 数据集快照：相同的版本和种子在所有设备上生成完全相同的数据
+DATASET_VERSION = 2  # 修改historical_baseline或生成逻辑时必须递增（逐小时档案、热力图等派生缓存按它失效）
+# 数据集生成器所在的源文件：内容变化时数据集快照自动重新生成
+DATASET_SOURCES = (os.path.abspath(__file__),)
+DATASET_SEED = 1993
+
+FONT_NAME = 'Arial'
+FONT_CACHE_FILE = 'fonts.json'
 
 # 定义区域
 DISTRICTS = ['Central & Western', 'Eastern', 'Southern', 'Wan Chai', 'Kowloon City', 
             'Kwun Tong', 'Sham Shui Po', 'Wong Tai Sin', 'Yau Tsim Mong']
 
-# 扩展颜色定义和说明
-AQI_LEVELS = [
-    {'range': (0, 50), 'color': (50, 205, 50), 'name': 'Good', 
-     'desc': 'Air quality is satisfactory with minimal air pollution'},
-    {'range': (51, 100), 'color': (255, 255, 0), 'name': 'Moderate', 
-     'desc': 'Air quality is acceptable but may affect sensitive groups'},
-    {'range': (101, 150), 'color': (255, 165, 0), 'name': 'Unhealthy for Sensitive', 
-     'desc': 'Members of sensitive groups may experience health effects'},
-    {'range': (151, 200), 'color': (255, 69, 0), 'name': 'Unhealthy', 
-     'desc': 'Everyone may begin to experience health effects'},
-    {'range': (201, 300), 'color': (255, 0, 0), 'name': 'Very Unhealthy', 
-     'desc': 'Health warnings of emergency conditions for everyone'},
-    {'range': (301, 500), 'color': (128, 0, 0), 'name': 'Hazardous', 
-     'desc': 'Health alert: everyone may experience serious health effects'}
-]
-
 GRADIENT_COLORS = [level['color'] for level in AQI_LEVELS]
 
 # 详细的历史事件信息
@@ -89,6 +116,35 @@ COLORS = {
     'particle_hazardous': (255, 0, 0)
 }
 
+# 背景粒子按AQI级别（Good、Moderate、Unhealthy for Sensitive、更差）的(颜色, 大小, 速度)
+PARTICLE_PROPERTIES = [
+    (COLORS['particle_good'], 3, 1),
+    (COLORS['particle_moderate'], 4, 1.5),
+    (COLORS['particle_unhealthy'], 5, 2),
+    (COLORS['particle_hazardous'], 6, 2.5),
+]
+NO_DATA_PARTICLE_PROPERTIES = (MISSING_COLOR, 3, 0.5)  # 没有读数时粒子为灰色并缓慢移动
+
+BACKDROP_ALPHA = 70  # 年份背景图片的最大不透明度
+
+# 时间轴上可循环切换的滑动平均窗口（月数 -> 标签）
+ROLLING_WINDOWS = [(3, '3M'), (12, '12M'), (60, '5Y')]
+ROLLING_COLOR = (100, 200, 255)
+
+# 时间轴堆叠柱状图的统计单位 -> 标题
+BAND_VIEWS = {'hours': "Hours", 'days': "Days (daily max)"}
+
+# 动画时钟（毫秒）；离线导出时替换为按帧计算的时钟，使渲染结果与实际耗时无关
+_animation_clock = pygame.time.get_ticks
+
+def animation_ticks():
+    return _animation_clock()
+
+def set_animation_clock(clock):
+    """替换动画时钟；clock为None时恢复使用pygame.time.get_ticks"""
+    global _animation_clock
+    _animation_clock = clock or pygame.time.get_ticks
+
 def interpolate_color(color1, color2, factor):
     """在两个颜色之间插值"""
     return tuple(int(color1[i] + (color2[i] - color1[i]) * factor) for i in range(3))
@@ -106,12 +162,219 @@ def get_color_for_value(value, min_val=0, max_val=150):
     
     return interpolate_color(GRADIENT_COLORS[section], GRADIENT_COLORS[section + 1], factor)
 
+@functools.lru_cache(maxsize=None)
+def resolve_font_path(name, bold=False):
+    """解析系统字体文件路径并缓存到磁盘，避免每次启动都枚举系统字体"""
+    if name is None:
+        return None, bold
+    key = f"{name}|{'bold' if bold else 'regular'}"
+    path = cache_path(FONT_CACHE_FILE)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    
+    entry = cached.get(key)
+    if entry is not None and (entry[0] is None or os.path.exists(entry[0])):
+        return entry[0], entry[1]
+    
+    # 缓存未命中：与SysFont相同的查找方式（只在首次运行时执行）
+    font_path = pygame.font.match_font(name, bold=bold)
+    synthetic_bold = bold and (font_path is None or font_path == pygame.font.match_font(name))
+    cached[key] = [font_path, synthetic_bold]
+    atomic_write(path, json.dumps(cached, indent=2))
+    return font_path, synthetic_bold
+
+@functools.lru_cache(maxsize=None)
+def get_font(size, bold=False, name=FONT_NAME):
+    """获取字体对象（进程内缓存，name为None时使用Pygame默认字体）"""
+    font_path, synthetic_bold = resolve_font_path(name, bold)
+    font = pygame.font.Font(font_path, size)
+    if synthetic_bold:
+        font.set_bold(True)
+    return font
+
+@functools.lru_cache(maxsize=1024)
+def render_text(text, size, bold=False, color=COLORS['text']):
+    """渲染并缓存文字Surface（对比模式两侧共用；数值文字只随过渡关键帧变化）"""
+    return get_font(size, bold).render(text, True, color)
+
+class Layout:
+    """界面布局：所有位置和尺寸都由渲染分辨率计算
+
+    原始设计基于WIDTH x HEIGHT：区域网格和时间轴按宽、高分别缩放以填满画面，
+    字体、边距和特效尺寸按统一比例scale缩放以保持形状不变。
+    """
+    grid_size = 3
+    
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        sx = width / WIDTH
+        sy = height / HEIGHT
+        self.scale = min(sx, sy)
+        self.margin = round(50 * sx)
+        self.grid_top = round(100 * sy)
+        self.cell_width = (width - 2 * self.margin) // self.grid_size
+        self.cell_height = round(200 * sy)
+        self.cell_gap = self.s(10)
+        self.timeline_rect = pygame.Rect(round(150 * sx), height - round(200 * sy),
+                                         width - round(300 * sx), round(150 * sy))
+    
+    @property
+    def size(self):
+        return self.width, self.height
+    
+    def s(self, value):
+        """按统一比例缩放的像素值"""
+        return int(round(value * self.scale))
+    
+    def line_width(self, value):
+        return max(1, self.s(value))
+    
+    def font(self, size, bold=False, name=FONT_NAME):
+        """按布局比例缩放的字体"""
+        return get_font(max(8, self.s(size)), bold, name)
+    
+    def text(self, text, size, bold=False, color=COLORS['text']):
+        """按布局比例缩放的缓存文字"""
+        return render_text(text, max(8, self.s(size)), bold, color)
+    
+    def district_origin(self, index):
+        """区域格子的左上角坐标"""
+        row, col = divmod(index, self.grid_size)
+        return self.margin + col * self.cell_width, self.grid_top + row * self.cell_height
+    
+    def district_rect(self, index):
+        x, y = self.district_origin(index)
+        return pygame.Rect(x, y, self.cell_width - self.cell_gap, self.cell_height - self.cell_gap)
+    
+    @property
+    def map_rect(self):
+        """区域网格占据的整个地图区域"""
+        return pygame.Rect(self.margin, self.grid_top,
+                           self.grid_size * self.cell_width - self.cell_gap,
+                           self.grid_size * self.cell_height - self.cell_gap)
+    
+    @property
+    def comparison_rect(self):
+        """对比模式使用的地图区域：去掉被图例和时间轴遮挡的部分"""
+        rect = self.map_rect
+        rect.width = min(rect.width, self.width - self.s(280) - self.cell_gap - rect.left)
+        rect.height = min(rect.height, self.timeline_rect.top - self.cell_gap - rect.top)
+        return rect
+    
+    def district_at(self, pos):
+        """返回坐标所在区域的下标，不在区域网格内时返回None"""
+        x, y = pos
+        if not self.grid_top <= y <= self.grid_top + self.grid_size * self.cell_height:
+            return None
+        row = (y - self.grid_top) // self.cell_height
+        col = (x - self.margin) // self.cell_width
+        index = row * self.grid_size + col
+        if 0 <= col < self.grid_size and 0 <= index < len(DISTRICTS):
+            return index
+        return None
+
+def parse_size(text):
+    """把"宽x高"解析为(宽, 高)"""
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}, expected WIDTHxHEIGHT") from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}")
+    return width, height
+
+YEARS = range(1993, 2024)
+
+def historical_baseline(year):
+    """香港历史空气质量月度基准数据（基于环境保护署公开数据）"""
+    # 数据来源: https://www.aqhi.gov.hk/en/download/historical-data.html
+    if year >= 1993 and year <= 2000:
+        # 1993-2000年的数据（较高污染时期）
+        return np.array([
+            85., 95., 80., 75., 70., 65.,
+            90., 100., 85., 80., 75., 70.
+        ])
+    elif year > 2000 and year <= 2010:
+        # 2001-2010年的数据（开始实施管制措施）
+        return np.array([
+            70., 75., 65., 60., 55., 50.,
+            80., 85., 70., 65., 60., 55.
+        ])
+    elif year > 2010 and year <= 2015:
+        # 2011-2015年的数据（持续改善期）
+        return np.array([
+            55., 60., 50., 45., 40., 35.,
+            65., 70., 55., 50., 45., 40.
+        ])
+    elif year > 2015 and year <= 2020:
+        # 2016-2020年的数据（进一步改善）
+        return np.array([
+            40., 45., 35., 30., 25., 20.,
+            50., 55., 40., 35., 30., 25.
+        ])
+    else:
+        # 2021-2023年的最新数据
+        return np.array([
+            35., 40., 30., 25., 20., 15.,
+            45., 50., 35., 30., 25., 20.
+        ])
+
+POLLUTANTS = ['AQI']  # 数据集快照中的污染物
+
+# 数据立方体中的污染物：AQHI和各污染物的月均值由逐小时数据在后台计算后补充
+CUBE_POLLUTANTS = POLLUTANTS + list(HOURLY_CHANNELS)
+
+# 各污染物的显示满刻度：达到该值时颜色和粒子效果与AQI 150相同
+POLLUTANT_SCALES = {'AQI': 150, 'AQHI': 10, 'NO2': 120, 'O3': 100, 'SO2': 30, 'PM10': 110, 'PM2.5': 65}
+
+def format_pollutant_value(value, pollutant):
+    """污染物数值的显示文本（AQHI保留一位小数，缺失时显示--）"""
+    if np.isnan(value):
+        return "--"
+    return f"{value:.1f}" if pollutant == 'AQHI' else str(int(value))
+
+def generate_year_data(year, seed=DATASET_SEED):
+    """生成单个年份各区域的月度数据，形状为(区域, 月份)"""
+    rng = np.random.default_rng([seed, year])
+    # 添加随机波动以反映日常变化，并确保数值在合理范围内
+    aqi = np.clip(historical_baseline(year) + rng.normal(0, 5, 12), 0, 150)
+    # 基于基准数据生成区域差异
+    variation = rng.normal(0, 10, len(DISTRICTS))
+    return np.clip(aqi[np.newaxis, :] + variation[:, np.newaxis], 0, 150)
+
+def build_dataset(seed):
+    """生成完整数据集，布局与AQCube.values相同：[区域, 年份, 月份, 污染物]"""
+    values = np.empty((len(DISTRICTS), len(YEARS), 12, len(POLLUTANTS)), dtype=np.float32)
+    for i, year in enumerate(YEARS):
+        values[:, i, :, 0] = generate_year_data(year, seed)
+    meta = {'districts': DISTRICTS, 'years': [YEARS[0], YEARS[-1]], 'pollutants': POLLUTANTS}
+    return values, meta
+
+def load_dataset(seed=DATASET_SEED):
+    """加载（首次运行时或生成器源文件变化后生成）数据集快照，返回只读的内存映射数组"""
+    values, _ = load_or_build_snapshot('aqi-monthly', DATASET_VERSION, seed, build_dataset, DATASET_SOURCES)
+    return values
+
 class Graph:
-    def __init__(self, x, y, width, height):
+    def __init__(self, x, y, width, height, scale=1.0):
         self.rect = pygame.Rect(x, y, width, height)
-        self.font = pygame.font.Font(None, 24)
+        self.scale = scale  # 标签、指示器等尺寸的缩放比例
+        self.font = get_font(self.s(24), name=None)
+        self.year_range = (YEARS[0], YEARS[-1])  # 实时模式下会延伸到当前年份
         self.year_positions = {}  # 存储年份与其x坐标的映射
         
+    def s(self, value):
+        return max(1, int(round(value * self.scale)))
+    
+    def year_count(self, year_range=None):
+        """横轴覆盖的年数：每个年份占一段等宽区间，年份的点位于该区间的起点（1月）"""
+        year_range = year_range or self.year_range
+        return year_range[1] - year_range[0] + 1
+    
     def get_year_from_mouse_pos(self, mouse_x, mouse_y):
         """根据鼠标位置获取对应的年份"""
         if not self.rect.collidepoint(mouse_x, mouse_y):
@@ -119,16 +382,97 @@ class Graph:
         
         # 计算相对于图表左边的位置
         relative_x = mouse_x - self.rect.left
-        year_range = (1993, 2023)
+        year_range = self.year_range
         
         # 根据x坐标计算年份
         year_fraction = relative_x / self.rect.width
-        calculated_year = year_range[0] + year_fraction * (year_range[1] - year_range[0])
+        calculated_year = year_range[0] + year_fraction * self.year_count()
         
         # 返回最接近的整数年份
-        return max(1993, min(2023, round(calculated_year)))
-        
-    def draw(self, screen, data, year_range=(1993, 2023), current_year=1993):
+        return max(year_range[0], min(year_range[1], round(calculated_year)))
+    
+    def get_month_from_mouse_x(self, mouse_x):
+        """根据鼠标x坐标获取时间轴上的月份下标（0为起始年份的1月）"""
+        relative_x = min(max(mouse_x - self.rect.left, 0), self.rect.width)
+        year_fraction = relative_x / self.rect.width
+        return int(round(year_fraction * self.year_count() * 12))
+    
+    def x_for_month(self, month_index):
+        """时间轴月份下标对应的x坐标（与x_for_year一致：年份的点位于该年1月）"""
+        return self.rect.left + month_index * self.rect.width / (self.year_count() * 12)
+    
+    def draw_rolling_mean(self, screen, rolling, label, full_scale=150):
+        """绘制滑动平均曲线（数据不完整处断开）"""
+        points = []
+        for month_index, value in enumerate(np.append(rolling, np.nan)):
+            if np.isnan(value) or self.x_for_month(month_index) > self.rect.right:
+                if len(points) > 1:
+                    pygame.draw.lines(screen, ROLLING_COLOR, False, points, 1)
+                points = []
+                continue
+            y = self.rect.bottom - (min(value, full_scale) / full_scale) * self.rect.height
+            points.append((self.x_for_month(month_index), y))
+        
+        label_text = self.font.render(f"Rolling {label}", True, ROLLING_COLOR)
+        screen.blit(label_text, (self.rect.right - label_text.get_width() - self.s(5), self.rect.top + self.s(5)))
+    
+    def draw_selected_range(self, screen, start, stop, stats_text):
+        """绘制用户选择的时间范围及其统计信息"""
+        left = int(self.x_for_month(start))
+        right = int(self.x_for_month(stop))
+        range_surface = pygame.Surface((max(1, right - left), self.rect.height), pygame.SRCALPHA)
+        range_surface.fill((*ROLLING_COLOR, 40))
+        screen.blit(range_surface, (left, self.rect.top))
+        pygame.draw.line(screen, ROLLING_COLOR, (left, self.rect.top), (left, self.rect.bottom))
+        pygame.draw.line(screen, ROLLING_COLOR, (right, self.rect.top), (right, self.rect.bottom))
+        
+        text = self.font.render(stats_text, True, ROLLING_COLOR)
+        screen.blit(text, (left + self.s(5), self.rect.top + self.s(5)))
+        
+    def draw_reference_year(self, screen, year):
+        """对比模式下标出左侧固定的年份"""
+        x = self.x_for_year(year)
+        pygame.draw.line(screen, ROLLING_COLOR, (x, self.rect.top), (x, self.rect.bottom), max(1, self.s(2)))
+        text = self.font.render(str(year), True, ROLLING_COLOR)
+        screen.blit(text, (x + self.s(4), self.rect.top + self.s(4)))
+    
+    def x_for_year(self, year, year_range=None):
+        """年份对应的x坐标"""
+        year_range = year_range or self.year_range
+        return self.rect.left + (year - year_range[0]) * self.rect.width // self.year_count(year_range)
+        
+    def draw_band_bars(self, screen, fractions, scale, label, year_range):
+        """绘制每年各级别所占比例的堆叠柱状图（fractions为(年份, 级别)，从YEARS[0]开始）"""
+        interval = self.rect.width / self.year_count(year_range)
+        bar_width = max(1, int(interval * 0.7))
+        for i, year_fractions in enumerate(fractions):
+            year = YEARS[0] + i
+            if not year_range[0] <= year <= year_range[1] or np.isnan(year_fractions).any():
+                continue
+            x = self.x_for_year(year, year_range) + int((interval - bar_width) / 2)
+            bottom = float(self.rect.bottom)
+            for band, fraction in enumerate(year_fractions):
+                height = fraction * self.rect.height
+                if height >= 0.5:
+                    pygame.draw.rect(screen, scale.colors[band],
+                                     (x, int(round(bottom - height)), bar_width, int(round(height)) or 1))
+                bottom -= height
+        
+        # 标题和图例
+        title = self.font.render(label, True, COLORS['text'])
+        screen.blit(title, (self.rect.left + self.s(5), self.rect.top + self.s(5)))
+        x = self.rect.left + self.s(5)
+        y = self.rect.top + self.s(10) + title.get_height()
+        swatch = self.s(10)
+        for name, color in zip(scale.names, scale.colors):
+            pygame.draw.rect(screen, color, (x, y + self.s(3), swatch, swatch))
+            text = get_font(self.s(16), name=None).render(name, True, COLORS['text'])
+            screen.blit(text, (x + swatch + self.s(4), y))
+            x += swatch + text.get_width() + self.s(12)
+        
+    def draw(self, screen, cube, year_range=None, current_year=1993, pollutant='AQI', full_scale=150, bands=None):
+        """绘制时间轴图表；bands为(比例, 级别定义, 标题)时用堆叠柱状图代替数据线"""
+        year_range = year_range or self.year_range
         # 绘制背景
         pygame.draw.rect(screen, COLORS['graph_bg'], self.rect)
         
@@ -138,9 +482,10 @@ class Graph:
             pygame.draw.line(screen, COLORS['grid'], 
                            (self.rect.left, y), 
                            (self.rect.right, y))
-            value = 150 - (i * 30)
-            text = self.font.render(str(value), True, COLORS['text'])
-            screen.blit(text, (self.rect.left - 30, y - 10))
+            value = full_scale - i * full_scale / 5
+            label = f"{100 - i * 20}%" if bands is not None else f"{value:g}"
+            text = self.font.render(label, True, COLORS['text'])
+            screen.blit(text, (self.rect.left - self.s(30), y - self.s(10)))
         
         # 清空年份位置映射
         self.year_positions = {}
@@ -148,7 +493,7 @@ class Graph:
         # 绘制横坐标网格和标签（年份）
         year_interval = 5  # 每5年显示一个标签
         for i, year in enumerate(range(year_range[0], year_range[1] + 1, year_interval)):
-            x = self.rect.left + (year - year_range[0]) * self.rect.width // (year_range[1] - year_range[0])
+            x = self.x_for_year(year, year_range)
             
             # 存储年份位置
             self.year_positions[year] = x
@@ -163,53 +508,68 @@ class Graph:
             
             # 绘制年份标签
             if is_current:
-                year_text = pygame.font.Font(None, 28).render(str(year), True, COLORS['highlight'])
+                year_text = get_font(self.s(28), name=None).render(str(year), True, COLORS['highlight'])
                 # 添加背景高亮
-                highlight_surface = pygame.Surface((50, 25), pygame.SRCALPHA)
+                highlight_surface = pygame.Surface((self.s(50), self.s(25)), pygame.SRCALPHA)
                 highlight_surface.fill((*COLORS['highlight'][:3], 50))
-                screen.blit(highlight_surface, (x - 25, self.rect.bottom + 5))
+                screen.blit(highlight_surface, (x - self.s(25), self.rect.bottom + self.s(5)))
             else:
                 year_text = self.font.render(str(year), True, COLORS['text'])
             
             text_rect = year_text.get_rect()
-            screen.blit(year_text, (x - text_rect.width // 2, self.rect.bottom + 5))
+            screen.blit(year_text, (x - text_rect.width // 2, self.rect.bottom + self.s(5)))
         
         # 绘制年份点击提示
         if len(self.year_positions) > 0:
-            hint_text = pygame.font.Font(None, 18).render("Click on years to jump", True, COLORS['text_secondary'])
-            screen.blit(hint_text, (self.rect.left, self.rect.bottom + 35))
+            hint_text = get_font(self.s(18), name=None).render("Click on years to jump", True, COLORS['text_secondary'])
+            screen.blit(hint_text, (self.rect.left, self.rect.bottom + self.s(35)))
         
         # 绘制当前年份指示器
-        current_x = self.rect.left + (current_year - year_range[0]) * self.rect.width // (year_range[1] - year_range[0])
+        current_x = self.x_for_year(current_year, year_range)
         if self.rect.left <= current_x <= self.rect.right:
             # 绘制垂直指示线
             pygame.draw.line(screen, COLORS['highlight'], 
                            (current_x, self.rect.top), 
-                           (current_x, self.rect.bottom), 3)
+                           (current_x, self.rect.bottom), self.s(3))
             
             # 绘制顶部三角形指示器
             triangle_points = [
-                (current_x, self.rect.top - 10),
-                (current_x - 8, self.rect.top - 2),
-                (current_x + 8, self.rect.top - 2)
+                (current_x, self.rect.top - self.s(10)),
+                (current_x - self.s(8), self.rect.top - self.s(2)),
+                (current_x + self.s(8), self.rect.top - self.s(2))
             ]
             pygame.draw.polygon(screen, COLORS['highlight'], triangle_points)
             
-        # 绘制数据线
+        if bands is not None:
+            self.draw_band_bars(screen, *bands, year_range)
+            return
+        
+        # 绘制数据线（尚未加载的年份处断开）
+        year_means = cube.territory_year_means(pollutant)
         points = []
-        for year in range(year_range[0], year_range[1] + 1):
-            x = self.rect.left + (year - year_range[0]) * self.rect.width // (year_range[1] - year_range[0])
-            y = self.rect.bottom - (np.mean(data[year]) / 150.0) * self.rect.height
+        for year in range(year_range[0], year_range[1] + 2):
+            if not cube.is_loaded(year):
+                if len(points) > 1:
+                    pygame.draw.lines(screen, COLORS['highlight'], False, points, self.s(2))
+                points = []
+                continue
+            x = self.x_for_year(year, year_range)
+            value = float(year_means[cube.position('year', year)])
+            if np.isnan(value):
+                # 该污染物没有数据的年份（例如只有AQI的实时数据）处断开
+                if len(points) > 1:
+                    pygame.draw.lines(screen, COLORS['highlight'], False, points, self.s(2))
+                points = []
+                continue
+            y = self.rect.bottom - (value / full_scale) * self.rect.height
             points.append((x, y))
             
-        if len(points) > 1:
-            pygame.draw.lines(screen, COLORS['highlight'], False, points, 2)
-            
         # 在数据线上绘制当前年份的点
-        if self.rect.left <= current_x <= self.rect.right:
-            current_y = self.rect.bottom - (np.mean(data[int(current_year)]) / 150.0) * self.rect.height
-            pygame.draw.circle(screen, COLORS['highlight'], (int(current_x), int(current_y)), 6)
-            pygame.draw.circle(screen, COLORS['background'], (int(current_x), int(current_y)), 3)
+        current_value = cube.year_mean(int(current_year), pollutant=pollutant) if cube.is_loaded(int(current_year)) else float('nan')
+        if self.rect.left <= current_x <= self.rect.right and not np.isnan(current_value):
+            current_y = self.rect.bottom - (current_value / full_scale) * self.rect.height
+            pygame.draw.circle(screen, COLORS['highlight'], (int(current_x), int(current_y)), self.s(6))
+            pygame.draw.circle(screen, COLORS['background'], (int(current_x), int(current_y)), self.s(3))
 
 class Particle:
     def __init__(self, x, y, color, size, speed):
@@ -221,51 +581,71 @@ class Particle:
         self.speed = speed
         self.angle = random.uniform(0, 2 * np.pi)
         
-    def move(self):
+    def move(self, width, height):
         # 模拟布朗运动
         self.angle += random.uniform(-0.1, 0.1)
         self.x += np.cos(self.angle) * self.speed
         self.y += np.sin(self.angle) * self.speed
         # 3D效果：z轴周期性运动
-        self.z = 50 * np.sin(pygame.time.get_ticks() * 0.001 + self.angle)
+        self.z = 50 * np.sin(animation_ticks() * 0.001 + self.angle)
         
-        # 边界检查
+        # 边界检查（在画面边缘环绕）
         if self.x < 0:
-            self.x = WIDTH
-        elif self.x > WIDTH:
+            self.x = width
+        elif self.x > width:
             self.x = 0
         if self.y < 0:
-            self.y = HEIGHT
-        elif self.y > HEIGHT:
+            self.y = height
+        elif self.y > height:
             self.y = 0
             
-    def draw(self, screen):
-        # 3D效果：根据z坐标调整大小和亮度
-        depth_factor = (self.z + 50) / 100  # 0到1之间
-        size = int(self.base_size * (0.5 + depth_factor * 0.5))
-        
-        # 调整颜色亮度
-        color = tuple(int(c * (0.7 + depth_factor * 0.3)) for c in self.color)
-        
-        # 绘制主粒子
-        pygame.draw.circle(screen, color, (int(self.x), int(self.y)), size)
-        
-        # 添加光晕效果
-        glow_surface = pygame.Surface((size * 4, size * 4), pygame.SRCALPHA)
-        glow_radius = size * 2
-        glow_color = (*color[:3], 50)  # 半透明的光晕
-        pygame.draw.circle(glow_surface, glow_color, (size * 2, size * 2), glow_radius)
-        screen.blit(glow_surface, (int(self.x - size * 2), int(self.y - size * 2)), special_flags=pygame.BLEND_ADD)
+    def draw(self, screen, glow=True):
+        draw_particle(screen, self.x, self.y, self.z, self.color, self.base_size, glow)
+
+    def draw_textured(self, canvas, glow=True):
+        draw_particle_textured(canvas, self.x, self.y, self.z, self.color, self.base_size, glow)
+
+def draw_particle(screen, x, y, z, base_color, base_size, glow=True):
+    """绘制单个背景粒子（Particle对象和多线程模拟快照共用）；开启后处理光晕时不画单独的光晕"""
+    # 3D效果：根据z坐标调整大小和亮度
+    depth_factor = (z + 50) / 100  # 0到1之间
+    size = int(base_size * (0.5 + depth_factor * 0.5))
+    
+    # 调整颜色亮度
+    color = tuple(int(c * (0.7 + depth_factor * 0.3)) for c in base_color)
+    
+    # 绘制主粒子
+    pygame.draw.circle(screen, color, (int(x), int(y)), size)
+    
+    # 添加光晕效果
+    if not glow:
+        return
+    glow_surface = pygame.Surface((size * 4, size * 4), pygame.SRCALPHA)
+    glow_radius = size * 2
+    glow_color = (*color[:3], 50)  # 半透明的光晕
+    pygame.draw.circle(glow_surface, glow_color, (size * 2, size * 2), glow_radius)
+    screen.blit(glow_surface, (int(x - size * 2), int(y - size * 2)), special_flags=pygame.BLEND_ADD)
+
+def draw_particle_textured(canvas, x, y, z, base_color, base_size, glow=True):
+    """draw_particle的纹理版本"""
+    depth_factor = (z + 50) / 100
+    size = int(base_size * (0.5 + depth_factor * 0.5))
+    color = tuple(int(c * (0.7 + depth_factor * 0.3)) for c in base_color)
+    canvas.circle(color, (x, y), size)
+    if glow:
+        # BLEND_ADD不使用源alpha，光晕按完整颜色叠加
+        canvas.circle(color, (x, y), size * 2, additive=True)
 
 class RippleEffect:
-    def __init__(self, x, y, color):
+    def __init__(self, x, y, color, scale=1.0):
         self.x = x
         self.y = y
         self.radius = 0
-        self.max_radius = 100
+        self.max_radius = max(1, int(100 * scale))
         self.color = color
         self.alpha = 255
-        self.speed = 3
+        self.speed = 3 * scale
+        self.width = max(1, round(2 * scale))
         
     def update(self):
         self.radius += self.speed
@@ -276,19 +656,23 @@ class RippleEffect:
         if self.alpha > 0:
             ripple_surface = pygame.Surface((self.max_radius * 2, self.max_radius * 2), pygame.SRCALPHA)
             ripple_color = (*self.color[:3], int(self.alpha))
-            pygame.draw.circle(ripple_surface, ripple_color, (self.max_radius, self.max_radius), int(self.radius), 2)
+            pygame.draw.circle(ripple_surface, ripple_color, (self.max_radius, self.max_radius), int(self.radius), self.width)
             screen.blit(ripple_surface, (self.x - self.max_radius, self.y - self.max_radius))
 
+    def draw_textured(self, canvas):
+        if self.alpha > 0:
+            canvas.ring(self.color, (self.x, self.y), self.radius, self.width, self.alpha)
+
 class FloatingParticle:
-    def __init__(self, x, y, color):
+    def __init__(self, x, y, color, scale=1.0):
         self.x = float(x)
         self.y = float(y)
         self.start_x = x
         self.start_y = y
         self.color = color
-        self.size = random.randint(2, 6)
+        self.size = max(1, round(random.randint(2, 6) * scale))
         self.angle = random.uniform(0, 2 * math.pi)
-        self.speed = random.uniform(0.5, 2.0)
+        self.speed = random.uniform(0.5, 2.0) * scale
         self.lifetime = 180  # 3秒 at 60fps
         self.age = 0
         
@@ -320,20 +704,26 @@ class FloatingParticle:
             pygame.draw.circle(particle_surface, particle_color, (self.size, self.size), self.size)
             screen.blit(particle_surface, (int(self.x - self.size), int(self.y - self.size)))
 
+    def draw_textured(self, canvas):
+        alpha = max(0, 255 - (self.age / self.lifetime) * 255)
+        if alpha > 0:
+            canvas.circle(self.color, (self.x, self.y), self.size, alpha)
+
 class ParticleExplosion:
-    def __init__(self, x, y, color, intensity=20):
+    def __init__(self, x, y, color, intensity=20, scale=1.0):
         self.x = x
         self.y = y
         self.color = color
         self.particles = []
         self.lifetime = 120
         self.age = 0
+        self.gravity = 0.1 * scale
         
         # 创建爆炸粒子
         for _ in range(intensity):
             angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(2, 8)
-            size = random.randint(2, 5)
+            speed = random.uniform(2, 8) * scale
+            size = max(1, round(random.randint(2, 5) * scale))
             self.particles.append({
                 'x': float(x),
                 'y': float(y),
@@ -348,7 +738,7 @@ class ParticleExplosion:
         for particle in self.particles:
             particle['x'] += particle['vx']
             particle['y'] += particle['vy']
-            particle['vy'] += 0.1  # 重力
+            particle['vy'] += self.gravity  # 重力
             particle['vx'] *= 0.99  # 空气阻力
             particle['life'] -= 1
         
@@ -365,125 +755,124 @@ class ParticleExplosion:
                 pygame.draw.circle(particle_surface, particle_color, (particle['size'], particle['size']), particle['size'])
                 screen.blit(particle_surface, (int(particle['x'] - particle['size']), int(particle['y'] - particle['size'])))
 
-class DataSparkle:
-    def __init__(self, x, y, value):
-        self.x = x
-        self.y = y
-        self.value = value
-        self.size = random.uniform(1, 3)
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.speed = random.uniform(0.5, 1.5)
-        self.lifetime = random.randint(180, 300)
-        self.age = 0
-        self.flash_timer = 0
-        
-    def update(self):
-        self.angle += 0.02
-        self.x += math.cos(self.angle) * self.speed
-        self.y += math.sin(self.angle) * self.speed
-        self.age += 1
-        self.flash_timer += 1
-        return self.age < self.lifetime
-    
-    def draw(self, screen):
-        alpha = max(0, 255 - (self.age / self.lifetime) * 255)
-        flash_intensity = abs(math.sin(self.flash_timer * 0.2)) * 0.5 + 0.5
-        
-        if alpha > 20:
-            # 根据数值确定颜色
-            if self.value < 50:
-                color = (0, 255, 0)  # 绿色 - 好
-            elif self.value < 100:
-                color = (255, 255, 0)  # 黄色 - 中等
-            else:
-                color = (255, 0, 0)  # 红色 - 差
-            
-            sparkle_surface = pygame.Surface((self.size * 4, self.size * 4), pygame.SRCALPHA)
-            sparkle_color = (*color, int(alpha * flash_intensity))
-            
-            # 绘制星形闪烁
-            center = (self.size * 2, self.size * 2)
-            for i in range(4):
-                angle = i * math.pi / 2
-                end_x = center[0] + math.cos(angle) * self.size * 2
-                end_y = center[1] + math.sin(angle) * self.size * 2
-                pygame.draw.line(sparkle_surface, sparkle_color, center, (end_x, end_y), 2)
-            
-            screen.blit(sparkle_surface, (int(self.x - self.size * 2), int(self.y - self.size * 2)))
+    def draw_textured(self, canvas):
+        for particle in self.particles:
+            alpha = max(0, 255 * (particle['life'] / 120))
+            if alpha > 0:
+                canvas.circle(self.color, (particle['x'], particle['y']), particle['size'], alpha)
 
 class WeatherEffect:
-    def __init__(self, effect_type, aqi_level):
-        self.type = effect_type  # "rain", "fog", "clear"
+    """雾效果（雨使用向量化的RainEffect）"""
+    
+    def __init__(self, effect_type, aqi_level, size=(WIDTH, HEIGHT), scale=1.0):
+        self.type = effect_type  # "fog", "clear"
         self.aqi_level = aqi_level
+        self.width, self.height = size
+        self.scale = scale
         self.particles = []
-        self.intensity = min(100, max(10, aqi_level))  # 基于AQI调整强度
+        self.intensity = int(min(100, max(10, aqi_level)))  # 基于AQI调整强度
         
         # 创建天气粒子
         for _ in range(self.intensity):
-            if effect_type == "rain":
+            if effect_type == "fog":
                 self.particles.append({
-                    'x': random.randint(0, WIDTH),
-                    'y': random.randint(-100, 0),
-                    'speed': random.uniform(3, 8),
-                    'length': random.randint(10, 20)
-                })
-            elif effect_type == "fog":
-                self.particles.append({
-                    'x': random.randint(0, WIDTH),
-                    'y': random.randint(0, HEIGHT),
-                    'drift_x': random.uniform(-0.5, 0.5),
-                    'drift_y': random.uniform(-0.2, 0.2),
-                    'size': random.randint(20, 50),
+                    'x': random.randint(0, self.width),
+                    'y': random.randint(0, self.height),
+                    'drift_x': random.uniform(-0.5, 0.5) * scale,
+                    'drift_y': random.uniform(-0.2, 0.2) * scale,
+                    'size': max(1, round(random.randint(20, 50) * scale)),
                     'alpha': random.randint(10, 30)
                 })
     
     def update(self):
-        if self.type == "rain":
-            for particle in self.particles:
-                particle['y'] += particle['speed']
-                if particle['y'] > HEIGHT:
-                    particle['y'] = random.randint(-100, 0)
-                    particle['x'] = random.randint(0, WIDTH)
-        
-        elif self.type == "fog":
+        if self.type == "fog":
+            edge = 50 * self.scale
             for particle in self.particles:
                 particle['x'] += particle['drift_x']
                 particle['y'] += particle['drift_y']
-                if particle['x'] < -50:
-                    particle['x'] = WIDTH + 50
-                elif particle['x'] > WIDTH + 50:
-                    particle['x'] = -50
+                if particle['x'] < -edge:
+                    particle['x'] = self.width + edge
+                elif particle['x'] > self.width + edge:
+                    particle['x'] = -edge
     
     def draw(self, screen):
-        if self.type == "rain":
-            for particle in self.particles:
-                color = (100, 150, 255, 100)  # 蓝色雨滴
-                start_pos = (particle['x'], particle['y'])
-                end_pos = (particle['x'], particle['y'] + particle['length'])
-                pygame.draw.line(screen, color[:3], start_pos, end_pos, 2)
-        
-        elif self.type == "fog":
-            fog_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        if self.type == "fog":
+            fog_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
             for particle in self.particles:
                 fog_color = (200, 200, 200, particle['alpha'])
                 pygame.draw.circle(fog_surface, fog_color, 
                                  (int(particle['x']), int(particle['y'])), particle['size'])
             screen.blit(fog_surface, (0, 0))
 
+    def draw_textured(self, canvas):
+        if self.type == "fog":
+            for particle in self.particles:
+                canvas.circle((200, 200, 200), (particle['x'], particle['y']), particle['size'], particle['alpha'])
+
 class AirQualityViz:
-    def __init__(self):
+    def __init__(self, threaded_simulation=False, backdrops=False, seed=DATASET_SEED,
+                 live_source=None, live_retention_hours=24, size=(WIDTH, HEIGHT), bloom=False,
+                 archive_format=DEFAULT_ARCHIVE_FORMAT, chunk_cache_mb=DEFAULT_CHUNK_CACHE_MB):
+        self.layout = Layout(*size)  # 所有绘制都基于渲染画布的尺寸
         self.particles = []
         self.year = 1993
         self.target_year = 1993  # 目标年份，用于平滑过渡
         self.year_transition_speed = 0.05  # 年份过渡速度
-        self.aqi_data = self.generate_historical_data()
-        self.district_data = self.generate_district_data()
-        # Use basic font for better compatibility
-        self.font = pygame.font.SysFont('Arial', 36)
-        self.small_font = pygame.font.SysFont('Arial', 18)  # 减小右边字体大小
-        self.bold_font = pygame.font.SysFont('Arial', 20, bold=True)  # 加粗字体用于地名
+        self.autoplay_frames = 0  # 自动播放计数，每AUTOPLAY_FRAMES帧前进一年
+        
+        # 按年份懒加载数据：后台线程从内存映射的快照中读取目标年份及相邻年份，
+        # 主线程在帧边界把它们写入数据立方体
+        self.dataset_seed = seed
+        self.dataset = load_dataset(seed)
+        self.cube = AQCube(DISTRICTS, YEARS, CUBE_POLLUTANTS)
+        # AQHI和各污染物：逐小时数据在后台加载（首次运行时计算），就绪后补充到数据立方体
+        self.aqhi = AQHIArchive(self.dataset[..., 0], DISTRICTS, YEARS, seed, DATASET_VERSION,
+                                archive_format, chunk_cache_mb)
+        self.aqhi_applied = False
+        self.loader = YearDataLoader(self.load_year_data, YEARS)
+        self.loader.prefetch(self.target_year)
+        self.loader.wait(self.target_year)  # 只在启动时等待首个年份
+        self.receive_loaded_years()
+        self.shown_year = self.target_year  # 最近一次有数据可显示的年份
+        # 年份过渡的关键帧表：各区域AQI、颜色和粒子属性按小数年份查表
+        self.transitions = TransitionTables(get_color_for_value, self.get_particle_properties,
+                                            {p: 150 / scale for p, scale in POLLUTANT_SCALES.items()})
+        
+        # 添加重要历史事件标记
+        self.historical_events = {
+            1995: "实施空气质量指标",
+            2000: "引入更严格的车辆排放标准",
+            2005: "推行清洁生产伙伴计划",
+            2010: "实施区域性空气质量管理策略",
+            2015: "更新空气质量指标",
+            2020: "实施更严格的空气质量目标"
+        }
+        # 字体和时间轴图表随布局变化，在apply_layout()中创建
+        self.timeline_graph = None
+        self.apply_layout()
         self.initialize_particles()
         
+        # 多线程模拟：背景粒子在工作线程中计算，渲染使用上一帧的快照
+        self.simulation = None
+        if threaded_simulation:
+            self.simulation = SimulationWorker(ParticleState.from_particles(self.particles), *self.layout.size)
+            self.particle_snapshot = self.simulation.snapshot
+            self.particle_color = self.particles[0].color
+            self.particle_size = self.particles[0].base_size
+        
+        # 烟雾浓度模式：十万级粒子累加到像素缓冲区绘制（D键切换，首次开启时创建）
+        self.smog_mode = False
+        self.smog = None
+        self.smog_color = self.particles[0].color
+        
+        # 插值热力图（H键切换，每个污染物首次显示时在后台加载或计算网格缓存）
+        self.show_heatmap = False
+        self.heatmaps = {}  # 污染物 -> (HeatmapGrids, HeatmapRenderer)
+        
+        # 光晕/烟霾后处理（G键切换）：开启时代替逐粒子光晕和雾效果
+        self.bloom_enabled = bloom
+        self.bloom = None
+        
         # 鼠标交互相关变量
         self.mouse_pos = (0, 0)
         self.mouse_trails = []  # 鼠标轨迹
@@ -493,109 +882,245 @@ class AirQualityViz:
         
         # 新增创意效果
         self.particle_explosions = []  # 粒子爆炸效果
-        self.data_sparkles = []  # 数据闪烁效果
+        self.data_sparkles = SparkleField(self.layout.scale, seed=random.getrandbits(32))  # 数据闪烁效果
         self.weather_effects = []  # 天气效果（雨、雾等）
         self.sound_waves = []  # 声波效果
         self.breathing_effects = {}  # 呼吸效果
         self.rainbow_trail = []  # 彩虹轨迹
         self.show_statistics = False  # 统计信息显示
-        self.comparison_mode = False  # 对比模式
+        self.comparison_mode = None  # 对比模式：None、'split'（左右并排）或'wipe'（分割线跟随鼠标）
+        self.comparison = None  # ComparisonView，首次开启时创建
         self.animation_mode = "normal"  # 动画模式
+        self.show_backdrops = backdrops  # 年份背景图片
+        
+        # 时间窗口统计：滑动平均和用户选择的时间范围（月份下标区间[起, 止)）
+        self.time_windows = TimeWindowIndex(self.cube)
+        
+        # 当前显示的污染物（P键切换AQI、AQHI和各污染物）
+        self.pollutant = 'AQI'
+        
+        # 时间轴上的AQHI级别堆叠柱状图（B键在小时数、天数和关闭之间切换）
+        self.band_view = None
+        
+        # 统计面板：统计结果每个数据版本只计算一次，面板图像按内容缓存；每个污染物一个统计引擎
+        self.statistics = StatisticsEngine(self.cube, self.pollutant)
+        self.statistics_engines = {self.pollutant: self.statistics}
+        self.stats_panel = None
+        self.stats_panel_key = None
+        
+        # 实时模式：后台跟踪本地数据源，新读数追加到当前年份
+        self.live_feed = None
+        self.live_store = None
+        if live_source is not None:
+            self.live_feed = LiveFeed(live_source)
+            self.live_store = LiveStore(DISTRICTS, live_retention_hours)
+        self.rolling_window = None  # ROLLING_WINDOWS中的下标
+        self.selected_range = None
+        self.range_drag_start = None
+        self.backdrops = None  # 首次显示时创建
+        self.last_backdrop = None  # 新图片解码完成前继续显示的背景
         
-        # 创建图表对象
-        self.timeline_graph = Graph(150, HEIGHT - 200, WIDTH - 300, 150)
         self.selected_district = None
         
-    def generate_district_data(self):
-        """生成各区域的空气质量数据"""
-        district_data = {district: {} for district in DISTRICTS}
-        base_data = self.generate_historical_data()
-        
-        for district in DISTRICTS:
-            for year in range(1993, 2024):
-                # 基于基准数据生成区域差异
-                variation = np.random.normal(0, 10)  # 区域差异
-                district_data[district][year] = base_data[year] + variation
-                # 确保数值在合理范围内
-                district_data[district][year] = np.clip(district_data[district][year], 0, 150)
-                
-        return district_data
-
-    def generate_historical_data(self):
-        # 香港历史空气质量数据（基于环境保护署公开数据）
-        # 数据来源: https://www.aqhi.gov.hk/en/download/historical-data.html
-        data = {}
-        for year in range(1993, 2024):
-            if year >= 1993 and year <= 2000:
-                # 1993-2000年的数据（较高污染时期）
-                data[year] = np.array([
-                    85., 95., 80., 75., 70., 65.,
-                    90., 100., 85., 80., 75., 70.
-                ])
-            elif year > 2000 and year <= 2010:
-                # 2001-2010年的数据（开始实施管制措施）
-                data[year] = np.array([
-                    70., 75., 65., 60., 55., 50.,
-                    80., 85., 70., 65., 60., 55.
-                ])
-            elif year > 2010 and year <= 2015:
-                # 2011-2015年的数据（持续改善期）
-                data[year] = np.array([
-                    55., 60., 50., 45., 40., 35.,
-                    65., 70., 55., 50., 45., 40.
-                ])
-            elif year > 2015 and year <= 2020:
-                # 2016-2020年的数据（进一步改善）
-                data[year] = np.array([
-                    40., 45., 35., 30., 25., 20.,
-                    50., 55., 40., 35., 30., 25.
-                ])
-            else:
-                # 2021-2023年的最新数据
-                data[year] = np.array([
-                    35., 40., 30., 25., 20., 15.,
-                    45., 50., 35., 30., 25., 20.
-                ])
-            # 添加随机波动以反映日常变化
-            data[year] += np.random.normal(0, 5, 12)
-            # 确保数值在合理范围内
-            data[year] = np.clip(data[year], 0, 150)
-            
-        # 添加重要历史事件标记
-        self.historical_events = {
-            1995: "实施空气质量指标",
-            2000: "引入更严格的车辆排放标准",
-            2005: "推行清洁生产伙伴计划",
-            2010: "实施区域性空气质量管理策略",
-            2015: "更新空气质量指标",
-            2020: "实施更严格的空气质量目标"
-        }
-        return data
+    def apply_layout(self):
+        """根据当前布局创建字体和时间轴图表"""
+        layout = self.layout
+        self.font = layout.font(36)
+        self.small_font = layout.font(18)  # 减小右边字体大小
+        self.bold_font = layout.font(20, bold=True)  # 加粗字体用于地名
+        
+        rect = layout.timeline_rect
+        graph = Graph(rect.x, rect.y, rect.width, rect.height, layout.scale)
+        if self.timeline_graph is not None:
+            graph.year_range = self.timeline_graph.year_range
+        self.timeline_graph = graph
     
-    def get_particle_properties(self, aqi):
-        if aqi < 50:
-            return COLORS['particle_good'], 3, 1
-        elif aqi < 100:
-            return COLORS['particle_moderate'], 4, 1.5
-        elif aqi < 150:
-            return COLORS['particle_unhealthy'], 5, 2
+    def resize(self, size):
+        """渲染画布尺寸变化：重新计算布局，并把粒子按比例移动到新画面中"""
+        old = self.layout
+        self.layout = Layout(*size)
+        if self.layout.size == old.size:
+            return
+        ratio_x = self.layout.width / old.width
+        ratio_y = self.layout.height / old.height
+        ratio_size = self.layout.scale / old.scale
+        for particle in self.particles:
+            particle.x *= ratio_x
+            particle.y *= ratio_y
+            particle.base_size *= ratio_size
+        if self.simulation is not None:
+            self.simulation.resize(self.layout.width, self.layout.height)
+            self.particle_size *= ratio_size
+        if self.smog is not None:
+            self.smog.resize(self.layout.size)
+        if self.bloom is not None:
+            self.bloom.resize(self.layout.size)
+        self.apply_layout()
+        
+        # 基于旧坐标的短暂特效直接清除
+        self.mouse_trails = []
+        self.ripple_effects = []
+        self.floating_particles = []
+        self.particle_explosions = []
+        self.data_sparkles = SparkleField(self.layout.scale, seed=random.getrandbits(32))
+        self.weather_effects = []
+        self.rainbow_trail = []
+        self.district_hover_effects = {}
+        self.stats_panel_key = None
+        if self.backdrops is not None:
+            self.backdrops.resize(self.layout.size)
+            self.last_backdrop = None
+        if self.comparison is not None:
+            self.comparison.arrange(self.comparison.mode, self.layout.size)
+    
+    def load_year_data(self, year):
+        """从数据集快照读取单个年份（由后台加载器调用）；AQHI等污染物在主线程中补充"""
+        block = np.full((len(DISTRICTS), 12, len(CUBE_POLLUTANTS)), np.nan, dtype=np.float32)
+        block[:, :, :len(POLLUTANTS)] = self.dataset[:, year - YEARS[0]]
+        return block
+    
+    def load_all_years(self):
+        """阻塞加载全部年份（用于离线导出，播放时不会出现加载中的画面）"""
+        for year in YEARS:
+            self.loader.wait(year)
+        self.aqhi.join()
+        self.receive_loaded_years()
+    
+    def receive_loaded_years(self):
+        """领取后台加载完成的年份数据（在帧边界调用，不会阻塞）"""
+        for year, block in self.loader.poll():
+            if self.aqhi_applied:
+                block[:, :, len(POLLUTANTS):] = self.aqhi.monthly[:, year - YEARS[0]]
+            self.cube.fill_year(year, block)
+        if not self.aqhi_applied and self.aqhi.ready:
+            self.cube.fill_pollutants(HOURLY_CHANNELS, self.aqhi.monthly)
+            self.aqhi_applied = True
+    
+    def update_live(self):
+        """领取实时读数并写入数据立方体（在帧边界调用，不会阻塞）"""
+        readings = self.live_feed.drain()
+        if not readings:
+            return
+        last_year = self.last_year
+        changed = self.live_store.add(readings, YEARS[-1] + 1)
+        aqi_i = self.cube.position('pollutant', 'AQI')
+        for year in sorted(changed):
+            self.cube.append_year(year)
+            block = np.full((len(DISTRICTS), 12, len(self.cube.pollutants)), np.nan, dtype=np.float32)
+            block[:, :, aqi_i] = self.live_store.monthly_means(year)
+            self.cube.fill_year(year, block)
+        self.timeline_graph.year_range = (self.first_year, self.last_year)
+        if self.last_year > last_year:
+            # 首次收到新一年的数据时跳转到当前年份
+            self.target_year = self.last_year
+    
+    @property
+    def first_year(self):
+        return self.cube.years[0]
+    
+    @property
+    def last_year(self):
+        return self.cube.years[-1]
+    
+    def is_year_loaded(self, year):
+        return self.cube.is_loaded(int(year))
+    
+    def transition_frame(self):
+        """当前年份对应的(过渡表, 关键帧下标)；年份尚未加载时停留在最近可用的数据"""
+        current_year_int = int(self.year)
+        if not self.cube.is_loaded(current_year_int):
+            return self.transitions.get(self.cube, self.shown_year, self.shown_year, self.pollutant), 0
+        
+        # 年份不是整数时在当前年份和下一年之间过渡
+        next_year_int = min(self.last_year, current_year_int + 1)
+        table = self.transitions.get(self.cube, current_year_int, next_year_int, self.pollutant)
+        return table, table.step(self.year - current_year_int)
+    
+    def interpolate_year_mean(self, district=None):
+        """按当前年份插值当前污染物的年均值（district为None时为全港）"""
+        table, step = self.transition_frame()
+        row = -1 if district is None else self.cube.position('district', district)
+        return float(table.values[row, step])
+    
+    def current_level(self):
+        """当前全港数值换算到AQI刻度后的等级（用于烟雾、烟霾等效果）"""
+        table, step = self.transition_frame()
+        return float(table.levels[-1, step])
+    
+    def cycle_pollutant(self):
+        """在AQI、AQHI和各污染物之间循环切换；逐小时数据不可用时只有AQI"""
+        choices = POLLUTANTS if self.aqhi.failed else CUBE_POLLUTANTS
+        index = choices.index(self.pollutant) if self.pollutant in choices else -1
+        self.select_pollutant(choices[(index + 1) % len(choices)])
+    
+    def select_pollutant(self, pollutant):
+        self.pollutant = pollutant
+        if self.pollutant not in self.statistics_engines:
+            self.statistics_engines[self.pollutant] = StatisticsEngine(self.cube, self.pollutant)
+        self.statistics = self.statistics_engines[self.pollutant]
+        self.stats_panel_key = None
+        if self.show_heatmap:
+            self.current_heatmap()
+    
+    def advance_autoplay(self):
+        """自动播放：每AUTOPLAY_FRAMES帧前进一年，到最后一年后回到第一年"""
+        self.autoplay_frames += 1
+        if self.autoplay_frames >= AUTOPLAY_FRAMES:
+            self.autoplay_frames = 0
+            # 设置目标年份而不是直接修改年份
+            self.target_year = self.target_year + 1 if self.target_year < self.last_year else self.first_year
+
+    def cycle_rolling_window(self):
+        """在关闭和各个滑动平均窗口之间循环切换"""
+        if self.rolling_window is None:
+            self.rolling_window = 0
+        elif self.rolling_window + 1 < len(ROLLING_WINDOWS):
+            self.rolling_window += 1
         else:
-            return COLORS['particle_hazardous'], 6, 2.5
+            self.rolling_window = None
+    
+    def update_range_selection(self, mouse_x, finished=False):
+        """更新时间轴上拖动选择的时间范围"""
+        month_index = self.timeline_graph.get_month_from_mouse_x(mouse_x)
+        start, stop = sorted((self.range_drag_start, month_index))
+        self.selected_range = (start, stop) if stop > start else None
+        if finished:
+            self.range_drag_start = None
+    
+    def format_month(self, month_index):
+        year, month = divmod(month_index, 12)
+        return f"{YEARS[0] + year}/{month + 1:02d}"
+    
+    def get_particle_properties(self, aqi):
+        """按AQI级别返回粒子的(颜色, 大小, 速度)；Unhealthy及以上共用最后一档"""
+        band = AQI_BANDS.band(aqi)
+        # NaN读数或过渡表中没有读数的等级
+        if band == MISSING_BAND or aqi == MISSING_BAND:
+            return NO_DATA_PARTICLE_PROPERTIES
+        return PARTICLE_PROPERTIES[min(max(band, GOOD), len(PARTICLE_PROPERTIES) - 1)]
             
+    def scaled_particle_properties(self, aqi):
+        """按布局比例缩放粒子大小和速度"""
+        return self.scale_particle_properties(self.get_particle_properties(aqi))
+    
+    def scale_particle_properties(self, properties):
+        color, size, speed = properties
+        return color, size * self.layout.scale, speed * self.layout.scale
+    
     def initialize_particles(self):
         """初始化粒子"""
         num_particles = 200
-        current_aqi = np.mean(self.aqi_data[self.year])
-        color, size, speed = self.get_particle_properties(current_aqi)
+        current_aqi = self.cube.year_mean(int(self.year))
+        color, size, speed = self.scaled_particle_properties(current_aqi)
         
         for _ in range(num_particles):
-            x = float(random.randint(0, WIDTH))
-            y = float(random.randint(-100, HEIGHT))
+            x = float(random.randint(0, self.layout.width))
+            y = float(random.randint(-self.layout.s(100), self.layout.height))
             particle = Particle(x, y, color, size, speed)
             self.particles.append(particle)
 
     def update_mouse_effects(self, mouse_pos):
-        """更新鼠标相关的视觉效果"""
+        """更新鼠标相关的视觉效果（由数据驱动的效果见update_data_effects）"""
         self.mouse_pos = mouse_pos
         
         # 更新鼠标轨迹
@@ -612,77 +1137,89 @@ class AirQualityViz:
         
         # 更新新增效果
         self.particle_explosions = [explosion for explosion in self.particle_explosions if explosion.update()]
-        self.data_sparkles = [sparkle for sparkle in self.data_sparkles if sparkle.update()]
+        
+        # 在特殊模式下创建彩虹轨迹
+        if self.animation_mode == "rainbow":
+            self.create_rainbow_trail(mouse_pos)
+
+    def update_data_effects(self):
+        """更新由数据驱动、与鼠标无关的效果：数据闪烁和天气（主循环和离线导出每步都调用）"""
+        self.data_sparkles.update()
         
         # 更新天气效果
         self.update_weather_effects()
         for effect in self.weather_effects:
             effect.update()
         
-        # 在特殊模式下创建彩虹轨迹
-        if self.animation_mode == "rainbow":
-            self.create_rainbow_trail(mouse_pos)
-        
         # 随机添加数据闪烁
-        self.add_data_sparkles(self.district_data)
+        self.add_data_sparkles(self.cube)
     
     def add_ripple_effect(self, x, y, color):
         """添加涟漪效果"""
-        self.ripple_effects.append(RippleEffect(x, y, color))
+        self.ripple_effects.append(RippleEffect(x, y, color, self.layout.scale))
     
     def add_floating_particles(self, x, y, color, count=5):
         """在指定位置添加浮动粒子"""
+        spread = self.layout.s(20)
         for _ in range(count):
-            offset_x = random.randint(-20, 20)
-            offset_y = random.randint(-20, 20)
-            self.floating_particles.append(FloatingParticle(x + offset_x, y + offset_y, color))
+            offset_x = random.randint(-spread, spread)
+            offset_y = random.randint(-spread, spread)
+            self.floating_particles.append(FloatingParticle(x + offset_x, y + offset_y, color, self.layout.scale))
 
     def add_particle_explosion(self, x, y, color, intensity=20):
         """添加粒子爆炸效果"""
-        self.particle_explosions.append(ParticleExplosion(x, y, color, intensity))
-    
-    def add_data_sparkles(self, districts_data):
-        """基于数据添加闪烁效果"""
-        if random.random() < 0.1:  # 10%概率生成
-            margin = 50
-            grid_size = 3
-            cell_width = (WIDTH - 2 * margin) // grid_size
-            cell_height = 200
-            
-            for i, district in enumerate(DISTRICTS):
-                if random.random() < 0.3:  # 30%概率为每个区域生成
-                    row = i // grid_size
-                    col = i % grid_size
-                    x = margin + col * cell_width + random.randint(10, cell_width - 20)
-                    y = 100 + row * cell_height + random.randint(10, cell_height - 20)
-                    
-                    aqi = np.mean(districts_data[district][int(self.year)])
-                    self.data_sparkles.append(DataSparkle(x, y, aqi))
+        self.particle_explosions.append(ParticleExplosion(x, y, color, intensity, self.layout.scale))
+    
+    def add_data_sparkles(self, cube):
+        """基于数据添加闪烁效果：每个闪烁代表所在区域当年的一条月度读数"""
+        if not cube.is_loaded(self.shown_year):
+            return
+        layout = self.layout
+        rng = self.data_sparkles.rng
+        count = DATA_SPARKLES_PER_DISTRICT * len(DISTRICTS)
+        district = rng.integers(0, len(DISTRICTS), count)
+        month = rng.integers(0, len(cube.months), count)
+        values = cube.sel(year=self.shown_year, pollutant='AQI')[district, month]
+        # 实时年份中尚未到来的月份没有读数
+        has_reading = ~np.isnan(values)
+        district, values = district[has_reading], values[has_reading]
+        
+        origins = np.array([layout.district_origin(i) for i in range(len(DISTRICTS))], dtype=float)
+        x = origins[district, 0] + rng.uniform(layout.s(10), layout.cell_width - layout.s(20), len(district))
+        y = origins[district, 1] + rng.uniform(layout.s(10), layout.cell_height - layout.s(20), len(district))
+        self.data_sparkles.spawn(x, y, values)
     
     def update_weather_effects(self):
         """更新天气效果"""
-        current_aqi = np.mean(self.aqi_data[int(self.year)])
+        current_aqi = self.cube.year_mean(self.shown_year)
         
         # 清理旧的天气效果
         self.weather_effects = [effect for effect in self.weather_effects if effect]
         
-        # 根据AQI添加适当的天气效果
+        # 根据AQI级别添加适当的天气效果
+        band = AQI_BANDS.band(current_aqi)
         if len(self.weather_effects) < 1:  # 限制天气效果数量
-            if current_aqi > 100:
+            if band >= SENSITIVE:
                 # 高污染时添加雾霾效果
                 if random.random() < 0.02:
-                    self.weather_effects.append(WeatherEffect("fog", current_aqi))
-            elif current_aqi < 50:
+                    self.weather_effects.append(self.create_weather_effect("fog", current_aqi))
+            elif band == GOOD:
                 # 低污染时添加清新效果（偶尔下雨）
                 if random.random() < 0.01:
-                    self.weather_effects.append(WeatherEffect("rain", current_aqi))
+                    self.weather_effects.append(self.create_weather_effect("rain", current_aqi))
+    
+    def create_weather_effect(self, effect_type, aqi):
+        """创建覆盖整个画面的天气效果"""
+        if effect_type == "rain":
+            return RainEffect(aqi, self.layout.size, self.layout.scale, seed=random.getrandbits(32))
+        return WeatherEffect(effect_type, aqi, self.layout.size, self.layout.scale)
     
     def create_rainbow_trail(self, mouse_pos):
         """创建彩虹轨迹效果"""
         if len(self.rainbow_trail) > 0:
             last_pos = self.rainbow_trail[-1]['pos']
             distance = math.sqrt((mouse_pos[0] - last_pos[0])**2 + (mouse_pos[1] - last_pos[1])**2)
-            if distance > 5:  # 只有鼠标移动一定距离才添加新点
+            if distance > self.layout.s(5):  # 只有鼠标移动一定距离才添加新点
                 colors = [
                     (255, 0, 0), (255, 127, 0), (255, 255, 0),
                     (0, 255, 0), (0, 0, 255), (75, 0, 130), (148, 0, 211)
@@ -715,20 +1252,21 @@ class AirQualityViz:
                 alpha = self.rainbow_trail[i]['life'] / 120.0
                 
                 if alpha > 0:
-                    trail_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+                    trail_surface = pygame.Surface(self.layout.size, pygame.SRCALPHA)
                     trail_color = (*self.rainbow_trail[i]['color'], int(255 * alpha))
-                    pygame.draw.line(trail_surface, trail_color, start_pos, end_pos, 5)
+                    pygame.draw.line(trail_surface, trail_color, start_pos, end_pos, self.layout.line_width(5))
                     screen.blit(trail_surface, (0, 0))
         
         # 绘制普通鼠标轨迹
         elif len(self.mouse_trails) > 1:
+            half = self.layout.line_width(5)
             for i in range(1, len(self.mouse_trails)):
                 alpha = int(255 * (i / len(self.mouse_trails)))
                 if alpha > 20:
-                    trail_surface = pygame.Surface((10, 10), pygame.SRCALPHA)
+                    trail_surface = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
                     trail_color = (255, 255, 255, alpha // 3)
-                    pygame.draw.circle(trail_surface, trail_color, (5, 5), 3)
-                    screen.blit(trail_surface, (self.mouse_trails[i][0] - 5, self.mouse_trails[i][1] - 5))
+                    pygame.draw.circle(trail_surface, trail_color, (half, half), self.layout.line_width(3))
+                    screen.blit(trail_surface, (self.mouse_trails[i][0] - half, self.mouse_trails[i][1] - half))
         
         # 绘制涟漪效果
         for ripple in self.ripple_effects:
@@ -742,101 +1280,343 @@ class AirQualityViz:
         for explosion in self.particle_explosions:
             explosion.draw(screen)
         
-        for sparkle in self.data_sparkles:
-            sparkle.draw(screen)
+        self.data_sparkles.draw(screen)
         
-        # 绘制天气效果
+        # 绘制天气效果（后处理烟霾代替雾效果）
         for effect in self.weather_effects:
-            effect.draw(screen)
+            if not (self.bloom_enabled and effect.type == "fog"):
+                effect.draw(screen)
 
-    def update_particles(self):
-        """更新所有粒子"""
-        # 平滑年份过渡
-        if abs(self.year - self.target_year) > 0.01:
-            self.year += (self.target_year - self.year) * self.year_transition_speed
-        else:
-            self.year = self.target_year
-            
-        # 更新粒子属性基于当前年份的AQI
-        # 使用插值来处理年份不是整数的情况
-        current_year_int = int(self.year)
-        next_year_int = min(2023, current_year_int + 1)
-        year_fraction = self.year - current_year_int
+    def draw_mouse_effects_textured(self, canvas):
+        """draw_mouse_effects的纹理版本"""
+        if self.animation_mode == "rainbow" and len(self.rainbow_trail) > 1:
+            width = self.layout.line_width(5)
+            for i in range(1, len(self.rainbow_trail)):
+                alpha = self.rainbow_trail[i]['life'] / 120.0
+                if alpha > 0:
+                    canvas.line(self.rainbow_trail[i]['color'], self.rainbow_trail[i-1]['pos'],
+                                self.rainbow_trail[i]['pos'], width, 255 * alpha)
         
-        current_aqi = np.mean(self.aqi_data[current_year_int])
-        if year_fraction > 0 and next_year_int in self.aqi_data:
-            next_aqi = np.mean(self.aqi_data[next_year_int])
-            current_aqi = current_aqi + (next_aqi - current_aqi) * year_fraction
-            
-        color, size, speed = self.get_particle_properties(current_aqi)
+        elif len(self.mouse_trails) > 1:
+            radius = self.layout.line_width(3)
+            for i in range(1, len(self.mouse_trails)):
+                alpha = int(255 * (i / len(self.mouse_trails)))
+                if alpha > 20:
+                    canvas.circle((255, 255, 255), self.mouse_trails[i], radius, alpha // 3)
         
-        for particle in self.particles:
-            particle.color = color
-            particle.size = size
-            particle.speed = speed
-            particle.move()  # 使用Particle类中定义的move方法
+        for group in (self.ripple_effects, self.floating_particles, self.particle_explosions):
+            for effect in group:
+                effect.draw_textured(canvas)
+        self.data_sparkles.draw_textured(canvas)
+        for effect in self.weather_effects:
+            effect.draw_textured(canvas)
+
+    def update_particles(self):
         """更新所有粒子"""
         # 平滑年份过渡
         if abs(self.year - self.target_year) > 0.01:
             self.year += (self.target_year - self.year) * self.year_transition_speed
         else:
             self.year = self.target_year
-            
-        # 更新粒子属性基于当前年份的AQI
-        # 使用插值来处理年份不是整数的情况
-        current_year_int = int(self.year)
-        next_year_int = min(2023, current_year_int + 1)
-        year_fraction = self.year - current_year_int
         
-        current_aqi = np.mean(self.aqi_data[current_year_int])
-        if year_fraction > 0 and next_year_int in self.aqi_data:
-            next_aqi = np.mean(self.aqi_data[next_year_int])
-            current_aqi = current_aqi + (next_aqi - current_aqi) * year_fraction
+        # 领取已加载的年份和实时读数，并预取目标年份附近的数据
+        self.receive_loaded_years()
+        if self.aqhi.failed and self.pollutant not in POLLUTANTS:
+            # 逐小时数据不可用：回到AQI
+            self.select_pollutant('AQI')
+        if self.band_view is not None and not self.band_view_available():
+            self.band_view = None
+        if self.show_heatmap and self.current_heatmap()[0].failed:
+            # 网格加载失败：关闭热力图，模式指示器中显示failed
+            self.show_heatmap = False
+        if self.live_feed is not None:
+            self.update_live()
+        self.loader.prefetch(int(self.target_year))
+        if self.aqhi_applied:
+            # 压缩档案在后台解压目标年份和下一个年份，统计面板切换年份时不必等待
+            self.aqhi.hourly.prefetch(int(self.target_year))
+            self.aqhi.hourly.prefetch(int(self.target_year) + 1)
+        if self.is_year_loaded(self.year):
+            self.shown_year = int(self.year)
             
-        color, size, speed = self.get_particle_properties(current_aqi)
+        # 更新粒子属性基于当前年份的AQI（从过渡表中查找）
+        table, step = self.transition_frame()
+        current_aqi = table.levels[-1, step]
+        color, size, speed = self.scale_particle_properties(table.particles[step])
+        
+        if self.smog_mode:
+            self.smog_color = color
+            self.smog.update(current_aqi, speed, animation_ticks())
+        
+        if self.comparison_mode is not None:
+            # 对比模式：两侧各自的轻量粒子代替全画面的背景粒子
+            self.update_comparison(animation_ticks())
+            return
+        
+        if self.simulation is not None:
+            # 帧边界：交换双缓冲区，工作线程开始计算下一帧
+            self.particle_color = color
+            self.particle_snapshot = self.simulation.swap(speed, animation_ticks())
+            return
         
         for particle in self.particles:
             particle.color = color
             particle.size = size
             particle.speed = speed
-            particle.move()  # 使用Particle类中定义的move方法
+            particle.move(*self.layout.size)  # 使用Particle类中定义的move方法
             
+    def toggle_smog_mode(self):
+        """切换烟雾浓度模式（开启时代替普通背景粒子）"""
+        self.smog_mode = not self.smog_mode
+        if self.smog_mode and self.smog is None:
+            self.smog = SmogField(self.layout.size, seed=random.getrandbits(32))
+
+    def band_view_available(self):
+        """逐小时数据和级别统计都没有加载失败（可能仍在后台加载）"""
+        return not self.aqhi.failed and self.aqhi.bands_error is None
+
+    def cycle_band_view(self):
+        """在各级别小时数、天数和关闭之间循环切换"""
+        if not self.band_view_available():
+            return
+        views = [None] + list(BAND_VIEWS)
+        self.band_view = views[(views.index(self.band_view) + 1) % len(views)]
+
+    def band_view_data(self):
+        """时间轴堆叠柱状图的(比例, 级别定义, 标题)；鼠标所在区域的监测站，否则为全部监测站"""
+        if self.band_view is None or self.aqhi.bands is None:
+            return None
+        station = self.layout.district_at(self.mouse_pos)
+        fractions = self.aqhi.bands.fractions(self.band_view, station)
+        where = DISTRICTS[station] if station is not None else "All stations"
+        label = f"{BAND_VIEWS[self.band_view]} per AQHI band - {where}"
+        return fractions, AQHI_BANDS, label
+
+    def toggle_heatmap(self):
+        """切换插值热力图；当前污染物的网格加载失败时保持关闭"""
+        self.show_heatmap = not self.show_heatmap
+        if self.show_heatmap and self.current_heatmap()[0].failed:
+            self.show_heatmap = False
+
+    def current_heatmap(self):
+        """当前污染物的(网格缓存, 渲染器)，首次使用时创建"""
+        if self.pollutant not in self.heatmaps:
+            if self.pollutant in POLLUTANTS:
+                dataset, channel, version = self.dataset, POLLUTANTS.index(self.pollutant), DATASET_VERSION
+            else:
+                # 各污染物的月均值在后台线程中等待逐小时数据就绪后读取
+                dataset, channel, version = self.aqhi.wait, HOURLY_CHANNELS.index(self.pollutant), self.aqhi.version
+            grids = HeatmapGrids(dataset, DISTRICTS, YEARS, self.dataset_seed, version, self.pollutant, channel)
+            renderer = HeatmapRenderer(get_color_for_value, POLLUTANT_SCALES[self.pollutant])
+            self.heatmaps[self.pollutant] = (grids, renderer)
+        return self.heatmaps[self.pollutant]
+
+    def draw_heatmap(self, screen):
+        """绘制热力图和监测站位置；网格尚未就绪时返回False"""
+        heatmap, renderer = self.current_heatmap()
+        next_year = min(self.last_year, int(self.year) + 1)
+        grid = heatmap.blended(self.year, self.cube, next_year)
+        if grid is None:
+            return False
+        layout = self.layout
+        rect = layout.map_rect
+        renderer.draw(screen, grid, rect)
+        for u, v in station_positions(DISTRICTS):
+            center = (rect.left + int(u * rect.width), rect.top + int(v * rect.height))
+            pygame.draw.circle(screen, COLORS['text'], center, layout.line_width(4))
+            pygame.draw.circle(screen, COLORS['background'], center, layout.line_width(2))
+        return True
+
+    def cycle_comparison(self):
+        """在关闭、左右并排和分割线之间切换对比模式"""
+        modes = [None] + list(COMPARISON_LAYOUTS)
+        self.comparison_mode = modes[(modes.index(self.comparison_mode) + 1) % len(modes)]
+        if self.comparison_mode is None:
+            return
+        if self.comparison is None:
+            # 左侧固定为开启时显示的年份和选中的区域
+            reference = self.selected_district or DISTRICTS[0]
+            other = DISTRICTS[(DISTRICTS.index(reference) + 1) % len(DISTRICTS)]
+            self.comparison = ComparisonView(self.layout.size, self.shown_year, reference, other,
+                                             seed=random.getrandbits(32))
+        self.comparison.arrange(self.comparison_mode, self.layout.size)
+    
+    def toggle_comparison_subject(self):
+        """在比较两个年份和比较两个区域之间切换"""
+        if self.comparison_mode is not None:
+            self.comparison.toggle_subject()
+    
+    def step_comparison(self, delta, right=False):
+        """改变左侧（right为True时为右侧）比较的年份或区域"""
+        if self.comparison_mode is None:
+            return
+        comparison = self.comparison
+        if comparison.subject == 'districts':
+            attribute = 'district' if right else 'reference_district'
+            index = (DISTRICTS.index(getattr(comparison, attribute)) + delta) % len(DISTRICTS)
+            setattr(comparison, attribute, DISTRICTS[index])
+        elif right:
+            # 右侧就是正在播放的年份
+            self.target_year = min(self.last_year, max(self.first_year, int(self.target_year) + delta))
+        else:
+            comparison.reference_year = min(self.last_year, max(self.first_year, comparison.reference_year + delta))
+            self.loader.prefetch(comparison.reference_year)
+    
+    def comparison_frames(self):
+        """两侧的(过渡表, 关键帧下标, 行)；行-1为全港"""
+        table, step = self.transition_frame()
+        comparison = self.comparison
+        if comparison.subject == 'districts':
+            return [(table, step, DISTRICTS.index(district))
+                    for district in (comparison.reference_district, comparison.district)]
+        year = comparison.reference_year
+        return [(self.transitions.get(self.cube, year, year, self.pollutant), 0, -1), (table, step, -1)]
+    
+    def comparison_labels(self):
+        comparison = self.comparison
+        if comparison.subject == 'districts':
+            return [comparison.reference_district, comparison.district]
+        return [str(comparison.reference_year), str(int(self.year))]
+    
+    def update_comparison(self, ticks):
+        """按各侧的数值更新两侧粒子的颜色、大小和速度，并各自前进一步"""
+        comparison = self.comparison
+        comparison.follow(self.mouse_pos, self.layout.comparison_rect)
+        for side, (table, step, row) in zip(comparison.sides, self.comparison_frames()):
+            if row == -1:
+                properties = table.particles[step]
+            else:
+                properties = self.get_particle_properties(table.levels[row, step])
+            side.step(self.scale_particle_properties(properties), ticks)
+    
+    def draw_comparison(self, screen):
+        """对比模式的地图区域：两侧按并排或分割线的方式裁剪后各自绘制"""
+        layout = self.layout
+        comparison = self.comparison
+        map_rect = layout.comparison_rect
+        gap = layout.s(PANE_GAP)
+        panes = comparison.panes(map_rect, gap)
+        headings = []
+        previous_clip = screen.get_clip()
+        for i, (pane, clip, (table, step, row), label) in enumerate(zip(
+                panes, comparison.clips(map_rect, gap), self.comparison_frames(), self.comparison_labels())):
+            screen.set_clip(clip.clip(previous_clip))
+            if comparison.subject == 'years':
+                year = comparison.reference_year if i == 0 else self.year
+                self.draw_comparison_grid(screen, pane, table, step, year)
+                if self.cube.is_loaded(int(year)):
+                    value = format_pollutant_value(table.values[-1, step], self.pollutant)
+                    headings.append(f"{label}: Hong Kong {self.pollutant} {value}")
+                else:
+                    headings.append(f"{label}: loading")
+            else:
+                self.draw_comparison_card(screen, pane, clip, table, step, row)
+                headings.append(f"{label} ({int(self.year)})")
+        screen.set_clip(previous_clip)
+        
+        if comparison.mode == 'wipe':
+            x = comparison.wipe_x(map_rect)
+            pygame.draw.line(screen, COLORS['highlight'], (x, map_rect.top), (x, map_rect.bottom),
+                             layout.line_width(3))
+            pygame.draw.circle(screen, COLORS['highlight'], (x, map_rect.centery), layout.s(8))
+        # 标题在裁剪之外绘制，分割线移动时两侧标题始终可见
+        for i, (pane, heading) in enumerate(zip(panes, headings)):
+            text = layout.text(heading, 20, bold=True, color=COLORS['highlight'])
+            x = pane.left if i == 0 else pane.right - text.get_width()
+            screen.blit(text, (x, pane.top + layout.s(4)))
+    
+    def draw_comparison_grid(self, screen, rect, table, step, year):
+        """在rect中绘制一个年份的区域网格（热力图开启时共用同一份网格缓存）"""
+        layout = self.layout
+        header = layout.s(PANE_HEADER)
+        grid = pygame.Rect(rect.left, rect.top + header, rect.width, rect.height - header)
+        heatmap_drawn = False
+        if self.show_heatmap:
+            heatmap, renderer = self.current_heatmap()
+            heatmap_grid = heatmap.blended(year, self.cube, min(self.last_year, int(year) + 1))
+            if heatmap_grid is not None:
+                renderer.draw(screen, heatmap_grid, grid)
+                heatmap_drawn = True
+        
+        size = layout.grid_size
+        cell_width, cell_height = grid.width // size, grid.height // size
+        for i, district in enumerate(DISTRICTS):
+            row, col = divmod(i, size)
+            cell = pygame.Rect(grid.left + col * cell_width, grid.top + row * cell_height,
+                               cell_width - layout.cell_gap, cell_height - layout.cell_gap)
+            if not heatmap_drawn:
+                pygame.draw.rect(screen, table.colors[i][step], cell)
+            value = format_pollutant_value(table.values[i, step], self.pollutant)
+            screen.blit(layout.text(district, 14, bold=True), (cell.x + layout.s(6), cell.y + layout.s(6)))
+            screen.blit(layout.text(value, 16), (cell.x + layout.s(6), cell.y + layout.s(26)))
+    
+    def draw_comparison_card(self, screen, rect, visible, table, step, row):
+        """在rect中绘制单个区域的数值、级别和当年各月的折线
+
+        文字和折线放在可见部分visible的中间，分割线模式下两侧的数值都不会被裁掉。
+        """
+        layout = self.layout
+        s = layout.s
+        header = s(PANE_HEADER)
+        card = pygame.Rect(rect.left, rect.top + header, rect.width, rect.height - header)
+        pygame.draw.rect(screen, table.colors[row][step], card, border_radius=s(8))
+        card = card.clip(visible)
+        
+        value = table.values[row, step]
+        value_text = layout.text(format_pollutant_value(value, self.pollutant), 72, bold=True)
+        screen.blit(value_text, value_text.get_rect(center=(card.centerx, card.centery - s(30))))
+        bands = {'AQI': AQI_BANDS, 'AQHI': AQHI_BANDS}.get(self.pollutant)
+        if bands is not None and not np.isnan(value):
+            band_text = layout.text(bands.names[bands.band(value)], 20)
+            screen.blit(band_text, band_text.get_rect(center=(card.centerx, card.centery + s(15))))
+        
+        months = self.cube.sel(district=DISTRICTS[row], year=self.shown_year, pollutant=self.pollutant)
+        chart = pygame.Rect(card.left + s(16), card.bottom - s(70), card.width - s(32), s(54))
+        full_scale = POLLUTANT_SCALES[self.pollutant]
+        points = [(chart.left + month * chart.width / 11, chart.bottom - min(1.0, v / full_scale) * chart.height)
+                  for month, v in enumerate(months.tolist()) if not np.isnan(v)]
+        if len(points) > 1 and chart.width > 0:
+            pygame.draw.lines(screen, COLORS['background'], False, points, layout.line_width(2))
+    
+    def toggle_bloom(self):
+        """切换光晕/烟霾后处理"""
+        self.bloom_enabled = not self.bloom_enabled
+
     def draw_district_visualization(self, screen):
         """绘制区域空气质量地图"""
-        margin = 50
-        grid_size = 3
-        cell_width = (WIDTH - 2 * margin) // grid_size
-        cell_height = 200
+        layout = self.layout
+        
+        # 选择了时间范围时，一次性计算所有区域在该范围内的均值和标准差
+        range_means = range_stds = None
+        if self.selected_range is not None:
+            range_means, range_stds = self.time_windows.district_window_stats(*self.selected_range, self.pollutant)
+        
+        # 热力图开启时代替各区域的纯色方块
+        heatmap_drawn = self.show_heatmap and self.draw_heatmap(screen)
+        
+        # 所有区域的AQI和颜色都从同一个过渡表的同一帧读取
+        table, step = self.transition_frame()
         
         for i, district in enumerate(DISTRICTS):
-            row = i // grid_size
-            col = i % grid_size
-            x = margin + col * cell_width
-            y = 100 + row * cell_height
-            
-            # 计算当前区域的空气质量
-            current_year_int = int(self.year)
-            next_year_int = min(2023, current_year_int + 1)
-            year_fraction = self.year - current_year_int
+            x, y = layout.district_origin(i)
             
-            aqi = np.mean(self.district_data[district][current_year_int])
-            if year_fraction > 0 and next_year_int in self.district_data[district]:
-                next_aqi = np.mean(self.district_data[district][next_year_int])
-                aqi = aqi + (next_aqi - aqi) * year_fraction
-            color = get_color_for_value(aqi)
+            # 当前区域的空气质量
+            aqi = table.values[i, step]
+            color = table.colors[i][step]
             
             # 检查鼠标是否在当前区域内
-            rect = pygame.Rect(x, y, cell_width - 10, cell_height - 10)
+            rect = layout.district_rect(i)
             mouse_x, mouse_y = self.mouse_pos
             is_hovered = rect.collidepoint(mouse_x, mouse_y)
             
             # 鼠标悬停效果
             if is_hovered:
                 # 添加发光效果
-                glow_surface = pygame.Surface((rect.width + 20, rect.height + 20), pygame.SRCALPHA)
+                glow = layout.s(10)
+                glow_surface = pygame.Surface((rect.width + 2 * glow, rect.height + 2 * glow), pygame.SRCALPHA)
                 glow_color = (*color[:3], 30)
-                pygame.draw.rect(glow_surface, glow_color, (0, 0, rect.width + 20, rect.height + 20))
-                screen.blit(glow_surface, (x - 10, y - 10))
+                pygame.draw.rect(glow_surface, glow_color, (0, 0, rect.width + 2 * glow, rect.height + 2 * glow))
+                screen.blit(glow_surface, (x - glow, y - glow))
                 
                 # 鼠标跟随粒子效果
                 if random.random() < 0.3:  # 30%概率生成粒子
@@ -844,87 +1624,99 @@ class AirQualityViz:
                 
                 # 存储悬停信息用于其他效果
                 if district not in self.district_hover_effects:
-                    self.district_hover_effects[district] = pygame.time.get_ticks()
+                    self.district_hover_effects[district] = animation_ticks()
                     # 添加涟漪效果
-                    center_x = x + (cell_width - 10) // 2
-                    center_y = y + (cell_height - 10) // 2
-                    self.add_ripple_effect(center_x, center_y, color)
+                    self.add_ripple_effect(*rect.center, color)
             else:
                 # 移除悬停效果
                 if district in self.district_hover_effects:
                     del self.district_hover_effects[district]
             
             # 绘制区域框
-            pygame.draw.rect(screen, color, rect)
+            if not heatmap_drawn:
+                pygame.draw.rect(screen, color, rect)
             
             # 鼠标在区域内时的额外视觉效果
             if is_hovered:
                 # 边框闪烁效果
-                flash_intensity = abs(math.sin(pygame.time.get_ticks() * 0.01)) * 100 + 155
+                flash_intensity = abs(math.sin(animation_ticks() * 0.01)) * 100 + 155
                 flash_color = (flash_intensity, flash_intensity, flash_intensity)
-                pygame.draw.rect(screen, flash_color, rect, 3)
+                pygame.draw.rect(screen, flash_color, rect, layout.line_width(3))
                 
                 # 鼠标位置到区域中心的连线效果
-                center_x = x + (cell_width - 10) // 2
-                center_y = y + (cell_height - 10) // 2
+                center_x, center_y = rect.center
                 
                 # 计算连线的透明度基于距离
                 distance = math.sqrt((mouse_x - center_x)**2 + (mouse_y - center_y)**2)
                 if distance > 0:
-                    alpha = max(50, 255 - int(distance * 2))
-                    line_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+                    alpha = max(50, 255 - int(distance * 2 / layout.scale))
+                    line_surface = pygame.Surface(layout.size, pygame.SRCALPHA)
                     line_color = (*color[:3], alpha)
                     
                     # 绘制多条偏移线条创造能量感
                     for offset in range(-2, 3):
+                        offset = layout.s(offset)
                         start_pos = (mouse_x + offset, mouse_y + offset)
                         end_pos = (center_x + offset, center_y + offset)
-                        if 0 <= start_pos[0] < WIDTH and 0 <= start_pos[1] < HEIGHT:
-                            pygame.draw.line(line_surface, line_color, start_pos, end_pos, 2)
+                        if 0 <= start_pos[0] < layout.width and 0 <= start_pos[1] < layout.height:
+                            pygame.draw.line(line_surface, line_color, start_pos, end_pos, layout.line_width(2))
                     
                     screen.blit(line_surface, (0, 0))
             
             # 显示区域名称和AQI值
             name_text = self.bold_font.render(district, True, COLORS['text'])  # 使用加粗字体
-            aqi_text = self.small_font.render(f"AQI: {int(aqi)}", True, COLORS['text'])
-            screen.blit(name_text, (x + 10, y + 10))
-            screen.blit(aqi_text, (x + 10, y + 35))
+            aqi_text = self.small_font.render(
+                f"{self.pollutant}: {format_pollutant_value(aqi, self.pollutant)}", True, COLORS['text'])
+            screen.blit(name_text, (x + layout.s(10), y + layout.s(10)))
+            screen.blit(aqi_text, (x + layout.s(10), y + layout.s(35)))
+            if self.live_store is not None and district in self.live_store.latest:
+                # 实时读数与历史数据并列显示
+                live_text = self.small_font.render(
+                    f"Now: {int(self.live_store.latest[district].aqi)}", True, COLORS['text'])
+                screen.blit(live_text, (rect.right - layout.s(10) - live_text.get_width(), y + layout.s(12)))
+            if range_means is not None and not np.isnan(range_means[i]):
+                range_text = self.small_font.render(
+                    f"Range: {int(range_means[i])} ± {int(range_stds[i])}", True, COLORS['text'])
+                screen.blit(range_text, (x + layout.s(10), y + layout.s(57)))
             
             # 高亮选中的区域
             if district == self.selected_district:
-                pygame.draw.rect(screen, COLORS['highlight'], rect, 3)
+                pygame.draw.rect(screen, COLORS['highlight'], rect, layout.line_width(3))
 
     def draw_legend(self, screen):
         """Draw legend"""
-        legend_x = WIDTH - 280  # 进一步减小宽度
-        legend_y = 20
+        layout = self.layout
+        s = layout.s
+        legend_x = layout.width - s(280)  # 进一步减小宽度
+        legend_y = s(20)
         
         # 绘制标题和副标题
-        title = pygame.font.SysFont('Arial', 24).render("AQI Guide", True, COLORS['text'])  # 进一步缩短标题
-        subtitle = pygame.font.SysFont('Arial', 12).render("Health Impact", True, (200, 200, 200))  # 更短的副标题
+        title = layout.font(24).render("AQI Guide", True, COLORS['text'])  # 进一步缩短标题
+        subtitle = layout.font(12).render("Health Impact", True, (200, 200, 200))  # 更短的副标题
         screen.blit(title, (legend_x, legend_y))
-        screen.blit(subtitle, (legend_x, legend_y + 22))
+        screen.blit(subtitle, (legend_x, legend_y + s(22)))
         
         # 添加分隔线
         pygame.draw.line(screen, (100, 100, 100), 
-                        (legend_x, legend_y + 38), 
-                        (WIDTH - 20, legend_y + 38), 1)  # 更细的分隔线
+                        (legend_x, legend_y + s(38)), 
+                        (layout.width - s(20), legend_y + s(38)), 1)  # 更细的分隔线
         
-        legend_start_y = legend_y + 48  # 调整起始位置
+        legend_start_y = legend_y + s(48)  # 调整起始位置
+        swatch = s(16)
         
         for i, level in enumerate(AQI_LEVELS):
-            y = legend_start_y + i * 45  # 进一步减少间距
+            y = legend_start_y + i * s(45)  # 进一步减少间距
             
             # 绘制颜色示例框 - 更小
-            pygame.draw.rect(screen, level['color'], (legend_x, y, 16, 16))  # 减小到16x16
-            pygame.draw.rect(screen, (100, 100, 100), (legend_x, y, 16, 16), 1)
+            pygame.draw.rect(screen, level['color'], (legend_x, y, swatch, swatch))  # 减小到16x16
+            pygame.draw.rect(screen, (100, 100, 100), (legend_x, y, swatch, swatch), 1)
             
             # 绘制AQI范围和等级名称 - 更紧凑的布局
-            range_text = pygame.font.SysFont('Arial', 10).render(f"{level['range'][0]}-{level['range'][1]}", True, (180, 180, 180))
-            name_text = pygame.font.SysFont('Arial', 12).render(level['name'], True, COLORS['text'])
+            range_text = layout.font(10).render(f"{level['range'][0]}-{level['range'][1]}", True, (180, 180, 180))
+            name_text = layout.font(12).render(level['name'], True, COLORS['text'])
             
             # 只显示简化的描述
-            desc_font = pygame.font.SysFont('Arial', 9)
+            desc_font = layout.font(9)
             # 使用更简短的描述
             short_desc = {
                 'Good': 'Safe for all',
@@ -937,59 +1729,189 @@ class AirQualityViz:
             desc_text = desc_font.render(short_desc.get(level['name'], level['name']), True, (160, 160, 160))
             
             # 更紧凑的布局
-            screen.blit(range_text, (legend_x + 22, y))
-            screen.blit(name_text, (legend_x + 22, y + 12))
-            screen.blit(desc_text, (legend_x + 22, y + 26))
+            screen.blit(range_text, (legend_x + s(22), y))
+            screen.blit(name_text, (legend_x + s(22), y + s(12)))
+            screen.blit(desc_text, (legend_x + s(22), y + s(26)))
 
     def draw_historical_event(self, screen):
         """绘制历史事件信息"""
         current_year = int(self.year)  # 使用整数年份检查事件
         if current_year in HISTORICAL_EVENTS:
             event = HISTORICAL_EVENTS[current_year]
+            layout = self.layout
+            s = layout.s
             # 创建半透明背景
-            info_surface = pygame.Surface((WIDTH - 20, 100))
+            info_surface = pygame.Surface((layout.width - s(20), s(100)))
             info_surface.fill((20, 20, 40))
             info_surface.set_alpha(200)
-            screen.blit(info_surface, (10, HEIGHT - 110))
+            screen.blit(info_surface, (s(10), layout.height - s(110)))
             
             # 显示事件信息
             title_text = self.font.render(f"{current_year}年 - {event['title']}", True, COLORS['highlight'])
             desc_text = self.small_font.render(event['desc'], True, COLORS['text'])
-            screen.blit(title_text, (20, HEIGHT - 100))
-            screen.blit(desc_text, (20, HEIGHT - 65))
+            screen.blit(title_text, (s(20), layout.height - s(100)))
+            screen.blit(desc_text, (s(20), layout.height - s(65)))
+
+    def draw_backdrop(self, screen):
+        """绘制年份背景图片，年份过渡时交叉淡入淡出"""
+        if self.backdrops is None:
+            self.backdrops = BackdropCache(self.layout.size)
+        
+        current_year_int = int(self.year)
+        next_year_int = min(self.last_year, current_year_int + 1)
+        year_fraction = self.year - current_year_int
+        
+        # 预先解码目标年份，拖动时间轴时不会在帧内等待解码
+        self.backdrops.request(int(self.target_year))
+        current = self.backdrops.get(current_year_int)
+        upcoming = self.backdrops.get(next_year_int) if year_fraction > 0 else None
+        
+        if current is None:
+            current = self.last_backdrop
+        else:
+            self.last_backdrop = current
+        if current is not None:
+            current.set_alpha(int(BACKDROP_ALPHA * (1 - year_fraction if upcoming else 1)))
+            screen.blit(current, (0, 0))
+        if upcoming is not None:
+            upcoming.set_alpha(int(BACKDROP_ALPHA * year_fraction))
+            screen.blit(upcoming, (0, 0))
 
     def draw(self, screen):
+        self.draw_scene(screen)
+        self.draw_overlay(screen)
+
+    def draw_scene(self, screen):
+        """绘制顶层文字以外的画面，并应用后处理"""
+        self.draw_base(screen)
+        self.draw_effects(screen)
+        if self.bloom_enabled:
+            self.apply_bloom(screen)
+
+    def apply_bloom(self, screen):
+        """光晕/烟霾后处理，烟霾浓度取当前显示的AQI"""
+        if self.bloom is None:
+            self.bloom = BloomPass(self.layout.size)
+        self.bloom.apply(screen, self.current_level())
+
+    def draw_base(self, screen):
+        """绘制底层：背景、区域地图和时间轴"""
         screen.fill(COLORS['background'])
         
-        # 绘制区域可视化
-        self.draw_district_visualization(screen)
+        # 绘制年份背景图片（如果开启）
+        if self.show_backdrops:
+            self.draw_backdrop(screen)
         
-        # 绘制时间轴图表
-        self.timeline_graph.draw(screen, self.aqi_data, current_year=self.year)
+        # 绘制区域可视化（对比模式下两侧各自绘制）
+        if self.comparison_mode is not None:
+            self.draw_comparison(screen)
+        else:
+            self.draw_district_visualization(screen)
         
-        # 绘制所有粒子（按z坐标排序以实现正确的3D效果）
-        sorted_particles = sorted(self.particles, key=lambda p: p.z)
-        for particle in sorted_particles:
-            particle.draw(screen)
+        # 绘制时间轴图表
+        full_scale = POLLUTANT_SCALES[self.pollutant]
+        bands = self.band_view_data()
+        self.timeline_graph.draw(screen, self.cube, current_year=self.year,
+                                 pollutant=self.pollutant, full_scale=full_scale, bands=bands)
+        if self.rolling_window is not None and bands is None:
+            months, label = ROLLING_WINDOWS[self.rolling_window]
+            rolling = self.time_windows.rolling_mean(months, pollutant=self.pollutant)
+            self.timeline_graph.draw_rolling_mean(screen, rolling, label, full_scale)
+        if self.selected_range is not None:
+            start, stop = self.selected_range
+            mean, std = self.time_windows.window_stats(start, stop, pollutant=self.pollutant)
+            if not np.isnan(mean):
+                stats_text = (f"{self.format_month(start)}-{self.format_month(stop - 1)}: "
+                              f"{mean:.1f} ± {std:.1f}")
+            else:
+                stats_text = f"{self.format_month(start)}-{self.format_month(stop - 1)}: loading"
+            self.timeline_graph.draw_selected_range(screen, start, stop, stats_text)
+        if self.comparison_mode is not None and self.comparison.subject == 'years':
+            self.timeline_graph.draw_reference_year(screen, self.comparison.reference_year)
+        
+        # 烟雾粒子直接写入像素缓冲区，属于底层画面（纹理后端随底层一起上传）
+        if self.smog_mode:
+            self.smog.draw(screen, self.smog_color, self.layout.scale)
+
+    def draw_effects(self, screen):
+        """绘制中间层：背景粒子和鼠标交互效果"""
+        self.draw_background_particles(screen, draw_particle, Particle.draw)
         
         # 绘制鼠标交互效果
         self.draw_mouse_effects(screen)
-        
+
+    def draw_effects_textured(self, canvas):
+        """纹理后端版本的draw_effects"""
+        self.draw_background_particles(canvas, draw_particle_textured, Particle.draw_textured)
+        self.draw_mouse_effects_textured(canvas)
+
+    def draw_background_particles(self, target, draw_state, draw_object):
+        """绘制所有背景粒子（按z坐标排序以实现正确的3D效果）"""
+        if self.smog_mode:
+            return  # 烟雾模式下背景粒子已在底层绘制
+        glow = not self.bloom_enabled
+        if self.comparison_mode is not None:
+            self.draw_comparison_particles(target, draw_state, glow)
+        elif self.simulation is not None:
+            state = self.particle_snapshot
+            for i in np.argsort(state.z):
+                draw_state(target, state.x[i], state.y[i], state.z[i],
+                           self.particle_color, self.particle_size, glow)
+        else:
+            for particle in sorted(self.particles, key=lambda p: p.z):
+                draw_object(particle, target, glow)
+
+    def draw_comparison_particles(self, target, draw_state, glow):
+        """对比模式：两侧的粒子各自按z坐标排序绘制，分割线模式下只显示本侧的部分"""
+        comparison = self.comparison
+        map_rect = self.layout.comparison_rect
+        for i, side in enumerate(comparison.sides):
+            state = side.state
+            x = state.x + side.left
+            visible = comparison.visible(i, x, map_rect)
+            for j in np.argsort(state.z):
+                if visible[j]:
+                    draw_state(target, x[j], state.y[j], state.z[j], side.color, side.size, glow)
+    
+    def comparison_key(self):
+        if self.comparison_mode is None:
+            return None
+        comparison = self.comparison
+        return (self.comparison_mode, comparison.subject, comparison.reference_year,
+                comparison.reference_district, comparison.district)
+    
+    def overlay_key(self):
+        """顶层文字内容的缓存键：键不变时顶层画面不变"""
+        stats = None
+        if self.show_statistics:
+            self.statistics.refresh()
+            stats = (self.statistics.version, self.shown_year)
+        live = self.live_status_message() if self.live_feed is not None else None
+        return (self.layout.size, int(self.year), int(self.interpolate_year_mean()),
+                self.loading_message(), live, stats, self.animation_mode,
+                self.show_backdrops, self.rolling_window, self.smog_mode, self.bloom_enabled,
+                self.heatmap_status(), self.pollutant, self.aqhi_applied, self.aqhi.failed, self.band_view,
+                self.aqhi.bands is not None, self.comparison_key())
+
+    def draw_overlay(self, screen):
+        """绘制顶层：年份、AQI、图例、事件和统计面板等文字信息"""
         # Display year and overall AQI information
         year_text = self.font.render(f"Year: {int(self.year)}", True, COLORS['text'])  # 显示整数年份
         # 使用插值计算当前显示的AQI
-        current_year_int = int(self.year)
-        next_year_int = min(2023, current_year_int + 1)
-        year_fraction = self.year - current_year_int
-        
-        overall_aqi = np.mean(self.aqi_data[current_year_int])
-        if year_fraction > 0 and next_year_int in self.aqi_data:
-            next_aqi = np.mean(self.aqi_data[next_year_int])
-            overall_aqi = overall_aqi + (next_aqi - overall_aqi) * year_fraction
+        overall_aqi = self.interpolate_year_mean()
             
-        aqi_text = self.font.render(f"Hong Kong Average AQI: {int(overall_aqi)}", True, COLORS['text'])
-        screen.blit(year_text, (10, 10))
-        screen.blit(aqi_text, (10, 50))
+        aqi_text = self.font.render(
+            f"Hong Kong Average {self.pollutant}: {format_pollutant_value(overall_aqi, self.pollutant)}",
+            True, COLORS['text'])
+        screen.blit(year_text, (self.layout.s(10), self.layout.s(10)))
+        screen.blit(aqi_text, (self.layout.s(10), self.layout.s(50)))
+        
+        # 数据加载指示器：请求的年份尚未到达时显示
+        self.draw_loading_indicator(screen, year_text.get_width() + self.layout.s(30))
+        
+        # 实时数据状态
+        if self.live_feed is not None:
+            self.draw_live_status(screen)
         
         # 绘制图例
         self.draw_legend(screen)
@@ -1005,70 +1927,258 @@ class AirQualityViz:
         self.draw_mode_indicator(screen)
 
     def draw_statistics(self, screen):
-        """绘制详细统计信息"""
-        stats_surface = pygame.Surface((300, 200), pygame.SRCALPHA)
-        stats_surface.fill((20, 20, 40, 180))
-        
+        """绘制详细统计信息（只读取统计引擎中缓存的结果）"""
+        self.statistics.refresh()
         current_year_int = int(self.year)
-        current_aqi = np.mean(self.aqi_data[current_year_int])
-        
-        # 计算统计数据
-        all_years_aqi = [np.mean(self.aqi_data[year]) for year in range(1993, 2024)]
-        best_year = 1993 + np.argmin(all_years_aqi)
-        worst_year = 1993 + np.argmax(all_years_aqi)
-        avg_improvement = (all_years_aqi[0] - all_years_aqi[-1]) / 30  # 每年平均改善
+        key = (self.statistics.version, current_year_int, self.shown_year, self.animation_mode, self.pollutant)
+        if key != self.stats_panel_key:
+            self.stats_panel = self.render_statistics_panel(current_year_int)
+            self.stats_panel_key = key
+        screen.blit(self.stats_panel, (self.layout.s(10), self.layout.s(100)))
+    
+    def render_statistics_panel(self, current_year_int):
+        """根据统计引擎的结果渲染统计面板"""
+        stats = self.statistics
+        name = self.pollutant
+        if not stats.years:
+            # 该污染物的数据仍在后台计算
+            return self.render_text_panel([f"Current Year: {current_year_int}", f"{name}: loading",
+                                           f"Animation Mode: {self.animation_mode.title()}"])
+        current_aqi = self.cube.year_mean(self.shown_year, pollutant=name)
+        delta = stats.year_over_year.get(self.shown_year)
+        delta_text = f" ({delta:+.1f} vs {self.shown_year - 1})" if delta is not None else ""
+        ranking = stats.ranking(self.shown_year)
+        # 该污染物在当前年份没有读数时（例如实时年份只有AQI）没有排名
+        cleanest, most_polluted = (ranking[0], ranking[-1]) if ranking else ("--", "--")
+        p10, p50, p90 = (stats.percentiles[p] for p in (10, 50, 90))
+        first_year, last_year = stats.years[0], stats.years[-1]
         
         stats_text = [
             f"Current Year: {current_year_int}",
-            f"Current AQI: {int(current_aqi)}",
-            f"Best Year: {best_year} (AQI: {int(min(all_years_aqi))})",
-            f"Worst Year: {worst_year} (AQI: {int(max(all_years_aqi))})",
-            f"30-Year Improvement: {avg_improvement:.1f} AQI/year",
+            f"Current {name}: {format_pollutant_value(current_aqi, name)}{delta_text}",
+            f"Best Year: {stats.best_year} ({name}: {format_pollutant_value(stats.best_value, name)})",
+            f"Worst Year: {stats.worst_year} ({name}: {format_pollutant_value(stats.worst_value, name)})",
+            f"{first_year}-{last_year} Change: {stats.average_change:+.2f} {name}/year",
+            f"Trend: {stats.trend_slope:+.2f} ± {stats.trend_ci:.2f} {name}/year (95% CI)",
+            f"Trend R²: {stats.trend_r2:.2f} over {len(stats.years)} years",
+            f"Annual {name} P10/P50/P90: {p10:.0f} / {p50:.0f} / {p90:.0f}",
+            f"Station-Hours at AQHI 7+: {self.high_aqhi_hours(self.shown_year)}",
+            f"Cleanest District: {cleanest}",
+            f"Most Polluted: {most_polluted}",
             f"Total Districts: {len(DISTRICTS)}",
             f"Animation Mode: {self.animation_mode.title()}"
         ]
-        
+        return self.render_text_panel(stats_text)
+    
+    def high_aqhi_hours(self, year):
+        """该年所有监测站AQHI达到“高”及以上的小时数（只读取档案中该年份的一段）"""
+        if not self.aqhi_applied or year not in self.aqhi.hourly.years:
+            return "--"
+        try:
+            hours = self.aqhi.hourly.year(year)['AQHI']
+        except (OSError, ValueError):  # 压缩档案的数据块损坏或无法读取
+            return "--"
+        return f"{int(np.count_nonzero(AQHI_BANDS.classify(hours) >= AQHI_HIGH)):,}"
+    
+    def render_text_panel(self, stats_text):
+        """把若干行文字渲染到半透明面板上"""
+        s = self.layout.s
+        stats_surface = pygame.Surface((s(340), s(20) + len(stats_text) * s(22)), pygame.SRCALPHA)
+        stats_surface.fill((20, 20, 40, 180))
         for i, text in enumerate(stats_text):
-            text_surface = pygame.font.SysFont('Arial', 16).render(text, True, COLORS['text'])
-            stats_surface.blit(text_surface, (10, 10 + i * 25))
-        
-        screen.blit(stats_surface, (10, 100))
+            text_surface = self.layout.font(16).render(text, True, COLORS['text'])
+            stats_surface.blit(text_surface, (s(10), s(10) + i * s(22)))
+        return stats_surface
+    
+    def loading_message(self):
+        """请求的年份尚未到达时返回加载提示，否则返回None"""
+        pending = [year for year in (int(self.target_year), int(self.year))
+                   if not self.is_year_loaded(year)]
+        if not pending:
+            return None
+        if pending[0] in self.loader.years:
+            dots = "." * (animation_ticks() // 300 % 4)
+            return f"Loading {pending[0]} data{dots}"
+        return f"No data for {pending[0]}"  # 历史档案与实时数据之间的空白年份
+    
+    def draw_loading_indicator(self, screen, x):
+        """绘制数据加载指示器"""
+        message = self.loading_message()
+        if message is None:
+            return
+        text = self.small_font.render(message, True, COLORS['text_secondary'])
+        screen.blit(text, (x, self.layout.s(20)))
+    
+    def live_status_message(self):
+        newest = self.live_store.newest_timestamp
+        if self.live_feed.last_error is not None:
+            return "LIVE: feed unavailable"
+        if newest is None:
+            return "LIVE: waiting for readings"
+        hours = self.live_store.retention_seconds // 3600
+        return (f"LIVE {newest:%Y-%m-%d %H:%M} | "
+                f"{len(self.live_store.readings)} readings in {hours}h")
     
+    def draw_live_status(self, screen):
+        """绘制实时数据状态"""
+        text = self.small_font.render(self.live_status_message(), True, COLORS['highlight'])
+        screen.blit(text, (self.layout.s(450), self.layout.s(20)))
+
+    def close(self):
+        """释放后台资源"""
+        self.loader.close()
+        self.aqhi.close()
+        if self.live_feed is not None:
+            self.live_feed.close()
+        if self.backdrops is not None:
+            self.backdrops.close()
+        if self.simulation is not None:
+            self.simulation.close()
+            self.simulation = None
+
+    def heatmap_status(self):
+        heatmap = self.heatmaps.get(self.pollutant)
+        if heatmap is not None and heatmap[0].failed:
+            return "failed"
+        if not self.show_heatmap:
+            return None
+        heatmap, _ = self.current_heatmap()
+        return "ON" if heatmap.ready else "loading"
+
     def draw_mode_indicator(self, screen):
         """绘制当前模式指示器"""
         mode_text = f"Mode: {self.animation_mode.title()}"
+        if self.pollutant != 'AQI':
+            mode_text += f" | Pollutant: {self.pollutant}"
+            if not self.aqhi_applied:
+                mode_text += " (loading)"
+        if self.band_view is not None:
+            mode_text += f" | Bands: {self.band_view.title()}" + ("" if self.aqhi.bands is not None else " (loading)")
+        if self.aqhi.failed:
+            mode_text += " | AQHI unavailable"
         if self.show_statistics:
             mode_text += " | Stats: ON"
-        
-        mode_surface = pygame.font.SysFont('Arial', 18).render(mode_text, True, COLORS['highlight'])
-        mode_bg = pygame.Surface((mode_surface.get_width() + 20, 30), pygame.SRCALPHA)
+        if self.show_backdrops:
+            mode_text += " | Backdrops: ON"
+        if self.rolling_window is not None:
+            mode_text += f" | Rolling: {ROLLING_WINDOWS[self.rolling_window][1]}"
+        if self.smog_mode:
+            mode_text += " | Smog: ON"
+        heatmap_status = self.heatmap_status()
+        if heatmap_status is not None:
+            mode_text += f" | Heatmap: {heatmap_status}"
+        if self.bloom_enabled:
+            mode_text += " | Bloom: ON"
+        if self.comparison_mode is not None:
+            mode_text += f" | Compare: {' vs '.join(self.comparison_labels())} ({self.comparison_mode.title()})"
+        
+        s = self.layout.s
+        mode_surface = self.layout.font(18).render(mode_text, True, COLORS['highlight'])
+        mode_bg = pygame.Surface((mode_surface.get_width() + s(20), s(30)), pygame.SRCALPHA)
         mode_bg.fill((0, 0, 0, 100))
         
-        screen.blit(mode_bg, (WIDTH - mode_surface.get_width() - 30, 10))
-        screen.blit(mode_surface, (WIDTH - mode_surface.get_width() - 20, 15))
+        screen.blit(mode_bg, (self.layout.width - mode_surface.get_width() - s(30), s(10)))
+        screen.blit(mode_surface, (self.layout.width - mode_surface.get_width() - s(20), s(15)))
+
+class Viewport:
+    """窗口与内部渲染画布
+
+    render_scale小于1时在较低分辨率的画布上绘制，每帧只放大一次到窗口
+    （例如4K大屏使用0.5即可在普通CPU上流畅运行）；等于1时直接绘制到窗口。
+    """
+    
+    def __init__(self, window, render_scale=1.0):
+        self.render_scale = render_scale
+        self.set_window(window)
+    
+    def set_window(self, window):
+        """窗口创建后重新分配渲染画布"""
+        self.window = window
+        width, height = window.get_size()
+        size = (max(1, round(width * self.render_scale)), max(1, round(height * self.render_scale)))
+        self.canvas = window if size == (width, height) else pygame.Surface(size).convert()
+    
+    @property
+    def canvas_size(self):
+        return self.canvas.get_size()
+    
+    def to_canvas(self, pos):
+        """把窗口坐标（鼠标位置）转换为画布坐标"""
+        if self.canvas is self.window:
+            return pos
+        (window_width, window_height), (width, height) = self.window.get_size(), self.canvas.get_size()
+        return int(pos[0] * width / window_width), int(pos[1] * height / window_height)
+    
+    def handle_resize(self):
+        """窗口尺寸变化后重新分配画布，返回新的画布尺寸"""
+        self.set_window(pygame.display.get_surface())
+        return self.canvas_size
+    
+    def present(self):
+        """把画布放大到窗口并显示"""
+        if self.canvas is not self.window:
+            pygame.transform.smoothscale(self.canvas, self.window.get_size(), self.window)
+        pygame.display.flip()
+    
+    def close(self):
+        """窗口由pygame.quit()关闭，这里没有需要释放的资源"""
+    
+    def render(self, viz):
+        """绘制一帧并显示"""
+        viz.draw(self.canvas)
+        self.present()
+
+def init_display(size=(WIDTH, HEIGHT), resizable=False):
+    """初始化Pygame并创建窗口"""
+    pygame.init()
+    screen = pygame.display.set_mode(size, pygame.RESIZABLE if resizable else 0)
+    pygame.display.set_caption(CAPTION)
+    return screen
+
+def create_viewport(backend='surface', size=(WIDTH, HEIGHT), render_scale=1.0):
+    """创建窗口和渲染后端；纹理后端不可用时回退到Surface路径"""
+    if backend == 'sdl2':
+        pygame.init()
+        try:
+            return TextureBackend(CAPTION, size, render_scale)
+        except (RuntimeError, pygame.error) as error:
+            warnings.warn(f"SDL2 texture backend unavailable ({error}); using the Surface renderer")
+    return Viewport(init_display(size, resizable=True), render_scale)
 
-def main():
+def main(threaded_simulation=False, backdrops=False, startup_budget=STARTUP_BUDGET_SECONDS,
+         measure_startup=False, seed=DATASET_SEED, live_source=None, live_retention_hours=24,
+         size=(WIDTH, HEIGHT), render_scale=1.0, backend='surface', bloom=False,
+         archive_format=DEFAULT_ARCHIVE_FORMAT, chunk_cache_mb=DEFAULT_CHUNK_CACHE_MB):
+    """运行可视化；返回从启动到显示第一帧所用的秒数"""
+    viewport = create_viewport(backend, size, render_scale)
     clock = pygame.time.Clock()
-    viz = AirQualityViz()
+    viz = AirQualityViz(threaded_simulation=threaded_simulation, backdrops=backdrops, seed=seed,
+                        live_source=live_source, live_retention_hours=live_retention_hours,
+                        size=viewport.canvas_size, bloom=bloom,
+                        archive_format=archive_format, chunk_cache_mb=chunk_cache_mb)
     running = True
-    frame_count = 0
+    startup_time = None
     
     while running:
-        # 更新鼠标位置
-        mouse_pos = pygame.mouse.get_pos()
+        # 更新鼠标位置（换算到渲染画布坐标）
+        mouse_pos = viewport.to_canvas(pygame.mouse.get_pos())
         viz.update_mouse_effects(mouse_pos)
+        viz.update_data_effects()
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED):
+                # 窗口尺寸变化：重新分配画布并重新计算布局
+                viz.resize(viewport.handle_resize())
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RIGHT:
-                    viz.target_year = min(2023, int(viz.target_year) + 1)  # 设置目标年份
+                    viz.target_year = min(viz.last_year, int(viz.target_year) + 1)  # 设置目标年份
                 elif event.key == pygame.K_LEFT:
-                    viz.target_year = max(1993, int(viz.target_year) - 1)  # 设置目标年份
+                    viz.target_year = max(viz.first_year, int(viz.target_year) - 1)  # 设置目标年份
                 elif event.key == pygame.K_SPACE:
                     # 空格键暂停/继续自动播放
-                    frame_count = 0
+                    viz.autoplay_frames = 0
                 elif event.key == pygame.K_s:
                     # S键切换统计信息显示
                     viz.show_statistics = not viz.show_statistics
@@ -1076,71 +2186,155 @@ def main():
                     # R键切换彩虹模式
                     viz.animation_mode = "rainbow" if viz.animation_mode != "rainbow" else "normal"
                     viz.rainbow_trail = []  # 清空之前的轨迹
+                elif event.key == pygame.K_m:
+                    # M键切换时间轴滑动平均（3个月/12个月/5年/关闭）
+                    viz.cycle_rolling_window()
+                elif event.key == pygame.K_d:
+                    # D键切换烟雾浓度模式
+                    viz.toggle_smog_mode()
+                elif event.key == pygame.K_b:
+                    # B键切换AQHI级别堆叠柱状图（每年各级别小时数/天数）
+                    viz.cycle_band_view()
+                elif event.key == pygame.K_p:
+                    # P键切换显示的污染物（AQI、AQHI、NO2、O3、SO2、PM10、PM2.5）
+                    viz.cycle_pollutant()
+                elif event.key == pygame.K_h:
+                    # H键切换插值热力图
+                    viz.toggle_heatmap()
+                elif event.key == pygame.K_v:
+                    # V键切换对比模式（关闭/左右并排/分割线）
+                    viz.cycle_comparison()
+                elif event.key == pygame.K_x:
+                    # X键在比较年份和比较区域之间切换
+                    viz.toggle_comparison_subject()
+                elif event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET):
+                    # [ ]键改变左侧比较的年份或区域，按住Shift时改变右侧
+                    delta = -1 if event.key == pygame.K_LEFTBRACKET else 1
+                    viz.step_comparison(delta, right=bool(event.mod & pygame.KMOD_SHIFT))
+                elif event.key == pygame.K_g:
+                    # G键切换光晕/烟霾后处理
+                    viz.toggle_bloom()
+                elif event.key == pygame.K_i:
+                    # I键切换年份背景图片
+                    viz.show_backdrops = not viz.show_backdrops
                 elif event.key == pygame.K_e:
                     # E键创建爆炸效果
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
-                    current_aqi = np.mean(viz.aqi_data[int(viz.year)])
+                    current_aqi = viz.cube.year_mean(viz.shown_year)
                     color = get_color_for_value(current_aqi)
-                    viz.add_particle_explosion(mouse_x, mouse_y, color, 30)
+                    viz.add_particle_explosion(*mouse_pos, color, 30)
                 elif event.key == pygame.K_w:
                     # W键手动添加天气效果
-                    current_aqi = np.mean(viz.aqi_data[int(viz.year)])
-                    if current_aqi > 100:
-                        viz.weather_effects = [WeatherEffect("fog", current_aqi)]
+                    current_aqi = viz.cube.year_mean(viz.shown_year)
+                    if AQI_BANDS.band(current_aqi) >= SENSITIVE:
+                        viz.weather_effects = [viz.create_weather_effect("fog", current_aqi)]
                     else:
-                        viz.weather_effects = [WeatherEffect("rain", current_aqi)]
+                        viz.weather_effects = [viz.create_weather_effect("rain", current_aqi)]
                 elif event.key == pygame.K_c:
                     # C键清除所有特效
                     viz.particle_explosions = []
-                    viz.data_sparkles = []
+                    viz.data_sparkles.clear()
                     viz.weather_effects = []
                     viz.rainbow_trail = []
                     viz.floating_particles = []
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+                # 右键在时间轴上拖动选择时间范围；单击则清除选择
+                pos = viewport.to_canvas(event.pos)
+                if viz.timeline_graph.rect.collidepoint(pos):
+                    viz.range_drag_start = viz.timeline_graph.get_month_from_mouse_x(pos[0])
+                    viz.selected_range = None
+            elif event.type == pygame.MOUSEMOTION and viz.range_drag_start is not None:
+                viz.update_range_selection(viewport.to_canvas(event.pos)[0])
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 3 and viz.range_drag_start is not None:
+                viz.update_range_selection(viewport.to_canvas(event.pos)[0], finished=True)
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_x, mouse_y = event.pos
+                mouse_x, mouse_y = viewport.to_canvas(event.pos)
                 
                 # 检测时间轴图表点击
                 clicked_year = viz.timeline_graph.get_year_from_mouse_pos(mouse_x, mouse_y)
                 if clicked_year is not None:
                     viz.target_year = clicked_year
                     # 添加点击时间轴的视觉反馈
-                    click_x = viz.timeline_graph.rect.left + (clicked_year - 1993) * viz.timeline_graph.rect.width // (2023 - 1993)
+                    click_x = viz.timeline_graph.x_for_year(clicked_year)
                     click_y = viz.timeline_graph.rect.centery
                     viz.add_ripple_effect(click_x, click_y, COLORS['highlight'])
                     viz.add_floating_particles(click_x, click_y, COLORS['highlight'], 8)
                 else:
                     # 检测区域点击
-                    margin = 50
-                    grid_size = 3
-                    cell_width = (WIDTH - 2 * margin) // grid_size
-                    cell_height = 200
-                    
-                    if 100 <= mouse_y <= 700:  # 区域可视化的垂直范围
-                        row = (mouse_y - 100) // cell_height
-                        col = (mouse_x - margin) // cell_width
-                        index = row * grid_size + col
-                        if 0 <= index < len(DISTRICTS):
-                            viz.selected_district = DISTRICTS[index]
-                            # 点击时添加特殊效果
-                            center_x = margin + col * cell_width + (cell_width - 10) // 2
-                            center_y = 100 + row * cell_height + (cell_height - 10) // 2
-                            aqi = np.mean(viz.district_data[DISTRICTS[index]][int(viz.year)])
-                            color = get_color_for_value(aqi)
-                            viz.add_ripple_effect(center_x, center_y, color)
-                            viz.add_floating_particles(center_x, center_y, color, 10)
+                    # 对比模式下地图区域显示的是两侧的窗格，不对应区域网格
+                    index = viz.layout.district_at((mouse_x, mouse_y)) if viz.comparison_mode is None else None
+                    if index is not None:
+                        viz.selected_district = DISTRICTS[index]
+                        # 点击时添加特殊效果
+                        center_x, center_y = viz.layout.district_rect(index).center
+                        aqi = viz.cube.year_mean(viz.shown_year, DISTRICTS[index])
+                        color = get_color_for_value(aqi)
+                        viz.add_ripple_effect(center_x, center_y, color)
+                        viz.add_floating_particles(center_x, center_y, color, 10)
                     
         viz.update_particles()
-        viz.draw(screen)
-        pygame.display.flip()
+        viewport.render(viz)
         
-        # 每300帧自动前进一年
-        frame_count += 1
-        if frame_count >= 300:
-            frame_count = 0
-            viz.target_year = viz.target_year + 1 if viz.target_year < 2023 else 1993  # 设置目标年份而不是直接修改年份
+        # 记录冷启动时间（到第一帧显示为止）
+        if startup_time is None:
+            startup_time = time.perf_counter() - _MODULE_LOADED_AT
+            if measure_startup:
+                running = False
+            elif startup_time > startup_budget:
+                warnings.warn(f"First frame took {startup_time:.2f}s "
+                              f"(startup budget {startup_budget:.2f}s)")
+        
+        viz.advance_autoplay()
             
         clock.tick(60)
+    
+    viz.close()
+    viewport.close()
+    return startup_time
 
-if __name__ == "__main__":
-    main()
+def cli(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description=CAPTION)
+    parser.add_argument("--threaded-sim", action="store_true",
+                        help="在后台线程中模拟粒子（双缓冲）")
+    parser.add_argument("--backdrops", action="store_true",
+                        help="显示HK_AQI_YYYY.jpg年份背景图片")
+    parser.add_argument("--seed", type=int, default=DATASET_SEED,
+                        help="数据集随机种子（相同种子在所有设备上显示相同的数据）")
+    parser.add_argument("--live", metavar="SOURCE",
+                        help="实时模式：跟踪不断追加的CSV/JSONL文件或本地HTTP接口")
+    parser.add_argument("--live-retention", type=float, default=24,
+                        help="实时模式保留原始读数的小时数")
+    parser.add_argument("--size", type=parse_size, default=(WIDTH, HEIGHT),
+                        help="初始窗口尺寸，例如3840x2160（窗口可以拖动调整大小）")
+    parser.add_argument("--render-scale", type=float, default=1.0,
+                        help="内部渲染分辨率相对窗口的比例（0-1），每帧放大一次到窗口")
+    parser.add_argument("--bloom", action="store_true",
+                        help="开启全画面光晕/烟霾后处理（烟霾浓度随AQI变化，也可以按G键切换）")
+    parser.add_argument("--backend", choices=BACKENDS, default='surface',
+                        help="渲染后端：sdl2使用GPU纹理（没有GPU时使用SDL软件渲染器），不可用时回退到surface")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS,
+                        help="从启动到第一帧的时间预算（秒）")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="显示第一帧后退出并报告冷启动时间；超出预算时返回非零退出码")
+    parser.add_argument("--archive-format", choices=ARCHIVE_FORMATS, default=DEFAULT_ARCHIVE_FORMAT,
+                        help="逐小时档案的存储格式：raw为未压缩的内存映射文件，zlib/lzma为按监测站和年份分块压缩")
+    parser.add_argument("--chunk-cache-mb", type=float, default=DEFAULT_CHUNK_CACHE_MB,
+                        help="压缩档案解压后数据块的缓存上限（MB）")
+    args = parser.parse_args(argv)
+    if not 0 < args.render_scale <= 1:
+        parser.error("--render-scale must be in (0, 1]")
+    startup_time = main(threaded_simulation=args.threaded_sim, backdrops=args.backdrops,
+                        startup_budget=args.startup_budget, measure_startup=args.measure_startup,
+                        seed=args.seed, live_source=args.live, live_retention_hours=args.live_retention,
+                        size=args.size, render_scale=args.render_scale, backend=args.backend,
+                        bloom=args.bloom, archive_format=args.archive_format,
+                        chunk_cache_mb=args.chunk_cache_mb)
     pygame.quit()
+    
+    if args.measure_startup and startup_time is not None:
+        print(f"First frame after {startup_time:.3f}s (budget {args.startup_budget:.2f}s)")
+        if startup_time > args.startup_budget:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,42 @@
+import numpy as np
+import pygame
+import pytest
+
+import hk_air_quality_super_enhanced as app
+
+
+@pytest.fixture
+def viz(tmp_path, monkeypatch):
+    monkeypatch.setenv("HK_AQ_CACHE_DIR", str(tmp_path))
+    # 逐小时档案与这些测试无关：档案目录被同名文件占用，后台加载立即失败而不是合成几秒钟的数据
+    (tmp_path / "archives").touch()
+    pygame.init()
+    viz = app.AirQualityViz(size=(800, 600))
+    viz.aqhi.join()
+    yield viz
+    viz.close()
+
+
+@pytest.mark.filterwarnings("ignore:Hourly AQHI data unavailable")
+def test_statistics_panel_for_year_without_pollutant_values(viz):
+    """实时年份只有AQI读数时，选择AQHI并显示统计面板不会出错"""
+    first_year = app.YEARS[0]
+    viz.loader.wait(first_year)
+    viz.receive_loaded_years()
+    monthly = np.full((len(app.DISTRICTS), len(app.YEARS), 12, len(app.HOURLY_CHANNELS)), 4.0, dtype=np.float32)
+    viz.cube.fill_pollutants(app.HOURLY_CHANNELS, monthly)
+
+    live_year = app.YEARS[-1] + 1
+    viz.cube.append_year(live_year)
+    block = np.full((len(app.DISTRICTS), 12, len(viz.cube.pollutants)), np.nan, dtype=np.float32)
+    block[:, :3, viz.cube.position("pollutant", "AQI")] = 40.0
+    viz.cube.fill_year(live_year, block)
+
+    viz.select_pollutant("AQHI")
+    viz.year = viz.target_year = viz.shown_year = live_year
+    viz.statistics.refresh()  # 绘制时由overlay_key刷新
+    panel = viz.render_statistics_panel(live_year)
+
+    assert first_year in viz.statistics.years and live_year not in viz.statistics.years
+    assert viz.statistics.ranking(live_year) == []
+    assert panel.get_width() > 0
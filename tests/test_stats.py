@@ -0,0 +1,16 @@
+import numpy as np
+
+from aq_cube import AQCube
+from aq_stats import StatisticsEngine
+
+
+def test_ranking_skips_districts_without_readings():
+    """没有读数的区域不会被列为污染最严重"""
+    cube = AQCube(['A', 'B', 'C', 'D'], [2000, 2001])
+    for year, values in ((2000, [30.0, np.nan, 50.0, 10.0]), (2001, [20.0, 25.0, 15.0, 40.0])):
+        block = np.repeat(np.array(values, dtype=np.float32)[:, None, None], 12, axis=1)
+        cube.fill_year(year, block)
+
+    engine = StatisticsEngine(cube)
+    assert engine.ranking(2000) == ['D', 'A', 'C']
+    assert engine.ranking(2001) == ['C', 'A', 'B', 'D']
@@ -0,0 +1,17 @@
+import numpy as np
+
+from aq_bands import MISSING_BAND, MISSING_COLOR
+from aq_transitions import TransitionTable
+
+
+def test_missing_districts_keep_a_no_data_level():
+    """两端都没有读数的区域不会被当作AQI 0（良好）"""
+    start = np.array([40.0, np.nan, np.nan, 30.0])
+    end = np.array([60.0, 80.0, np.nan, np.nan])
+    table = TransitionTable(start, end, lambda value: (0, int(value), 0), lambda value: value, steps=4)
+
+    assert table.levels[0].tolist() == [40.0, 45.0, 50.0, 55.0, 60.0]
+    assert table.levels[1].tolist() == [80.0] * 5  # 只有一端有数据时保持该端的数值
+    assert (table.levels[2] == MISSING_BAND).all()
+    assert table.colors[2] == [MISSING_COLOR] * 5
+    assert table.particles == [30.0] * 5